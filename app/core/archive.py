@@ -0,0 +1,369 @@
+"""
+ZAMAN BÖLÜMLÜ ARŞİV (HAREKETLER / AUDIT LOG)
+Hareket ve kullanıcı aktivite tabloları sınırsız büyür; her okuma, yazma ve mutabakat
+tüm geçmişi taşır. Eski dönemler ayrı bölüm tablolarına ({tablo}_arsiv_{YYYY_MM} veya
+{tablo}_arsiv_{YYYY}) taşınır, sıcak tabloda sadece son dönemler kalır.
+
+- Sadece tablonun kronolojik BAŞI taşınır (kesim tarihinden önceki en uzun önek);
+  sıcak tabloda silme tek "ilk n satır" işlemidir, satır numaraları kaymaz
+- Hareketlerde silo başına devir satırı (Devir Giriş / Devir Çıkış) yazılır;
+  silo mutabakatı arşiv okunmadan tüm geçmişle aynı sonucu verir
+- Raporlama ekranları fetch_with_archive ile tarih aralığına düşen bölümleri
+  otomatik olarak sıcak tabloya ekler
+- Bölümler arsiv_bolumleri tablosuna kaydedilir (tablo, bölüm, dönem, tarih aralığı, satır sayısı)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import (
+    ARCHIVE_SUFFIX, ARCHIVE_REGISTRY, ARCHIVE_TABLES, ARCHIVE_MIN_ROWS, ARCHIVE_CHECK_SECONDS
+)
+from app.core.backend_client import is_quota_error
+from app.core.database import fetch_data, fetch_many, get_conn
+from app.core.error_handling import log_info, log_error
+from app.core.schema import apply_schema, get_schema, parse_datetime, FLOAT
+from app.core.silo_engine import carry_forward, DEVIR_GIRIS, DEVIR_CIKIS
+from app.core.storage import _key
+from app.core.table_cache import table_cache
+
+# Kayıt tablosu sütunları
+REGISTRY_COLUMNS = ['tablo', 'bolum', 'donem', 'baslangic', 'bitis', 'satir', 'guncelleme']
+
+# Kayıt tablosunun cache süresi (başka süreçlerin arşivlemesi bu sürede görülür)
+_REGISTRY_MAX_AGE = 60
+
+_DEVIR_TIPLERI = (DEVIR_GIRIS, DEVIR_CIKIS)
+
+
+def partition_name(table, donem):
+    """Bölüm tablosu adı: ('hareketler', '2025_01') -> 'hareketler_arsiv_2025_01'"""
+    return f"{table}{ARCHIVE_SUFFIX}{donem}"
+
+
+def _donem_araligi(donem):
+    """Dönemin [başlangıç, bitiş) aralığı ('2025_01' -> 2025-01-01, 2025-02-01; '2025' -> yıl)"""
+    parcalar = _key(donem).split('_')
+    baslangic = pd.Timestamp(year=int(parcalar[0]), month=int(parcalar[1]) if len(parcalar) > 1 else 1, day=1)
+    bitis = baslangic + (pd.DateOffset(months=1) if len(parcalar) > 1 else pd.DateOffset(years=1))
+    return baslangic, bitis
+
+
+def _cutoff(config, now=None):
+    """
+    Kesim tarihi: bundan eski satırlar arşivlenir.
+    Bu ay dahil son hot_months ay sıcak kalır; yıllık bölümlemede yıl başına yuvarlanır.
+    """
+    ay_basi = pd.Timestamp(now or pd.Timestamp.now()).normalize().replace(day=1)
+    kesim = ay_basi - pd.DateOffset(months=max(1, int(config.get('hot_months', 3))) - 1)
+    if config.get('granularity') == 'year':
+        kesim = kesim.replace(month=1)
+    return kesim
+
+
+def _read_or_none(conn, worksheet):
+    """Tabloyu ham (tipsiz) okur; tablo yoksa None (kota hatası yukarı fırlatılır)"""
+    try:
+        df = conn.read(worksheet=worksheet, ttl=0)
+    except Exception as e:
+        if is_quota_error(e):
+            raise
+        return None
+    if df is None or len(df.columns) == 0:
+        return None
+    return df
+
+
+def _row_keys(df, columns):
+    """Tekrar yazımı önlemek için satır anahtarları (id varsa id, yoksa verilen sütunlar)"""
+    anahtarlar = []
+    for row in df.to_dict('records'):
+        kimlik = _key(row.get('id')) if 'id' in row else ''
+        anahtarlar.append(('id', kimlik) if kimlik else tuple(_key(row.get(c)) for c in columns))
+    return anahtarlar
+
+
+def _boundary(row, date_column):
+    """
+    delete_head sınır kontrolü: satırın id'si, tarihi ve metin alanları.
+    Değerler _key ile normalize edilir (12.0 -> '12'); tarih, motorun döndürdüğü
+    biçimden bağımsız olarak depolama katmanında an olarak karşılaştırılır.
+    """
+    sinir = {col: value for col, value in row.items()
+             if col != date_column and isinstance(value, str) and value.strip() and not str(col).startswith('Unnamed')}
+    for col in ('id', date_column):
+        if col in row and _key(row[col]) != '':
+            sinir[col] = _key(row[col])
+    return sinir
+
+
+class TableArchiver:
+    """
+    Sıcak tabloların dönem bölümlerine arşivlenmesi (süreç genelinde tek örnek).
+    Otomatik kontrol en fazla ARCHIVE_CHECK_SECONDS'ta bir, arka planda çalışır.
+    """
+
+    def __init__(self, tables=ARCHIVE_TABLES, check_seconds=ARCHIVE_CHECK_SECONDS):
+        self.tables = tables
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arsiv")
+        self._last_check = None
+        self._running = False
+        self._results = {}      # tablo -> son çalışma özeti
+        self._last_error = None
+
+    # --- Kayıt tablosu ---
+    def registry(self, conn):
+        """Bölüm kayıtları (tablo yoksa boş)"""
+        cached = table_cache.get(ARCHIVE_REGISTRY, max_age=_REGISTRY_MAX_AGE)
+        if cached is not None:
+            return cached
+        version = table_cache.version(ARCHIVE_REGISTRY)
+        df = _read_or_none(conn, ARCHIVE_REGISTRY)
+        df = apply_schema(ARCHIVE_REGISTRY, df) if df is not None else pd.DataFrame(columns=REGISTRY_COLUMNS)
+        table_cache.put(ARCHIVE_REGISTRY, df, version=version)
+        return df
+
+    def partitions(self, conn, table, start=None, end=None):
+        """Tablonun [start, end] aralığıyla kesişen bölümleri (eskiden yeniye)"""
+        df = self.registry(conn)
+        if df.empty or 'tablo' not in df.columns:
+            return []
+        baslangic = None if start is None else pd.Timestamp(start)
+        bitis = None if end is None else pd.Timestamp(end)
+        secilen = []
+        for bolum, donem in df.loc[df['tablo'].astype(str) == table, ['bolum', 'donem']].itertuples(index=False):
+            donem_bas, donem_bit = _donem_araligi(donem)
+            if (baslangic is None or donem_bit > baslangic) and (bitis is None or donem_bas <= bitis):
+                secilen.append((donem_bas, str(bolum)))
+        return [bolum for _, bolum in sorted(secilen)]
+
+    def _register(self, conn, registry, table, donem, df_bolum):
+        tarih = parse_datetime(df_bolum[self.tables[table]['date_column']])
+        kayit = {
+            'tablo': table,
+            'bolum': partition_name(table, donem),
+            'donem': donem,
+            'baslangic': tarih.min(),
+            'bitis': tarih.max(),
+            'satir': int(len(df_bolum)),
+            'guncelleme': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        if registry is None:
+            conn.create(ARCHIVE_REGISTRY, pd.DataFrame([kayit], columns=REGISTRY_COLUMNS))
+            return pd.DataFrame([kayit], columns=REGISTRY_COLUMNS)
+        if (registry['bolum'].astype(str) == kayit['bolum']).any():
+            conn.update_where(ARCHIVE_REGISTRY, {'bolum': kayit['bolum']}, kayit)
+        else:
+            conn.append(ARCHIVE_REGISTRY, [kayit])
+            registry = pd.concat([registry, pd.DataFrame([kayit])], ignore_index=True)
+        return registry
+
+    def _write_partition(self, conn, table, donem, rows):
+        """
+        Satırları bölüme yazar; bölümde zaten olan satırlar (yarıda kalmış önceki
+        çalışma) tekrar yazılmaz. Returns: bölümün son hali (ham)
+        """
+        name = partition_name(table, donem)
+        mevcut = _read_or_none(conn, name)
+        if mevcut is None:
+            conn.create(name, rows.reset_index(drop=True))
+            return rows
+        ortak = sorted(set(mevcut.columns) & set(rows.columns))
+        varolan = set(_row_keys(mevcut, ortak))
+        yeni = rows[[k not in varolan for k in _row_keys(rows, ortak)]]
+        if not yeni.empty:
+            conn.append(name, yeni.to_dict('records'))
+        return pd.concat([mevcut, yeni], ignore_index=True)
+
+    # --- Devir satırları ---
+    def _sync_carry_forward(self, conn, table, hot, registry):
+        """
+        Devir satırlarını tüm bölümlerden yeniden hesaplar ve sıcak tablodakilerle
+        değiştirir. Hesap bölümlerden yapıldığı için yarıda kalmış bir çalışmadan sonra da doğrudur.
+        Returns: yazılan devir satırı sayısı (değişiklik yoksa 0)
+        """
+        bolumler = [str(b) for b in registry.loc[registry['tablo'].astype(str) == table, 'bolum']]
+        if not bolumler:
+            return 0
+        parcalar = [df for df in (_read_or_none(conn, b) for b in bolumler) if df is not None and not df.empty]
+        if not parcalar:
+            return 0
+        arsiv = apply_schema(table, pd.concat(parcalar, ignore_index=True))
+
+        donem_sonu = max(_donem_araligi(d)[1] for d in registry.loc[registry['tablo'].astype(str) == table, 'donem'])
+        params = [col for col, dtype, _ in get_schema(table) if dtype == FLOAT and col != 'miktar']
+        lot_no = f"DEVIR-{donem_sonu:%Y%m%d}"
+        istenen = []
+        for satir in carry_forward(arsiv, params):
+            istenen.append({
+                'tarih': donem_sonu.strftime('%Y-%m-%d %H:%M:%S'),
+                'lot_no': lot_no,
+                'notlar': f"{donem_sonu:%d.%m.%Y} öncesi arşivlenen hareketlerin devri",
+                **satir,
+            })
+
+        devir = hot[hot['hareket_tipi'].astype(str).isin(_DEVIR_TIPLERI)] if 'hareket_tipi' in hot.columns else hot.iloc[:0]
+        def imza(rows):
+            return sorted((_key(r.get('lot_no')), str(r.get('silo_isim')), str(r.get('hareket_tipi')),
+                           round(float(r.get('miktar') or 0), 6)) for r in rows)
+        if imza(devir.to_dict('records')) == imza(istenen):
+            return 0
+
+        for eski_lot in devir['lot_no'].dropna().astype(str).unique() if 'lot_no' in devir.columns else []:
+            conn.delete_where(table, {'lot_no': eski_lot})
+        if istenen:
+            conn.append(table, istenen)
+        return len(istenen)
+
+    # --- Arşivleme ---
+    def archive_table(self, conn, table, now=None, min_rows=0, force=False):
+        """
+        Tek tabloyu arşivler.
+
+        Args:
+            min_rows: Taşınacak satır bundan azsa arşivleme yapılmaz (otomatik çalışma)
+            force: Taşınacak satır olmasa da devir satırları bölümlerden yeniden hesaplanır
+
+        Returns:
+            dict: tasinan, bolumler, devir, kesim
+        """
+        config = self.tables[table]
+        kesim = _cutoff(config, now)
+        sonuc = {'tasinan': 0, 'bolumler': [], 'devir': 0, 'kesim': kesim.strftime('%Y-%m-%d')}
+
+        with conn.transaction():
+            ham = _read_or_none(conn, table)
+            date_col = config.get('date_column', 'tarih')
+            if ham is None or ham.empty or date_col not in ham.columns:
+                return sonuc
+
+            tarih = parse_datetime(ham[date_col])
+            devir = ham['hareket_tipi'].astype(str).isin(_DEVIR_TIPLERI).to_numpy() \
+                if config.get('carry_forward') and 'hareket_tipi' in ham.columns else np.zeros(len(ham), dtype=bool)
+
+            # Kesimden eski en uzun önek (devir satırları öneki bölmez, ama bölüme de yazılmaz)
+            eski = (tarih < kesim).to_numpy() | devir
+            n = len(eski) if eski.all() else int(np.argmin(eski))
+            tasinacak = ham.iloc[:n][~devir[:n]]
+
+            registry = _read_or_none(conn, ARCHIVE_REGISTRY)
+            if len(tasinacak) and len(tasinacak) >= min_rows:
+                donemler = tarih.iloc[:n][~devir[:n]].dt.strftime('%Y_%m' if config.get('granularity') != 'year' else '%Y')
+                for donem, grup in tasinacak.groupby(donemler, sort=True):
+                    bolum = self._write_partition(conn, table, donem, grup)
+                    registry = self._register(conn, registry, table, donem, bolum)
+                    sonuc['bolumler'].append(partition_name(table, donem))
+                conn.delete_head(table, n, boundary=_boundary(ham.iloc[n - 1].to_dict(), date_col))
+                sonuc['tasinan'] = int(len(tasinacak))
+                ham = ham.iloc[n:]
+                force = True
+            elif config.get('carry_forward') and registry is not None and not devir.any():
+                # Bölüm var ama devir yok: yarıda kalmış çalışma onarılır
+                force = True
+
+            if config.get('carry_forward') and force and registry is not None:
+                sonuc['devir'] = self._sync_carry_forward(conn, table, ham, apply_schema(ARCHIVE_REGISTRY, registry))
+        return sonuc
+
+    def run(self, conn, min_rows=0, force=False, now=None):
+        """Tüm arşiv tablolarını sırayla işler: {tablo: özet}"""
+        with self._lock:
+            if self._running:
+                return {}
+            self._running = True
+        try:
+            sonuclar = {}
+            for table in self.tables:
+                try:
+                    sonuclar[table] = self.archive_table(conn, table, now=now, min_rows=min_rows, force=force)
+                    if sonuclar[table]['tasinan'] or sonuclar[table]['devir']:
+                        log_info(f"{table}: {sonuclar[table]['tasinan']} satır arşivlendi, "
+                                 f"{sonuclar[table]['devir']} devir satırı yazıldı", context="Arşivleme")
+                except Exception as e:
+                    sonuclar[table] = {'hata': str(e)}
+                    self._last_error = (time.time(), f"{table}: {e}")
+                    log_error(f"{table} arşivlenemedi", context="Arşivleme", error=e)
+            self._results = sonuclar
+            return sonuclar
+        finally:
+            self._last_check = time.time()
+            with self._lock:
+                self._running = False
+
+    def maybe_run(self, conn):
+        """Son kontrolden ARCHIVE_CHECK_SECONDS geçtiyse arşivlemeyi arka planda başlatır"""
+        if conn is None:
+            return False
+        with self._lock:
+            if self._running or (self._last_check is not None and time.time() - self._last_check < self.check_seconds):
+                return False
+            self._last_check = time.time()
+        try:
+            self._executor.submit(self.run, conn, ARCHIVE_MIN_ROWS)
+        except RuntimeError:
+            # Kapanış sırasında havuz kapalı
+            return False
+        return True
+
+    def stats(self):
+        """Debug ekranı için özet"""
+        return {
+            'calisiyor': self._running,
+            'son_kontrol': None if self._last_check is None else
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._last_check)),
+            'son_sonuc': dict(self._results),
+            'son_hata': self._last_error[1] if self._last_error else None,
+        }
+
+
+# Süreç genelinde tek örnek
+archiver = TableArchiver()
+
+
+def fetch_with_archive(table, start=None, end=None):
+    """
+    Sıcak tablo + [start, end] aralığıyla kesişen arşiv bölümleri (raporlama ekranları için).
+
+    - start None ise tüm bölümler eklenir (tam geçmiş)
+    - Bölüm eklendiğinde devir satırları çıkarılır (arşivlenen hareketler çift sayılmasın)
+    - Sıcak tablo satırları orijinal indeks etiketlerini korur; bölüm satırları negatif etiketlidir
+    - Tarih filtresi UYGULANMAZ; çağıran ekran kendi filtresini uygular
+
+    Returns:
+        DataFrame: Tarih aralığı için eksiksiz tablo (bölüm yoksa sıcak tablonun kendisi)
+    """
+    df_hot = fetch_data(table)
+    if table not in ARCHIVE_TABLES:
+        return df_hot
+
+    conn = get_conn()
+    if conn is None:
+        return df_hot
+    try:
+        bolumler = archiver.partitions(conn, table, start, end)
+    except Exception:
+        # Kayıt tablosu okunamadı (kota vb.) - sıcak tablo gösterilir
+        return df_hot
+    if not bolumler:
+        return df_hot
+
+    parcalar = [df for df in fetch_many(bolumler).values() if df is not None and not df.empty]
+    if not parcalar:
+        return df_hot
+    arsiv = pd.concat(parcalar, ignore_index=True)
+    arsiv.index = -1 - np.arange(len(arsiv))
+
+    if 'hareket_tipi' in df_hot.columns:
+        df_hot = df_hot[~df_hot['hareket_tipi'].astype(str).isin(_DEVIR_TIPLERI)]
+    return apply_schema(table, pd.concat([arsiv, df_hot]))
+
+
+def maybe_run_archives():
+    """main.py her çalışmada çağırır; arşiv kontrolü süreç başına aralıklı ve arka planda yapılır"""
+    return archiver.maybe_run(get_conn())
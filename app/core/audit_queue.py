@@ -0,0 +1,170 @@
+"""
+ASENKRON AUDIT LOG KUYRUĞU
+Olaylar süreç içi kuyruğa alınır, arka plan işçisi toplu olarak yazar.
+Yazılmamış olaylar yerel spool dosyasında tutulur (çökmede kayıp olmaz).
+"""
+
+import atexit
+import itertools
+import json
+import os
+import threading
+
+from app.core.config import (
+    AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_MAX_PENDING, AUDIT_SPOOL_PATH
+)
+
+# Hata sonrası bekleme üst sınırı (saniye)
+_MAX_BACKOFF = 60
+
+
+class AuditQueue:
+    """
+    Sınırlı tampon + spool dosyası + arka plan işçisi.
+
+    - enqueue() sadece dosyaya bir satır ekler ve döner (ağ çağrısı yok)
+    - İşçi her AUDIT_FLUSH_INTERVAL saniyede veya AUDIT_BATCH_SIZE olay
+      birikince tek bir append ile yazar
+    - Başarılı yazımdan sonra spool dosyası kalan olaylarla yeniden yazılır
+    - Tampon AUDIT_MAX_PENDING'i aşarsa en eski olaylar bellekten atılır
+    """
+
+    def __init__(self, worksheet="audit_log", spool_path=AUDIT_SPOOL_PATH,
+                 batch_size=AUDIT_BATCH_SIZE, interval=AUDIT_FLUSH_INTERVAL,
+                 max_pending=AUDIT_MAX_PENDING):
+        self.worksheet = worksheet
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = []          # [(sıra_no, olay), ...]
+        self._seq = itertools.count(1)
+        self._backend = None
+        self._worker = None
+        self._dropped = 0
+        self._last_error = None
+
+        self._load_spool()
+        atexit.register(self.flush)
+
+    # --- Spool dosyası ---
+    def _load_spool(self):
+        """Önceki çalışmadan kalan (yazılamamış) olayları geri yükler"""
+        if not os.path.exists(self.spool_path):
+            return
+        try:
+            with open(self.spool_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._pending.append((next(self._seq), json.loads(line)))
+        except Exception:
+            pass
+        self._trim()
+
+    def _rewrite_spool(self):
+        """Spool dosyasını bekleyen olaylarla atomik olarak yeniden yazar"""
+        tmp_path = self.spool_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for _, event in self._pending:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spool_path)
+
+    def _trim(self):
+        fazla = len(self._pending) - self.max_pending
+        if fazla > 0:
+            del self._pending[:fazla]
+            self._dropped += fazla
+
+    # --- Dış arayüz ---
+    def bind(self, backend):
+        """İşçinin yazacağı depolama motorunu ayarlar (istek thread'inden çağrılır)"""
+        self._backend = backend
+
+    def enqueue(self, event):
+        """Olayı kuyruğa alır; ağ çağrısı yapmaz"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._pending.append((next(self._seq), event))
+            self._trim()
+            dolu = len(self._pending) >= self.batch_size
+
+        self._ensure_worker()
+        if dolu:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Bekleyen olayları hemen yazar (işçi de bunu kullanır).
+        Returns: bool - tüm olaylar yazıldıysa True
+        """
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = list(self._pending)
+                    backend = self._backend
+                if not batch:
+                    return True
+                if backend is None:
+                    return False
+
+                try:
+                    backend.append(self.worksheet, [event for _, event in batch])
+                except Exception as e:
+                    self._last_error = str(e)
+                    return False
+
+                yazilan = {seq for seq, _ in batch}
+                with self._lock:
+                    self._pending = [item for item in self._pending if item[0] not in yazilan]
+                    self._last_error = None
+                    try:
+                        self._rewrite_spool()
+                    except Exception:
+                        pass
+
+    def stats(self):
+        """Debug ekranı için kuyruk durumu"""
+        with self._lock:
+            return {
+                "bekleyen": len(self._pending),
+                "atilan": self._dropped,
+                "son_hata": self._last_error,
+                "spool": self.spool_path,
+            }
+
+    # --- Arka plan işçisi ---
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name="audit-log-worker", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        bekleme = self.interval
+        while True:
+            self._wakeup.wait(timeout=bekleme)
+            self._wakeup.clear()
+            if self.flush():
+                bekleme = self.interval
+            else:
+                # Yazılamadı (kota / ağ): olaylar spool'da, bekleme süresini artır
+                bekleme = min(bekleme * 2, _MAX_BACKOFF)
+
+
+# Süreç genelinde tek kuyruk (tüm oturumlar paylaşır)
+audit_queue = AuditQueue()
@@ -0,0 +1,219 @@
+"""
+DEPOLAMA İSTEMCİ KATMANI (RATE LIMIT + SINGLE-FLIGHT)
+Google Sheets API kotası (dakikalık istek sınırı) tüm oturumlarca paylaşılır.
+
+- Single-flight: aynı anda aynı tabloyu okumak isteyen oturumlar tek bir okumayı bekler
+- Token bucket: istekler kotaya uygun hızda gönderilir (ani yığılmada sıraya girer)
+- Kota hatası (429) gelirse rastgele sapmalı (jitter) üstel bekleme ile tekrar denenir
+Vardiya değişimi gibi yoğun anlarda sistem hata vermek yerine yavaşlar.
+"""
+
+import random
+import threading
+import time
+
+from app.core.config import (
+    BACKEND_RATE_LIMITS, BACKEND_MAX_WAIT, BACKOFF_RETRIES, BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS
+)
+
+# Kota / geçici sunucu hatası sayılan HTTP kodları
+_KOTA_KODLARI = {429}
+_GECICI_KODLAR = {500, 502, 503, 504}
+# Yapılandırılmış hata nedenleri (çıplak "429" aranmaz: lot / plaka / satır numarası
+# içeren her hata kota sayılıp yazmalar tekrar edilirdi)
+_KOTA_METINLERI = ("rate_limit_exceeded", "ratelimitexceeded", "quota exceeded", "resource_exhausted")
+
+
+class RateLimitError(Exception):
+    """İstek kota nedeniyle gönderilemedi (bekleme süresi / deneme hakkı doldu)"""
+
+
+def _status_code(exc):
+    response = getattr(exc, "response", None)
+    code = getattr(response, "status_code", None) or getattr(exc, "code", None)
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_quota_error(exc):
+    """Hata API kotası / hız sınırından mı kaynaklanıyor?"""
+    if isinstance(exc, RateLimitError):
+        return True
+    if _status_code(exc) in _KOTA_KODLARI:
+        return True
+    metin = str(exc).lower()
+    return any(m in metin for m in _KOTA_METINLERI)
+
+
+def is_transient_error(exc):
+    """Tekrar denenebilecek geçici sunucu hatası mı? (sadece okumalar için)"""
+    return _status_code(exc) in _GECICI_KODLAR
+
+
+class TokenBucket:
+    """
+    Klasik token bucket: saniyede `rate` jeton dolar, en fazla `capacity` birikir.
+    Her istek bir jeton harcar; jeton yoksa bir sonraki jetona kadar beklenir.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        """Bir jeton alır; timeout içinde alınamazsa False döner"""
+        bitis = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                bekle = (1.0 - self._tokens) / self.rate
+            if bitis is not None and now + bekle > bitis:
+                return False
+            time.sleep(bekle)
+            with self._lock:
+                self.waited_seconds += bekle
+
+    def penalize(self):
+        """Kota hatası alındı: biriken jetonlar boşaltılır (diğer istekler de yavaşlar)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Aynı anahtarla eşzamanlı çağrılar tek bir çalıştırmanın sonucunu paylaşır"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, func):
+        """
+        Returns:
+            tuple: (sonuç, paylaşıldı_mı) - paylaşılan sonuç başka bir çağrının nesnesidir
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            lider = flight is None
+            if lider:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+
+        if not lider:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+
+class BackendClient:
+    """
+    Depolama motoru çağrıları için paylaşılan istemci.
+    Hız sınırı motor adına göre uygulanır (BACKEND_RATE_LIMITS; yerel SQLite sınırsız).
+    """
+
+    def __init__(self, limits=BACKEND_RATE_LIMITS, max_wait=BACKEND_MAX_WAIT, retries=BACKOFF_RETRIES,
+                 base_delay=BACKOFF_BASE_SECONDS, max_delay=BACKOFF_MAX_SECONDS):
+        self.max_wait = max_wait
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets = {
+            name: TokenBucket(per_minute / 60.0, burst) for name, (per_minute, burst) in limits.items()
+        }
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._counts = {"istek": 0, "birlesen": 0, "tekrar": 0, "kota_hatasi": 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counts[key] += n
+
+    def backoff_delay(self, attempt):
+        """Full jitter: 0 ile min(üst sınır, taban * 2^deneme) arası rastgele bekleme"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, backend, func, *args, idempotent=False, retries=None, **kwargs):
+        """
+        Motor çağrısını hız sınırı ve tekrar deneme ile yapar.
+
+        Args:
+            backend: Motor adı ('gsheets', 'sqlite', ...)
+            idempotent: True ise geçici sunucu hataları (5xx) da tekrar denenir (okumalar)
+            retries: Tekrar deneme sayısı (None = BACKOFF_RETRIES, 0 = tek deneme)
+        """
+        bucket = self._buckets.get(backend)
+        retries = self.retries if retries is None else retries
+        for deneme in range(retries + 1):
+            if bucket is not None and not bucket.acquire(timeout=self.max_wait):
+                raise RateLimitError(f"{backend}: istek kotası dolu ({self.max_wait} sn beklendi)")
+            self._count("istek")
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                kota = is_quota_error(e)
+                if kota:
+                    self._count("kota_hatasi")
+                    if bucket is not None:
+                        bucket.penalize()
+                if not (kota or (idempotent and is_transient_error(e))) or deneme == retries:
+                    raise
+            self._count("tekrar")
+            time.sleep(self.backoff_delay(deneme))
+
+    def coalesce(self, key, func):
+        """Aynı anahtarla süren bir çağrı varsa onun sonucunu bekler: (sonuç, paylaşıldı_mı)"""
+        result, shared = self._flight.do(key, func)
+        if shared:
+            self._count("birlesen")
+        return result, shared
+
+    def stats(self):
+        """Debug ekranı için özet"""
+        with self._lock:
+            ozet = dict(self._counts)
+        ozet["suren_okuma"] = self._flight.in_flight()
+        ozet["bekleme_sn"] = {name: round(b.waited_seconds, 1) for name, b in self._buckets.items()}
+        return ozet
+
+
+# Süreç genelinde tek örnek
+backend_client = BackendClient()
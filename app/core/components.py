@@ -1,5 +1,8 @@
 import streamlit as st
 from app.core.help_content import get_help_text
+from app.core.config import REPORT_POLL_SECONDS
+from app.core.report_jobs import report_jobs, BEKLIYOR, CALISIYOR, HATA
+from app.core.database import get_freshness
 
 # Global Language Config (In a real app, this might come from session_state or user profile)
 DEFAULT_LANG = 'tr'
@@ -35,3 +38,90 @@ def render_help_button(module_key):
             {help_data['content']}
         </div>
         """, unsafe_allow_html=True)
+
+
+def render_report_job(key, target, build_args, file_name, mime, label=None,
+                      button_label="📄 Raporu Hazırla", button_type="primary"):
+    """
+    Raporu arka plan kuyruğunda üretir; ilerlemeyi ve hazır olunca indirme düğmesini gösterir.
+    
+    Args:
+        key (str): Ekrandaki benzersiz anahtar (aynı sayfada birden fazla rapor için)
+        target (str): 'paket.modul:fonksiyon' - raporu üreten fonksiyon
+        build_args (callable): Sadece düğmeye basılınca çağrılır, fonksiyon girdilerini (tuple) döndürür
+        file_name (str): İndirilecek dosya adı
+        mime (str): Dosya tipi
+    """
+    state_key = f"report_job_{key}"
+    if st.button(button_label, key=f"{state_key}_hazirla", type=button_type, use_container_width=True):
+        try:
+            st.session_state[state_key] = report_jobs.submit(target, *build_args(), label=label)
+        except Exception as e:
+            st.error(f"Rapor kuyruğa eklenemedi: {e}")
+    
+    job_id = st.session_state.get(state_key)
+    if not job_id:
+        return
+    
+    job = report_jobs.get(job_id)
+    if job is None:
+        st.caption("⌛ Hazırlanan raporun süresi doldu, lütfen yeniden hazırlayın.")
+    elif job.status in (BEKLIYOR, CALISIYOR):
+        _poll_report_job(job_id)
+    elif job.status == HATA:
+        st.error(f"Rapor hatası: {job.error}")
+    else:
+        st.download_button(
+            label="💾 İndir",
+            data=job.result,
+            file_name=file_name,
+            mime=mime,
+            key=f"{state_key}_indir",
+            use_container_width=True
+        )
+
+
+def _yas_metni(saniye):
+    if saniye is None:
+        return "-"
+    if saniye < 60:
+        return f"{int(saniye)} sn"
+    return f"{int(saniye // 60)} dk"
+
+
+def render_freshness_indicator(worksheets):
+    """
+    Ekrandaki verilerin tazeliğini tek satırda gösterir (en eski tablo esas alınır).
+    
+    Args:
+        worksheets (list): Ekranın kullandığı tablolar
+    """
+    durumlar = {ws: get_freshness(ws) for ws in worksheets}
+    yaslar = [d['yas_sn'] for d in durumlar.values() if d['yas_sn'] is not None]
+    en_eski = max(yaslar) if yaslar else None
+    
+    hatali = [ws for ws, d in durumlar.items() if d['hata']]
+    yenilenen = [ws for ws, d in durumlar.items() if d['durum'] == 'yenileniyor']
+    bayat = [ws for ws, d in durumlar.items() if d['durum'] == 'bayat']
+    
+    if en_eski is None:
+        st.caption("⚪ Veriler yükleniyor...")
+    elif hatali:
+        st.caption(f"🔴 Veriler {_yas_metni(en_eski)} önceki haliyle gösteriliyor (yenilenemedi: {', '.join(hatali)})")
+    elif yenilenen:
+        st.caption(f"🟡 Veriler {_yas_metni(en_eski)} önce alındı, arka planda yenileniyor...")
+    elif bayat:
+        st.caption(f"🟡 Veriler {_yas_metni(en_eski)} önce alındı")
+    else:
+        st.caption(f"🟢 Veriler güncel ({_yas_metni(en_eski)} önce alındı)")
+
+
+@st.fragment(run_every=REPORT_POLL_SECONDS)
+def _poll_report_job(job_id):
+    """Rapor hazırlanırken sadece bu parça yenilenir; bitince sayfa bir kez yeniden çizilir"""
+    job = report_jobs.get(job_id)
+    if job is None or job.status not in (BEKLIYOR, CALISIYOR):
+        st.rerun()
+        return
+    durum = "sırada bekliyor" if job.status == BEKLIYOR else "hazırlanıyor"
+    st.progress(job.progress, text=f"⏳ {job.label} {durum}...")
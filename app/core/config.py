@@ -4,6 +4,81 @@
 SESSION_TIMEOUT_SECONDS = 1800  # 30 Minutes
 PAGINATION_LIMIT = 50
 
+# --- STORAGE BACKEND ---
+# "gsheets" (Google Sheets) veya "sqlite" (yerel, çevrimdışı)
+# SMARTMILL_STORAGE ortam değişkeni ile ezilebilir
+STORAGE_BACKEND = "gsheets"
+SQLITE_DB_PATH = "smartmill_data.db"
+SQLITE_INDEX_COLUMNS = ("lot_no", "silo_isim", "batch_id", "parti_no")
+
+# --- SHARED TABLE CACHE ---
+# Tüm oturumların paylaştığı tablo cache'i için bellek sınırı (MB)
+TABLE_CACHE_MAX_MB = 256
+
+# --- AUDIT LOG QUEUE ---
+# log_activity olayları arka planda toplu yazılır
+AUDIT_BATCH_SIZE = 50          # Bu kadar olay birikince hemen yaz
+AUDIT_FLUSH_INTERVAL = 5       # En geç bu kadar saniyede bir yaz
+AUDIT_MAX_PENDING = 5000       # Bellekte tutulacak en fazla bekleyen olay
+AUDIT_SPOOL_PATH = "logs/audit_spool.jsonl"  # Yazılmamış olaylar (çökmeye karşı)
+
+# --- PARALLEL FETCH ---
+# fetch_many: birden fazla sekmeyi aynı anda çeker
+FETCH_MANY_WORKERS = 8         # Aynı anda en fazla kaç sekme çekilir
+FETCH_MANY_TIMEOUT = 20        # Toplu çekim için üst süre (saniye)
+
+# --- STALE-WHILE-REVALIDATE ---
+# Cache süresi dolan tablo (MAX_STALENESS sınırına kadar) hemen döner, arka planda yenilenir
+SWR_ENABLED = True
+SWR_WORKERS = 4                # Aynı anda en fazla kaç tablo arka planda yenilenir
+
+# --- TAIL SYNC (APPEND-ONLY TABLES) ---
+# Bu tablolarda cache yenilenirken sadece yeni (sona eklenmiş) satırlar çekilir.
+# Sadece son satır doğrulandığı için yerinde düzenlenen/silinen tablolar (tavli_analiz,
+# uretim_kaydi, bugday_giris_arsivi) burada OLMAMALI; onlar her zaman tam okunur.
+TAIL_SYNC_TABLES = ("hareketler", "audit_log")
+TAIL_SYNC_FULL_SECONDS = 900   # Bu süreden eski tam okumadan sonra kuyruk yerine yine tam okuma yapılır
+
+# --- TIME-PARTITIONED ARCHIVE ---
+# Eski satırlar dönem bölümlerine ({tablo}_arsiv_{YYYY_MM} / {tablo}_arsiv_{YYYY}) taşınır,
+# sıcak tabloda sadece son dönemler kalır. carry_forward: silo başına devir satırı yazılır
+ARCHIVE_SUFFIX = "_arsiv_"
+ARCHIVE_REGISTRY = "arsiv_bolumleri"   # Bölüm kayıt tablosu (tablo, bölüm, tarih aralığı, satır sayısı)
+ARCHIVE_TABLES = {
+    "hareketler": {"granularity": "month", "hot_months": 3, "date_column": "tarih", "carry_forward": True},
+    "audit_log": {"granularity": "month", "hot_months": 1, "date_column": "tarih", "carry_forward": False},
+}
+ARCHIVE_MIN_ROWS = 500         # Arşivlenecek satır bundan azsa otomatik arşivleme beklenir
+ARCHIVE_CHECK_SECONDS = 6 * 3600   # Otomatik arşiv kontrol aralığı (süreç başına)
+ARCHIVE_CACHE_SECONDS = 3600   # Bölümler değişmediği için uzun süre cache'te tutulur
+
+# --- LOCAL SNAPSHOTS ---
+# Her worksheet'in Parquet kopyası + sürüm işareti (soğuk başlangıçta diskten yükleme)
+SNAPSHOT_ENABLED = True
+SNAPSHOT_DIR = "data/snapshots"
+ETAG_CACHE_SECONDS = 5         # Sürüm işaretinin (Drive modifiedTime) tekrar sorulma aralığı
+
+# --- BACKEND RATE LIMIT ---
+# Motor başına (dakikalık istek, anlık en fazla istek); listede olmayan motor sınırsızdır
+BACKEND_RATE_LIMITS = {"gsheets": (60, 10)}   # Sheets API: kullanıcı başına 60 istek/dk
+BACKEND_MAX_WAIT = 30          # Sırada en fazla bekleme (saniye); aşılırsa son bilinen veri gösterilir
+BACKOFF_RETRIES = 5            # Kota hatasında en fazla tekrar deneme
+BACKOFF_BASE_SECONDS = 1       # Üstel bekleme tabanı (1, 2, 4, 8 ... sn, rastgele sapmalı)
+BACKOFF_MAX_SECONDS = 32       # Tek bekleme üst sınırı
+
+# --- TRACEABILITY ---
+LINEAGE_MAX_AGE = 300          # Soy ağacı indeksinin tam yeniden kurulum aralığı (dış yazmalar için, saniye)
+
+# --- SILO QUALITY SUMMARY ---
+SILO_QUALITY_MAX_AGE = 300     # Silo tavlı analiz toplamlarının tam yeniden kurulum aralığı (saniye)
+
+# --- REPORT JOBS ---
+# PDF / Excel raporları arka planda ayrı işlemlerde üretilir
+REPORT_WORKERS = 2             # Aynı anda en fazla kaç rapor üretilir
+REPORT_CACHE_SECONDS = 600     # Hazır raporun (aynı girdilerle) tekrar kullanılma süresi
+REPORT_MAX_JOBS = 50           # Bellekte tutulan en fazla iş sayısı
+REPORT_POLL_SECONDS = 1        # Ekranın iş durumunu yenileme aralığı
+
 # --- TERMINOLOGY STANDARDIZATION ---
 TERMS = {
     "rutubet": "Rutubet (%)",
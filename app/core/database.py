@@ -1,8 +1,21 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 import pandas as pd
-from streamlit_gsheets import GSheetsConnection
+import numpy as np
 import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+from app.core.config import (
+    FETCH_MANY_WORKERS, FETCH_MANY_TIMEOUT, TAIL_SYNC_TABLES, TAIL_SYNC_FULL_SECONDS, SWR_ENABLED, SWR_WORKERS,
+    ARCHIVE_CACHE_SECONDS
+)
+from app.core.storage import get_backend, add_write_listener, MissingColumnError, StorageError, _filter_mask, _key
+from app.core.table_cache import table_cache
+from app.core.audit_queue import audit_queue
+from app.core.snapshot_store import snapshot_store
+from app.core.schema import apply_schema, base_table
+from app.core.backend_client import backend_client, is_quota_error
 
 
 
@@ -24,10 +37,30 @@ CACHE_DURATIONS = {
     'default': 30            # Diğer tüm tablolar için varsayılan
 }
 
+# En fazla bayatlık (saniye) - cache süresi dolmuş tablo bu yaşa kadar beklemeden
+# gösterilir ve arka planda yenilenir; daha eskiyse okuma beklenir
+MAX_STALENESS = {
+    'silolar': 120,          # Stok ekranları: en fazla 2 dakika eski
+    'tavli_analiz': 300,
+    'kullanicilar': 3600,
+    'bugday_spekleri': 3600,
+    'audit_log': 120,
+    'default': 600
+}
+
+def get_cache_duration(worksheet_name):
+    """Tablonun cache süresi; arşiv bölümleri (değişmeyen eski dönemler) uzun süre tutulur"""
+    if base_table(worksheet_name) != worksheet_name:
+        return ARCHIVE_CACHE_SECONDS
+    return CACHE_DURATIONS.get(worksheet_name, CACHE_DURATIONS['default'])
+
 def get_conn():
-    """Google Sheets bağlantısını kurar"""
+    """
+    Aktif depolama motorunu döndürür (Google Sheets veya SQLite).
+    Dönen nesne read/update/append/update_where/delete_where/transaction destekler.
+    """
     try:
-        return st.connection("gsheets", type=GSheetsConnection)
+        return get_backend()
     except Exception as e:
         st.error(f"Bağlantı Hatası: {str(e)}")
         return None
@@ -49,10 +82,210 @@ def init_db():
         pass
     return False
 
+def _on_storage_write(worksheet_name, action, rows):
+    """
+    Depoya yapılan her yazmada paylaşımlı cache'i günceller.
+    Ekleme cache'e eklenir, diğer yazmalar tabloyu TÜM oturumlar için geçersiz kılar.
+    """
+    if action == "append":
+        # Yeni satırlar da tabloyla aynı tiplere dönüştürülür
+        table_cache.append(worksheet_name, apply_schema(worksheet_name, pd.DataFrame(rows)),
+                           normalize=lambda df: apply_schema(worksheet_name, df))
+    else:
+        table_cache.invalidate(worksheet_name)
+
+add_write_listener(_on_storage_write)
+
+def _safe_etag(conn, worksheet_name):
+    """Depodaki sürüm işareti (alınamazsa None - snapshot atlanır)"""
+    try:
+        return conn.etag(worksheet_name)
+    except Exception:
+        return None
+
+def _read_into_cache(conn, worksheet_name, use_snapshot=True):
+    """
+    Tabloyu okur ve paylaşımlı cache'e koyar (hata fırlatır).
+    Sürüm işareti diskteki Parquet snapshot ile aynıysa ağdan indirme yapılmaz.
+    
+    Aynı tabloyu aynı anda okumak isteyen oturumlar (ör. cache süresi herkes için
+    aynı anda dolduğunda) tek bir okumanın sonucunu paylaşır.
+    """
+    df, paylasildi = backend_client.coalesce(
+        (getattr(conn, 'name', None), worksheet_name, use_snapshot),
+        lambda: _read_into_cache_once(conn, worksheet_name, use_snapshot)
+    )
+    # Paylaşılan tablo diğer oturumla aynı nesnedir; değiştirilmesin diye kopyalanır
+    return df.copy() if paylasildi else df
+
+# Kuyruk senkronu durumu: tablo -> (son tam okuma zamanı, o anki sürüm işareti)
+_TAIL_SYNC_STATE = {}
+
+def _same_row(cached_row, stored_row, columns):
+    """Cache'teki satır depodaki satırla (ortak sütunlarda) aynı mı?"""
+    return all(_key(cached_row.get(col)) == _key(stored_row.get(col)) for col in columns)
+
+def _tail_sync(conn, worksheet_name):
+    """
+    Append-only tablolar için artımlı yenileme: cache'teki tablonun sadece
+    sonrasına eklenen satırlar çekilip eklenir.
+    
+    Cache'teki son satır depoda aynı konumda ve aynı değerlerle okunur (sınır satırı
+    kontrolü). Satır yoksa (silme) veya farklıysa (düzenleme / araya ekleme),
+    yeni sütun varsa ya da son tam okuma TAIL_SYNC_FULL_SECONDS'tan eskiyse None döner
+    ve tam okuma yapılır.
+    """
+    durum = _TAIL_SYNC_STATE.get(worksheet_name)
+    if worksheet_name not in TAIL_SYNC_TABLES or durum is None:
+        return None
+    if time.time() - durum[0] > TAIL_SYNC_FULL_SECONDS:
+        return None
+    
+    version = table_cache.version(worksheet_name)
+    cached = table_cache.get(worksheet_name)
+    if cached is None or cached.empty:
+        return None
+    
+    etag = _safe_etag(conn, worksheet_name)
+    if etag is not None and etag == durum[1]:
+        # Depo son okumadan beri hiç değişmedi: okuma yapmadan taze say
+        return table_cache.extend(worksheet_name, cached.iloc[0:0], version=version)
+    
+    try:
+        kuyruk = conn.read_tail(worksheet_name, len(cached) - 1)
+    except Exception as e:
+        if is_quota_error(e):
+            raise
+        return None
+    if kuyruk is None or kuyruk.empty or not set(kuyruk.columns) <= set(cached.columns):
+        return None
+    
+    kuyruk = apply_schema(worksheet_name, kuyruk.reset_index(drop=True))
+    if not _same_row(cached.iloc[-1], kuyruk.iloc[0], kuyruk.columns):
+        return None
+    
+    df = table_cache.extend(worksheet_name, kuyruk.iloc[1:], version=version,
+                            normalize=lambda d: apply_schema(worksheet_name, d))
+    if df is not None and etag != durum[1]:
+        snapshot_store.save(worksheet_name, df, etag)
+        _TAIL_SYNC_STATE[worksheet_name] = (durum[0], etag)
+    return df
+
+def _read_into_cache_once(conn, worksheet_name, use_snapshot=True):
+    # Append-only tablolarda önce sadece yeni satırlar denenir (force_refresh'te değil)
+    if use_snapshot:
+        df = _tail_sync(conn, worksheet_name)
+        if df is not None:
+            return df
+    
+    # Okuma sırasında başka oturum yazarsa eski veri cache'e konmasın
+    version = table_cache.version(worksheet_name)
+    
+    # Sürüm işareti OKUMADAN ÖNCE alınır: okuma sırasında yazma olursa
+    # snapshot eski işaretle kaydedilir ve bir sonraki açılışta yenilenir
+    etag = _safe_etag(conn, worksheet_name)
+    
+    df = snapshot_store.load(worksheet_name, etag) if use_snapshot else None
+    if df is None:
+        # ttl=0: cache'i paylaşımlı cache ve snapshot yönetir; streamlit-gsheets'in
+        # kendi 5 sn'lik cache'i yazmadan hemen sonra eski veriyi snapshot'a taşıyabilirdi
+        df = apply_schema(worksheet_name, conn.read(worksheet=worksheet_name, ttl=0))
+        snapshot_store.save(worksheet_name, df, etag)
+    else:
+        # Şema snapshot alındıktan sonra değişmiş olabilir (tipli sütunlar atlanır)
+        df = apply_schema(worksheet_name, df)
+    
+    # Paylaşımlı cache'e kaydet
+    if table_cache.put(worksheet_name, df, version=version) and worksheet_name in TAIL_SYNC_TABLES:
+        _TAIL_SYNC_STATE[worksheet_name] = (time.time(), etag)
+    return df
+
+def _cached_or_empty(worksheet_name):
+    """Süresi geçmiş olsa bile cache'teki son veriyi, yoksa boş tablo döndürür"""
+    cached = table_cache.get(worksheet_name)
+    return cached if cached is not None else pd.DataFrame()
+
+# ==================== BAYAT-İKEN-YENİLE (ARKA PLAN YENİLEME) ====================
+_REFRESH_EXECUTOR = ThreadPoolExecutor(max_workers=SWR_WORKERS, thread_name_prefix="swr")
+_REFRESH_LOCK = threading.Lock()
+_REFRESHING = {}        # tablo -> yenileme başlangıcı
+_REFRESH_ERRORS = {}    # tablo -> (zaman, hata metni)
+
+def _refresh_in_background(conn, worksheet_name):
+    """Tabloyu arka planda yeniden okur (aynı tablo için tek yenileme)"""
+    with _REFRESH_LOCK:
+        if worksheet_name in _REFRESHING:
+            return
+        _REFRESHING[worksheet_name] = time.time()
+    
+    def yenile():
+        try:
+            _read_into_cache(conn, worksheet_name)
+            _REFRESH_ERRORS.pop(worksheet_name, None)
+        except Exception as e:
+            _REFRESH_ERRORS[worksheet_name] = (time.time(), str(e))
+        finally:
+            with _REFRESH_LOCK:
+                _REFRESHING.pop(worksheet_name, None)
+    
+    try:
+        _REFRESH_EXECUTOR.submit(yenile)
+    except RuntimeError:
+        # Kapanış sırasında havuz kapalı
+        with _REFRESH_LOCK:
+            _REFRESHING.pop(worksheet_name, None)
+
+def _stale_or_none(worksheet_name):
+    """
+    Süresi dolmuş ama MAX_STALENESS içindeki tabloyu döndürür ve arka plan yenilemesi başlatır.
+    Bayat kopya yoksa (veya çok eskiyse) None - çağıran okumayı bekler.
+    """
+    if not SWR_ENABLED:
+        return None
+    max_staleness = MAX_STALENESS.get(worksheet_name, MAX_STALENESS['default'])
+    if base_table(worksheet_name) != worksheet_name:
+        # Arşiv bölümü: eski dönem değişmez, bir cache süresi daha bayat gösterilebilir
+        max_staleness = 2 * ARCHIVE_CACHE_SECONDS
+    stale = table_cache.get(worksheet_name, max_age=max_staleness)
+    if stale is None:
+        return None
+    conn = get_conn()
+    if conn is None:
+        return stale
+    _refresh_in_background(conn, worksheet_name)
+    return stale
+
+def get_freshness(worksheet_name):
+    """
+    Tablonun cache tazeliği (dashboard göstergesi için).
+    
+    Returns:
+        dict: yas_sn (None = cache'te yok), durum ('taze' | 'yenileniyor' | 'bayat' | 'yok'),
+              hata (son arka plan yenileme hatası veya None)
+    """
+    yas = table_cache.age(worksheet_name)
+    with _REFRESH_LOCK:
+        yenileniyor = worksheet_name in _REFRESHING
+    hata = _REFRESH_ERRORS.get(worksheet_name)
+    
+    if yas is None:
+        durum = 'yenileniyor' if yenileniyor else 'yok'
+    elif yenileniyor:
+        durum = 'yenileniyor'
+    elif yas < get_cache_duration(worksheet_name):
+        durum = 'taze'
+    else:
+        durum = 'bayat'
+    return {'yas_sn': None if yas is None else round(yas, 1), 'durum': durum, 'hata': hata[1] if hata else None}
+
 def fetch_data(worksheet_name, force_refresh=False):
     """
     Belirtilen sekmedeki tüm verileri çeker (OPTİMİZE EDİLMİŞ - CACHE'Lİ)
     
+    Cache tüm oturumlar arasında paylaşılır; aynı tablo kaç kullanıcı
+    bağlı olursa olsun TTL süresince bir kez indirilir.
+    Açık bir unit_of_work() içinde, o işte yazılan tablo bekleyen değişikliklerle döner.
+    
     Args:
         worksheet_name: Google Sheets sekme adı
         force_refresh: True ise cache'i atla, direkt API'den çek
@@ -60,90 +293,195 @@ def fetch_data(worksheet_name, force_refresh=False):
     Returns:
         DataFrame: Sekmedeki veriler
     """
+    uow = current_unit_of_work()
+    if uow is not None and uow.touches(worksheet_name):
+        return uow.view(worksheet_name)
+    return _fetch_data(worksheet_name, force_refresh)
+
+def _fetch_data(worksheet_name, force_refresh=False):
+    """fetch_data gövdesi (unit of work görünümü olmadan)"""
     try:
-        current_time = time.time()
-        
         # Cache süresini belirle
-        cache_duration = CACHE_DURATIONS.get(worksheet_name, CACHE_DURATIONS['default'])
+        cache_duration = get_cache_duration(worksheet_name)
         
         # Cache kontrol et (force_refresh yoksa)
-        if not force_refresh and worksheet_name in st.session_state.db_cache:
-            last_fetch = st.session_state.db_cache_time.get(worksheet_name, 0)
-            
-            # Cache hala geçerli mi?
-            if current_time - last_fetch < cache_duration:
+        if not force_refresh:
+            cached = table_cache.get(worksheet_name, max_age=cache_duration)
+            if cached is not None:
                 # Cache'den dön (API çağrısı YOK)
-                return st.session_state.db_cache[worksheet_name].copy()
+                return cached
+            
+            # Süresi yeni dolduysa beklemeden bayat kopya, yenileme arka planda
+            stale = _stale_or_none(worksheet_name)
+            if stale is not None:
+                return stale
         
         # Cache geçersiz veya yok - API'den çek
         conn = get_conn()
         if conn:
-            # ttl=5 ile streamlit-gsheets kendi cache'ini de kullanır
-            df = conn.read(worksheet=worksheet_name, ttl=5)
-            
-            # Session cache'e kaydet
-            st.session_state.db_cache[worksheet_name] = df.copy()
-            st.session_state.db_cache_time[worksheet_name] = current_time
-            
-            return df
+            return _read_into_cache(conn, worksheet_name, use_snapshot=not force_refresh)
         else:
             # Bağlantı yoksa eski cache'i dön (varsa)
-            if worksheet_name in st.session_state.db_cache:
-                return st.session_state.db_cache[worksheet_name].copy()
-            return pd.DataFrame()
+            return _cached_or_empty(worksheet_name)
             
     except Exception as e:
+        if is_quota_error(e):
+            # Kota dolu: hata değil, yoğunluk - son bilinen veri gösterilir
+            cached = _cached_or_empty(worksheet_name)
+            if cached.empty:
+                st.warning(f"⏳ Sistem yoğun, {worksheet_name} verisi birazdan yüklenecek. Lütfen sayfayı yenileyin.")
+            return cached
+        
         st.error(f"Veri çekme hatası ({worksheet_name}): {str(e)}")
         
         # Hata durumunda eski cache'i dön (varsa)
-        if worksheet_name in st.session_state.db_cache:
-            return st.session_state.db_cache[worksheet_name].copy()
-        return pd.DataFrame()
+        return _cached_or_empty(worksheet_name)
 
-def add_data(worksheet_name, data_dict):
-    """Google Sheets'e yeni bir satır ekler ve cache'i temizler"""
+def _with_script_ctx(func):
+    """
+    Thread içinde st.* çağrıları uyarı vermesin diye aktif Streamlit
+    script bağlamını işçi thread'e taşır (bağlam yoksa fonksiyonu aynen döndürür).
+    """
     try:
-        conn = get_conn()
-        df = fetch_data(worksheet_name, force_refresh=True)  # Ekleme öncesi güncel veri
-        
-        # Yeni veriyi DataFrame'e dönüştür
-        new_row = pd.DataFrame([data_dict])
-        
-        # Mevcut verinin altına ekle
-        updated_df = pd.concat([df, new_row], ignore_index=True)
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except Exception:
+        return func
+    if ctx is None:
+        return func
+    
+    def wrapper(*args, **kwargs):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return func(*args, **kwargs)
+    return wrapper
+
+def fetch_many(worksheet_names, force_refresh=False, timeout=FETCH_MANY_TIMEOUT):
+    """
+    Birden fazla sekmeyi AYNI ANDA çeker (thread havuzu).
+    Toplam süre en yavaş sekme kadardır, sürelerin toplamı kadar değil.
+    
+    Her sekme bağımsızdır: biri hata verir veya zaman aşımına uğrarsa
+    diğerleri etkilenmez; o sekme için cache'teki son veri (yoksa boş tablo) döner.
+    
+    Args:
+        worksheet_names: Sekme adları listesi
+        force_refresh: True ise cache atlanır
+        timeout: Tüm çekim için saniye cinsinden üst sınır
+    
+    Returns:
+        dict: {sekme_adı: DataFrame} (istek sırasıyla)
+    """
+    names = list(dict.fromkeys(worksheet_names))
+    results = {}
+    
+    # 1. Cache'te taze olanlar (thread açmaya gerek yok)
+    eksik = []
+    for name in names:
+        if not force_refresh:
+            cache_duration = get_cache_duration(name)
+            cached = table_cache.get(name, max_age=cache_duration)
+            if cached is None:
+                cached = _stale_or_none(name)
+            if cached is not None:
+                results[name] = cached
+                continue
+        eksik.append(name)
+    
+    if not eksik:
+        return {name: results[name] for name in names}
+    
+    conn = get_conn()
+    if conn is None:
+        for name in eksik:
+            results[name] = _cached_or_empty(name)
+        return {name: results[name] for name in names}
+    
+    # 2. Eksikleri paralel çek
+    okuyucu = _with_script_ctx(_read_into_cache)
+    executor = ThreadPoolExecutor(max_workers=min(FETCH_MANY_WORKERS, len(eksik)))
+    try:
+        futures = {executor.submit(okuyucu, conn, name, not force_refresh): name for name in eksik}
+        tamamlanan, bekleyen = wait(futures, timeout=timeout)
         
-        # Sayfayı güncelle
-        conn.update(worksheet=worksheet_name, data=updated_df)
+        hatalar = []
+        for future in tamamlanan:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = _cached_or_empty(name)
+                # Kota doluyken son bilinen veri varsa sessizce o gösterilir
+                if not (is_quota_error(e) and not results[name].empty):
+                    hatalar.append(f"{name}: {str(e)}")
         
-        # CACHE'İ TEMİZLE - Bu worksheet için yeni veri var
-        if worksheet_name in st.session_state.db_cache:
-            del st.session_state.db_cache[worksheet_name]
-        if worksheet_name in st.session_state.db_cache_time:
-            del st.session_state.db_cache_time[worksheet_name]
+        for future in bekleyen:
+            name = futures[future]
+            hatalar.append(f"{name}: zaman aşımı ({timeout} sn)")
+            results[name] = _cached_or_empty(name)
         
+        if hatalar:
+            st.warning("⚠️ Bazı tablolar yüklenemedi, son bilinen veriler gösteriliyor: " + " | ".join(hatalar))
+    finally:
+        # Zaman aşımına uğrayan okumaları bekleme
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return {name: results[name] for name in names}
+
+def _append_rows(conn, worksheet_name, rows):
+    """
+    Satırları tablonun sonuna ekler (hata fırlatır, mesaj göstermez).
+    Yalnızca yeni satırlar gönderilir; maliyet tablo boyutundan bağımsızdır.
+    """
+    conn.append(worksheet_name, rows)
+
+def append_rows(worksheet_name, rows):
+    """
+    Birden fazla satırı tek seferde tablonun sonuna ekler.
+    
+    Args:
+        worksheet_name: Google Sheets sekme adı
+        rows: Eklenecek satırlar (dict listesi)
+    
+    Returns:
+        bool: Başarı durumu
+    """
+    rows = [dict(row) for row in rows if row]
+    if not rows:
+        return True
+    uow = current_unit_of_work()
+    if uow is not None:
+        uow.append(worksheet_name, rows)
+        return True
+    try:
+        conn = get_conn()
+        if conn is None:
+            return False
+        _append_rows(conn, worksheet_name, rows)
         return True
     except Exception as e:
         st.error(f"Veri ekleme hatası: {str(e)}")
         return False
 
+def add_data(worksheet_name, data_dict):
+    """Tabloya yeni bir satır ekler (append - tüm sayfa yeniden yazılmaz)"""
+    return append_rows(worksheet_name, [data_dict])
+
+def flush_audit_log():
+    """Kuyrukta bekleyen audit olaylarını hemen yazar (admin log ekranı için)"""
+    try:
+        return audit_queue.flush()
+    except Exception:
+        return False
+
 def clear_cache(worksheet_name=None):
     """
-    Cache'i temizler
+    Cache'i temizler (paylaşımlı cache - tüm oturumları etkiler)
     
     Args:
         worksheet_name: Belirli bir worksheet'in cache'ini temizle. 
                        None ise tüm cache'i temizle.
     """
-    if worksheet_name:
-        # Sadece belirtilen worksheet'i temizle
-        if worksheet_name in st.session_state.db_cache:
-            del st.session_state.db_cache[worksheet_name]
-        if worksheet_name in st.session_state.db_cache_time:
-            del st.session_state.db_cache_time[worksheet_name]
-    else:
-        # Tüm cache'i temizle
-        st.session_state.db_cache = {}
-        st.session_state.db_cache_time = {}
+    table_cache.invalidate(worksheet_name)
 
 def update_data(worksheet_name, df_updated):
     """
@@ -156,6 +494,10 @@ def update_data(worksheet_name, df_updated):
     Returns:
         bool: Başarı durumu
     """
+    uow = current_unit_of_work()
+    if uow is not None:
+        uow.replace(worksheet_name, df_updated)
+        return True
     try:
         conn = get_conn()
         if conn:
@@ -171,14 +513,17 @@ def update_data(worksheet_name, df_updated):
         return False
 
 
-def update_row_by_filter(worksheet_name, filter_dict, update_dict):
+def update_row_by_filter(worksheet_name, filter_dict, update_dict, add_columns=False):
     """
-    Belirli bir satırı filtre ile bulup günceller
+    Belirli bir satırı filtre ile bulup günceller.
+    Tablo indirilip yeniden yazılmaz; sadece değişen hücreler gönderilir
+    (ilk filtre sütunu satır indeksinin anahtarıdır).
     
     Args:
         worksheet_name: Sekme adı
         filter_dict: Filtreleme kriteri (örn: {'lot_no': 'UN-123'})
         update_dict: Güncellenecek değerler (örn: {'protein': 12.5})
+        add_columns: True ise tabloda olmayan sütunlar oluşturulur
     
     Returns:
         tuple: (başarı: bool, mesaj: str)
@@ -189,41 +534,35 @@ def update_row_by_filter(worksheet_name, filter_dict, update_dict):
                             {'protein': 12.5, 'gluten': 28.0})
     """
     try:
-        df = fetch_data(worksheet_name, force_refresh=True)
+        uow = current_unit_of_work()
+        if uow is not None:
+            guncellenen = uow.patch(worksheet_name, filter_dict, update_dict, add_columns=add_columns)
+            if guncellenen == 0:
+                return False, "Eşleşen kayıt bulunamadı!"
+            return True, "Güncelleme başarılı!"
         
-        if df.empty:
-            return False, f"{worksheet_name} tablosu boş!"
+        conn = get_conn()
+        if conn is None:
+            return False, "Veritabanı bağlantısı kurulamadı!"
         
-        # Filtre uygula
-        mask = pd.Series([True] * len(df))
-        for key, value in filter_dict.items():
-            if key not in df.columns:
-                return False, f"'{key}' sütunu bulunamadı!"
-            mask &= (df[key] == value)
+        guncellenen = conn.update_where(worksheet_name, filter_dict, update_dict, add_columns=add_columns)
+        clear_cache(worksheet_name)
         
         # Eşleşen satır var mı?
-        if not mask.any():
+        if guncellenen == 0:
             return False, "Eşleşen kayıt bulunamadı!"
         
-        # Güncelle
-        for key, value in update_dict.items():
-            if key not in df.columns:
-                return False, f"'{key}' sütunu bulunamadı!"
-            df.loc[mask, key] = value
-        
-        # Kaydet
-        if update_data(worksheet_name, df):
-            return True, "Güncelleme başarılı!"
-        else:
-            return False, "Güncelleme sırasında hata oluştu!"
+        return True, "Güncelleme başarılı!"
         
+    except MissingColumnError as e:
+        return False, str(e)
     except Exception as e:
         return False, f"Hata: {str(e)}"
 
 
 def delete_rows_by_filter(worksheet_name, filter_dict):
     """
-    Belirli satırları filtre ile bulup siler
+    Belirli satırları filtre ile bulup siler (sadece eşleşen satırlar silinir)
     
     Args:
         worksheet_name: Sekme adı
@@ -233,38 +572,320 @@ def delete_rows_by_filter(worksheet_name, filter_dict):
         tuple: (başarı: bool, mesaj: str, silinen_satir_sayisi: int)
     """
     try:
-        df = fetch_data(worksheet_name, force_refresh=True)
-        
-        if df.empty:
-            return False, "Tablo zaten boş!", 0
-        
-        # Filtre uygula
-        mask = pd.Series([True] * len(df))
-        for key, value in filter_dict.items():
-            if key not in df.columns:
-                return False, f"'{key}' sütunu bulunamadı!", 0
-            mask &= (df[key] == value)
-        
-        silinen_sayi = mask.sum()
+        uow = current_unit_of_work()
+        if uow is not None:
+            silinen_sayi = uow.delete(worksheet_name, filter_dict)
+        else:
+            conn = get_conn()
+            if conn is None:
+                return False, "Veritabanı bağlantısı kurulamadı!", 0
+            
+            silinen_sayi = conn.delete_where(worksheet_name, filter_dict)
+            clear_cache(worksheet_name)
         
         if silinen_sayi == 0:
             return False, "Silinecek kayıt bulunamadı!", 0
         
-        # Sil
-        df_new = df[~mask]
-        
-        if update_data(worksheet_name, df_new):
-            return True, f"{silinen_sayi} kayıt silindi!", silinen_sayi
-        else:
-            return False, "Silme işlemi başarısız!", 0
+        return True, f"{silinen_sayi} kayıt silindi!", silinen_sayi
         
+    except MissingColumnError as e:
+        return False, str(e), 0
     except Exception as e:
         return False, f"Hata: {str(e)}", 0
 
+# ==================== UNIT OF WORK (TOPLU YAZMA) ====================
+_UOW = threading.local()
+
+def _row_matches(row, filter_dict):
+    """Bekleyen (dict) satır filtreye uyuyor mu?"""
+    return all(_key(row.get(k)) == _key(v) for k, v in filter_dict.items())
+
+class _PendingTable:
+    """Bir tablonun işlem boyunca bekleyen değişiklikleri"""
+    
+    def __init__(self):
+        self.base = None        # İşlem içinde ilk okunan hali (görünüm + geri alma için)
+        self.replace = None     # update_data ile verilen tam tablo (varsa diğerlerini kapsar)
+        self.patches = []       # [(filter_dict, update_dict), ...] - base satırlarına
+        self.deletes = []       # [filter_dict, ...] - güncellenmiş base satırlarına
+        self.appends = []       # Eklenecek satırlar (dict)
+        self.add_columns = False
+
+class UnitOfWork:
+    """
+    Çok adımlı stok işlemleri için toplu yazma.
+    
+    Blok içindeki add_data / append_rows / update_row_by_filter / delete_rows_by_filter /
+    update_data çağrıları depoya gitmez, tablo başına biriktirilir; fetch_data bu tabloları
+    bekleyen değişikliklerle döndürür (kendi yazdığını okur). Blok bitince her tablo için
+    sırayla güncelleme, silme ve tek ekleme (veya tek tam yazma) yapılır.
+    
+    Ya hep ya hiç: blok içinde hata olursa hiçbir şey yazılmaz. SQLite'ta tüm yazmalar
+    tek işlemdedir; Google Sheets'te yarıda kalan yazmalar ters işlemle geri alınır.
+    Ters işlem satırları tek tek bulabilmelidir: işlem desteği olmayan motorda id'siz
+    satır ekleme veya birden çok satırı id'siz güncelleme yazmadan önce reddedilir.
+    """
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self._tables = {}
+    
+    def touches(self, worksheet):
+        return worksheet in self._tables
+    
+    def _table(self, worksheet, load_base=True):
+        tablo = self._tables.setdefault(worksheet, _PendingTable())
+        if load_base and tablo.base is None:
+            tablo.base = _fetch_data(worksheet)
+        return tablo
+    
+    @staticmethod
+    def _patched_base(tablo):
+        """base + bekleyen güncellemeler (silmeler henüz uygulanmamış)"""
+        df = tablo.base.copy()
+        for filter_dict, update_dict in tablo.patches:
+            mask = _filter_mask(df, filter_dict)
+            for key, value in update_dict.items():
+                df.loc[mask, key] = value
+        return df
+    
+    @staticmethod
+    def _deleted_mask(tablo, df):
+        """Bekleyen silmelerin düştüğü satırlar"""
+        mask = np.zeros(len(df), dtype=bool)
+        if not df.empty:
+            for filter_dict in tablo.deletes:
+                mask |= _filter_mask(df, filter_dict)
+        return mask
+    
+    def view(self, worksheet):
+        """Tablonun bekleyen değişiklikler uygulanmış hali"""
+        tablo = self._table(worksheet)
+        if tablo.replace is not None:
+            return tablo.replace.copy()
+        
+        df = self._patched_base(tablo)
+        if tablo.deletes:
+            df = df[~self._deleted_mask(tablo, df)].reset_index(drop=True)
+        if tablo.appends:
+            yeni = apply_schema(worksheet, pd.DataFrame(tablo.appends))
+            df = yeni if df.empty else pd.concat([df, yeni], ignore_index=True)
+        return df
+    
+    def append(self, worksheet, rows):
+        tablo = self._table(worksheet, load_base=False)
+        if tablo.replace is not None:
+            yeni = apply_schema(worksheet, pd.DataFrame(rows))
+            tablo.replace = pd.concat([tablo.replace, yeni], ignore_index=True)
+        else:
+            tablo.appends.extend(dict(row) for row in rows)
+    
+    def replace(self, worksheet, df):
+        tablo = self._table(worksheet)
+        tablo.replace = pd.DataFrame(df).reset_index(drop=True)
+        tablo.patches, tablo.deletes, tablo.appends = [], [], []
+    
+    def patch(self, worksheet, filter_dict, update_dict, add_columns=False):
+        """Güncellemeyi biriktirir; eşleşen satır sayısını döndürür (MissingColumnError fırlatabilir)"""
+        tablo = self._table(worksheet)
+        df = tablo.replace if tablo.replace is not None else tablo.base
+        if not add_columns:
+            for key in update_dict:
+                if key not in df.columns:
+                    raise MissingColumnError(key)
+        mask = _filter_mask(df, filter_dict) if not df.empty else None
+        if mask is not None and tablo.replace is None and tablo.deletes:
+            # Bu işte silinmiş satırlar sayılmaz
+            mask &= ~self._deleted_mask(tablo, self._patched_base(tablo))
+        
+        if tablo.replace is not None:
+            if mask is None:
+                return 0
+            for key, value in update_dict.items():
+                tablo.replace.loc[mask, key] = value
+            return int(mask.sum())
+        
+        # Aynı işlemde eklenen satırlar bellekte güncellenir (ayrıca yazılmaz)
+        eklenen = [row for row in tablo.appends if _row_matches(row, filter_dict)]
+        for row in eklenen:
+            row.update(update_dict)
+        
+        eslesen = 0 if mask is None else int(mask.sum())
+        if eslesen:
+            tablo.add_columns = tablo.add_columns or add_columns
+            for onceki_filtre, onceki_guncelleme in tablo.patches:
+                if onceki_filtre == filter_dict:
+                    onceki_guncelleme.update(update_dict)
+                    break
+            else:
+                tablo.patches.append((dict(filter_dict), dict(update_dict)))
+        return eslesen + len(eklenen)
+    
+    def delete(self, worksheet, filter_dict):
+        """Silmeyi biriktirir; silinecek satır sayısını döndürür (MissingColumnError fırlatabilir)"""
+        tablo = self._table(worksheet)
+        if tablo.replace is not None:
+            if tablo.replace.empty:
+                return 0
+            mask = _filter_mask(tablo.replace, filter_dict)
+            tablo.replace = tablo.replace[~mask].reset_index(drop=True)
+            return int(mask.sum())
+        
+        # Aynı işlemde eklenen satırlar hiç yazılmaz
+        kalan = [row for row in tablo.appends if not _row_matches(row, filter_dict)]
+        silinen = len(tablo.appends) - len(kalan)
+        tablo.appends = kalan
+        
+        df = self._patched_base(tablo)
+        mask = _filter_mask(df, filter_dict) & ~self._deleted_mask(tablo, df)
+        if mask.any():
+            tablo.deletes.append(dict(filter_dict))
+        return silinen + int(mask.sum())
+    
+    @staticmethod
+    def _row_filter(base, position, filter_dict, eslesen):
+        """Ters işlem için tek satırı bulan filtre: benzersiz id, yoksa tek satıra uyan asıl filtre"""
+        if 'id' in base.columns:
+            kimlik = base['id'].iloc[position]
+            if _key(kimlik) != '' and int((base['id'].map(_key) == _key(kimlik)).sum()) == 1:
+                return {'id': kimlik}
+        if eslesen == 1:
+            return dict(filter_dict)
+        return None
+    
+    def _undo_patches(self, worksheet, tablo):
+        """Güncellemelerin ters işlemi: eşleşen her satır kendi eski değerine döner"""
+        ters = []
+        for filter_dict, update_dict in tablo.patches:
+            mask = _filter_mask(tablo.base, filter_dict)
+            for position in np.flatnonzero(mask):
+                satir_filtresi = self._row_filter(tablo.base, position, filter_dict, int(mask.sum()))
+                if satir_filtresi is None:
+                    raise StorageError(
+                        f"{worksheet}: {filter_dict} birden çok id'siz satıra uyuyor, güncelleme geri alınamaz"
+                    )
+                eski = tablo.base.iloc[position]
+                ters.append((satir_filtresi, {k: (eski[k] if k in eski.index else None) for k in update_dict}))
+        return lambda: self.conn.update_many(worksheet, ters, add_columns=True)
+    
+    def _undo_deletes(self, worksheet, tablo):
+        """Silmelerin ters işlemi: silinen satırlar (güncellenmiş halleriyle) yeniden eklenir"""
+        df = self._patched_base(tablo)
+        silinen = df[self._deleted_mask(tablo, df)].to_dict('records')
+        return lambda: self.conn.append(worksheet, silinen)
+    
+    def _undo_appends(self, worksheet, rows):
+        if any(row.get('id') in (None, '') for row in rows):
+            raise StorageError(f"{worksheet}: id'siz satır eklemesi geri alınamaz")
+        kimlikler = [row['id'] for row in rows]
+        def geri_al():
+            for kimlik in kimlikler:
+                self.conn.delete_where(worksheet, {'id': kimlik})
+        return geri_al
+    
+    def _compensations(self):
+        """
+        Tablo başına ters işlemler (yazmadan ÖNCE hazırlanır; geri alınamayacak
+        bir değişiklik varsa hiçbir şey yazılmadan StorageError fırlar)
+        """
+        planlar = {}
+        for worksheet, tablo in self._tables.items():
+            plan = {}
+            if tablo.replace is not None:
+                plan['replace'] = lambda ws=worksheet, df=tablo.base: self.conn.update(worksheet=ws, data=df)
+            else:
+                if tablo.patches:
+                    plan['patches'] = self._undo_patches(worksheet, tablo)
+                if tablo.deletes:
+                    plan['deletes'] = self._undo_deletes(worksheet, tablo)
+                if tablo.appends:
+                    plan['appends'] = self._undo_appends(worksheet, tablo.appends)
+            planlar[worksheet] = plan
+        return planlar
+    
+    def commit(self):
+        """Bekleyen yazmaları tablo başına tek seferde gönderir"""
+        planlar = {} if self.conn.atomic else self._compensations()
+        geri_al = []
+        
+        def yazildi(worksheet, adim):
+            if worksheet in planlar:
+                geri_al.append(planlar[worksheet][adim])
+        
+        try:
+            with self.conn.transaction():
+                for worksheet, tablo in self._tables.items():
+                    if tablo.replace is not None:
+                        self.conn.update(worksheet=worksheet, data=tablo.replace)
+                        yazildi(worksheet, 'replace')
+                        continue
+                    if tablo.patches:
+                        self.conn.update_many(worksheet, tablo.patches, add_columns=tablo.add_columns)
+                        yazildi(worksheet, 'patches')
+                    if tablo.deletes:
+                        for filter_dict in tablo.deletes:
+                            self.conn.delete_where(worksheet, filter_dict)
+                        yazildi(worksheet, 'deletes')
+                    if tablo.appends:
+                        self.conn.append(worksheet, tablo.appends)
+                        yazildi(worksheet, 'appends')
+        except Exception:
+            if not self.conn.atomic:
+                # İşlem desteği olmayan motor: yapılan yazmaları sondan başa geri al
+                for geri in reversed(geri_al):
+                    try:
+                        geri()
+                    except Exception:
+                        pass
+            raise
+        self._tables = {}
+    
+    def stats(self):
+        return {ws: {"ekleme": len(t.appends), "guncelleme": len(t.patches), "silme": len(t.deletes),
+                     "tam_yazma": t.replace is not None}
+                for ws, t in self._tables.items()}
+
+def current_unit_of_work():
+    """Bu thread'de açık unit of work (yoksa None)"""
+    return getattr(_UOW, 'aktif', None)
+
+@contextmanager
+def unit_of_work():
+    """
+    Çok adımlı yazmaları tek bir toplu yazmada birleştirir (ya hep ya hiç).
+    
+    Örnek:
+        with unit_of_work():
+            log_stok_hareketi(kaynak, "Çıkış", 10)
+            log_stok_hareketi(hedef, "Giriş", 10)
+    
+    Blokta hata olursa hiçbir şey yazılmaz; yazma sırasında hata olursa
+    StorageError fırlatılır. İç içe kullanımda dıştaki işe katılır.
+    """
+    mevcut = current_unit_of_work()
+    if mevcut is not None:
+        yield mevcut
+        return
+    
+    conn = get_conn()
+    if conn is None:
+        raise StorageError("Veritabanı bağlantısı kurulamadı!")
+    
+    uow = UnitOfWork(conn)
+    _UOW.aktif = uow
+    try:
+        yield uow
+    finally:
+        _UOW.aktif = None
+    uow.commit()
+
 def log_activity(modul, islem, detay=""):
     """
     Kullanıcı aktivitelerini audit_log sheet'ine kaydeder.
     Tüm modüllerden çağrılır. Hata durumunda sistemi durdurmaz.
+    
+    Olay kuyruğa alınır ve arka planda toplu yazılır; çağıran taraf
+    ağ gidiş-dönüşü beklemez (bkz. app/core/audit_queue.py).
 
     Args:
         modul : Hangi modül  (örn: "Buğday Yönetimi")
@@ -286,17 +907,8 @@ def log_activity(modul, islem, detay=""):
 
         conn = get_conn()
         if conn:
-            try:
-                df_log = conn.read(worksheet="audit_log", ttl=1)
-            except:
-                df_log = pd.DataFrame(columns=["tarih","kullanici","rol","modul","islem","detay"])
-
-            if df_log is None or df_log.empty:
-                df_log = pd.DataFrame(columns=["tarih","kullanici","rol","modul","islem","detay"])
-
-            yeni_satir = pd.DataFrame([log_verisi])
-            df_log = pd.concat([df_log, yeni_satir], ignore_index=True)
-            conn.update(worksheet="audit_log", data=df_log)
+            audit_queue.bind(conn)
+        audit_queue.enqueue(log_verisi)
 
     except Exception:
         pass
@@ -0,0 +1,331 @@
+"""
+İZLENEBİLİRLİK SOY AĞACI İNDEKSİ (LINEAGE INDEX)
+lot_no / batch_id / parti_no / enzim_id anahtarları üzerinden komşuluk listesi.
+Tablolar bir kez taranır, sonraki her yazma indekse artımlı işlenir;
+zincir sorguları tablo boyutundan bağımsız olarak halka sayısı kadar adım sürer.
+"""
+
+import bisect
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import LINEAGE_MAX_AGE
+from app.core.schema import apply_schema
+from app.core.storage import add_write_listener
+
+# Tablo -> (kayıt kimliği sütunları, kaynak / üst halka sütunları)
+# Kimlik: ilk dolu sütun kullanılır. Kaynak: dolu olan tüm sütunlar kenar olur.
+LINEAGE_TABLES = {
+    "un_analiz": (['lot_no'], ['kaynak_parti_no', 'uretim_lot_no', 'kullanilan_pacal']),
+    "uretim_kaydi": (['parti_no'], ['kullanilan_pacal', 'mixing_batch_id']),
+    "mixing_batches": (['batch_id'], []),
+    "enzim_receteleri": (['enzim_id'], ['uretim_kodu']),
+    "sevkiyat_listesi": (['sevkiyat_no', 'lot_no', 'id'], ['kaynak_parti_no', 'uretim_lot_no', 'parti_no']),
+    "bugday_giris_arsivi": (['lot_no'], []),
+}
+
+# Buğday lotu -> paçal kenarları bu tablodan (silo giriş / boşalma zamanları) türetilir
+MOVEMENTS_TABLE = "hareketler"
+
+# Silonun boş sayıldığı stok seviyesi (ton)
+_BOS_SILO_TON = 1e-6
+
+
+def normalize_key(value):
+    """Anahtar karşılaştırması büyük/küçük harf ve boşluk duyarsızdır"""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    key = str(value).strip().upper()
+    if key.endswith('.0') and key[:-2].isdigit():
+        key = key[:-2]
+    return key if key and key not in ('NAN', 'NONE', '-') else None
+
+
+def _ref_keys(value):
+    """Kaynak alanındaki referans(lar)ı ayıklar ('MIX-1 | Ekmeklik' gibi etiketler dahil)"""
+    key = normalize_key(value)
+    if key is None:
+        return []
+    parcalar = [normalize_key(p) for p in key.replace(',', '|').split('|')]
+    return [p for p in parcalar if p]
+
+
+class LineageIndex:
+    """
+    Süreç genelinde paylaşılan soy ağacı.
+
+    - records: anahtar -> [(tablo, satır dict), ...]
+    - parents: anahtar -> {üst halka anahtarları}   (ör. PRD -> MIX)
+    - children: anahtar -> {alt halka anahtarları}  (ör. MIX -> PRD, ENZ, LAB)
+    """
+
+    def __init__(self, tables=LINEAGE_TABLES, max_age=LINEAGE_MAX_AGE):
+        self.tables = tables
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._reset()
+
+    def _reset(self):
+        self.records = {}
+        self.parents = {}
+        self.children = {}
+        self._sorted_keys = None
+        self._movements = None
+        self._derived = set()       # silo üzerinden türetilmiş (lot, paçal) kenarları
+        self._silo_links_dirty = True
+
+    # --- Kurulum ---
+    def build(self, frames):
+        """Tabloların tamamından indeksi kurar. frames: {tablo: DataFrame}"""
+        with self._lock:
+            self._reset()
+            for table, df in frames.items():
+                if table in self.tables and df is not None and not df.empty:
+                    for row in df.to_dict('records'):
+                        self._add_row(table, row)
+            self._movements = frames.get(MOVEMENTS_TABLE)
+            self._built_at = time.time()
+
+    def ensure(self, loader):
+        """
+        İndeks hiç kurulmadıysa veya max_age'den eskiyse loader() ile kurar.
+        loader: {tablo: DataFrame} döndüren fonksiyon
+        """
+        with self._lock:
+            if self._built_at is not None and time.time() - self._built_at < self.max_age:
+                return
+        frames = loader(list(self.tables.keys()) + [MOVEMENTS_TABLE])
+        self.build(frames)
+
+    def invalidate(self):
+        """Bir sonraki sorguda tam yeniden kurulum yapılmasını sağlar"""
+        with self._lock:
+            self._built_at = None
+
+    def _add_row(self, table, row):
+        id_cols, ref_cols = self.tables[table]
+        key = next((k for k in (normalize_key(row.get(c)) for c in id_cols) if k), None)
+        if key is None:
+            return
+        self.records.setdefault(key, []).append((table, row))
+        self._sorted_keys = None
+        for col in ref_cols:
+            for ref in _ref_keys(row.get(col)):
+                if ref != key:
+                    self.parents.setdefault(key, set()).add(ref)
+                    self.children.setdefault(ref, set()).add(key)
+
+    # --- Yazma dinleyicisi ---
+    def on_write(self, worksheet, action, rows):
+        """Ekleme indekse işlenir; güncelleme / silme tam yeniden kurulumu tetikler"""
+        if worksheet not in self.tables and worksheet != MOVEMENTS_TABLE:
+            return
+        with self._lock:
+            if self._built_at is None:
+                return
+            if action != "append":
+                self._built_at = None
+                return
+            if not rows:
+                return
+            # Yeni satırlar da yüklemedeki tiplere çevrilir (tarih sıralaması için)
+            yeni = apply_schema(worksheet, pd.DataFrame(rows))
+            if worksheet == MOVEMENTS_TABLE:
+                onceki = self._movements
+                self._movements = yeni if onceki is None or onceki.empty else \
+                    pd.concat([onceki, yeni], ignore_index=True)
+            else:
+                for row in yeni.to_dict('records'):
+                    self._add_row(worksheet, row)
+            if worksheet in (MOVEMENTS_TABLE, "mixing_batches"):
+                self._silo_links_dirty = True
+
+    # --- Silo üzerinden buğday lotu -> paçal bağlantısı ---
+    def _silo_residency(self):
+        """
+        Her buğday girişinin silodaki kalış aralığı (ilk giren ilk çıkar varsayımı):
+        lot, kendisi dahil o ana kadar siloya giren tüm tonaj çıkışlarla tükenene
+        kadar silodadır. Silonun tamamen boşalması da bu sınırı kapsar.
+        Henüz tükenmemiş lotların aralığı açık uçludur (NaT).
+        Returns: {silo: (giris_zamanlari, cikis_zamanlari, lot_anahtarlari)} - girişe göre sıralı
+        """
+        df = self._movements
+        gerekli = {'silo_isim', 'hareket_tipi', 'miktar', 'tarih', 'lot_no'}
+        if df is None or df.empty or not gerekli.issubset(df.columns):
+            return {}
+
+        df = df[list(gerekli)].dropna(subset=['tarih']).sort_values('tarih', kind='stable')
+        miktar = pd.to_numeric(df['miktar'], errors='coerce').fillna(0.0).abs()
+        tip = df['hareket_tipi'].astype(str)
+        df = df.assign(
+            giren=np.where(tip == 'Giriş', miktar, 0.0),
+            cikan=np.where(tip == 'Çıkış', miktar, 0.0),
+            giris=(tip == 'Giriş'),
+        )
+
+        sonuc = {}
+        for silo, grup in df.groupby('silo_isim', sort=False):
+            zaman = grup['tarih'].to_numpy()
+            kumulatif_giris = grup['giren'].cumsum().to_numpy()
+            kumulatif_cikis = grup['cikan'].cumsum().to_numpy()
+
+            giris_idx = np.flatnonzero(grup['giris'].to_numpy())
+            lotlar = [normalize_key(v) for v in grup['lot_no'].to_numpy()[giris_idx]]
+            secili = [i for i, lot in zip(giris_idx, lotlar) if lot]
+            if not secili:
+                continue
+            secili = np.asarray(secili)
+
+            # Kümülatif çıkışın, lotun girişindeki kümülatif girişe ulaştığı ilk hareket
+            j = np.searchsorted(kumulatif_cikis, kumulatif_giris[secili] - _BOS_SILO_TON, side='left')
+            j = np.maximum(j, secili + 1)
+            cikis = np.full(len(secili), np.datetime64('NaT'), dtype=zaman.dtype)
+            var = j < len(zaman)
+            cikis[var] = zaman[j[var]]
+
+            sonuc[str(silo)] = (zaman[secili], cikis, [lot for lot in lotlar if lot])
+        return sonuc
+
+    def _refresh_silo_links(self):
+        """Türetilmiş lot -> paçal kenarlarını gerekiyorsa yeniden hesaplar"""
+        if not self._silo_links_dirty:
+            return
+        for lot, mix in self._derived:
+            self.parents.get(mix, set()).discard(lot)
+            self.children.get(lot, set()).discard(mix)
+        self._derived = set()
+
+        residency = self._silo_residency()
+        if residency:
+            for key, kayitlar in self.records.items():
+                for table, row in kayitlar:
+                    if table != "mixing_batches":
+                        continue
+                    mix_zamani = pd.to_datetime(row.get('tarih'), errors='coerce')
+                    if pd.isna(mix_zamani):
+                        continue
+                    mix_zamani = np.datetime64(mix_zamani)
+                    for silo in _pacal_silolari(row):
+                        if silo not in residency:
+                            continue
+                        girisler, cikislar, lotlar = residency[silo]
+                        aktif = (girisler <= mix_zamani) & (np.isnat(cikislar) | (cikislar > mix_zamani))
+                        for i in np.flatnonzero(aktif):
+                            lot = lotlar[i]
+                            self.parents.setdefault(key, set()).add(lot)
+                            self.children.setdefault(lot, set()).add(key)
+                            self._derived.add((lot, key))
+        self._sorted_keys = None
+        self._silo_links_dirty = False
+
+    # --- Geri çağırma (recall) ---
+    def traverse(self, key, direction="forward"):
+        """
+        Anahtardan başlayarak soy ağacında genişlik öncelikli (BFS) yürür.
+        direction: "forward" (alt halkalar: lot -> paçal -> üretim -> sevkiyat)
+                   "backward" (üst halkalar: sevkiyat -> ... -> buğday lotu)
+        Returns: {anahtar: mesafe} (başlangıç anahtarı mesafe 0)
+        """
+        with self._lock:
+            self._refresh_silo_links()
+            komsular = self.children if direction == "forward" else self.parents
+            mesafe = {key: 0}
+            kuyruk = deque([key])
+            while kuyruk:
+                dugum = kuyruk.popleft()
+                for komsu in komsular.get(dugum, ()):
+                    if komsu not in mesafe:
+                        mesafe[komsu] = mesafe[dugum] + 1
+                        kuyruk.append(komsu)
+            return mesafe
+
+    # --- Sorgular ---
+    def candidates(self, query):
+        """
+        Sorguya uyan indeks anahtarları: tam eşleşme varsa sadece o, yoksa tüm
+        önek eşleşmeleri (sıralı; ör. 'MIX-20250101' -> ['MIX-20250101-AB12', 'MIX-20250101-CD34']).
+        """
+        key = normalize_key(query)
+        if key is None:
+            return []
+        with self._lock:
+            # Arşiv kaydı olmayan buğday lotları sadece silo kenarlarında bulunur
+            self._refresh_silo_links()
+            if key in self.records or key in self.children:
+                return [key]
+            if self._sorted_keys is None:
+                self._sorted_keys = sorted(set(self.records) | set(self.children))
+            keys = self._sorted_keys
+            i = bisect.bisect_left(keys, key)
+            adaylar = []
+            while i < len(keys) and keys[i].startswith(key):
+                adaylar.append(keys[i])
+                i += 1
+        return adaylar
+
+    def resolve(self, query):
+        """
+        Sorguyu indeksteki TEK anahtara çevirir (tam eşleşme veya tek önek eşleşmesi).
+        Bulunamazsa veya önek birden çok anahtara uyuyorsa None (adaylar: candidates).
+        """
+        adaylar = self.candidates(query)
+        return adaylar[0] if len(adaylar) == 1 else None
+
+    def get_records(self, key, table=None):
+        """Anahtara ait kayıtlar (isteğe bağlı tablo filtresi)"""
+        with self._lock:
+            return [(t, r) for t, r in self.records.get(key, []) if table is None or t == table]
+
+    def get_parents(self, key):
+        with self._lock:
+            self._refresh_silo_links()
+            return set(self.parents.get(key, ()))
+
+    def get_children(self, key):
+        with self._lock:
+            self._refresh_silo_links()
+            return set(self.children.get(key, ()))
+
+    def stats(self):
+        """Debug ekranı için özet"""
+        with self._lock:
+            return {
+                "anahtar": len(self.records),
+                "kenar": sum(len(v) for v in self.parents.values()),
+                "yas_sn": None if self._built_at is None else round(time.time() - self._built_at, 1),
+            }
+
+
+def _pacal_silolari(row):
+    """Paçal kaydındaki (silo_snapshot_json) oranı > 0 olan silolar"""
+    try:
+        snapshot = json.loads(row.get('silo_snapshot_json') or '{}')
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(snapshot, dict):
+        return []
+    silolar = []
+    for silo, bilgi in snapshot.items():
+        oran = bilgi.get('oran', 0) if isinstance(bilgi, dict) else bilgi
+        try:
+            if float(oran) > 0:
+                silolar.append(str(silo))
+        except (TypeError, ValueError):
+            continue
+    return silolar
+
+
+# Süreç genelinde tek indeks (tüm oturumlar paylaşır)
+lineage_index = LineageIndex()
+add_write_listener(lineage_index.on_write)
@@ -0,0 +1,188 @@
+"""
+PAÇAL METRİK MOTORU
+Paçal tahmini = oran vektörü x (silo x parametre) matrisi.
+Matris her yeniden çizimde bir kez kurulur; tek bir paçal da binlerce aday paçal da
+aynı matris çarpımıyla değerlendirilir (silo / parametre döngüsü yok).
+Aynı matris, spesifikasyonu sağlayan en ucuz paçal için doğrusal programın katsayılarıdır.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.core.silo_quality import TAVLI_PARAMETRELERI
+
+# scipy opsiyonel: yoksa optimizasyon modu kapalı kalır, elle paçal eskisi gibi çalışır
+try:
+    from scipy.optimize import linprog
+    LP_AVAILABLE = True
+except ImportError:
+    LP_AVAILABLE = False
+
+# Mal kabul girişlerinden tonaj ağırlıklı ortalaması alınan kuru buğday alanları
+KURU_PARAMETRELERI = ['hektolitre', 'protein', 'rutubet', 'gluten',
+                      'gluten_index', 'sedim', 'gecikmeli_sedim']
+
+
+def _num(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if np.isnan(value) else value
+
+
+def _parametre_matrisi(silolar, analizler, parametreler):
+    """{silo: {parametre: değer}} sözlüğünden (silo x parametre) matris; eksikler 0"""
+    matris = np.zeros((len(silolar), len(parametreler)))
+    for i, silo in enumerate(silolar):
+        analiz = analizler.get(silo)
+        if analiz:
+            matris[i] = [_num(analiz.get(param, 0)) for param in parametreler]
+    return matris
+
+
+class PacalMatrix:
+    """
+    Dolu siloların paçal hesabında kullanılan değerleri.
+
+    - tavli: (silo x tavlı parametre) ağırlıklı ortalamalar (analizi olmayan silo = 0)
+    - tavli_var: tavlı analizi olan silolar
+    - kuru: (silo x kuru parametre) ortalamalar; kuru protein yoksa silo kartındaki protein
+    - maliyet: silo kartındaki maliyetler
+    """
+
+    def __init__(self, silolar, tavli_analizler, kuru_analizler=None, silo_kartlari=None):
+        self.silolar = list(silolar)
+        self._konum = {}
+        for i, silo in enumerate(self.silolar):
+            self._konum.setdefault(silo, i)
+
+        kuru_analizler = kuru_analizler or {}
+        self.tavli = _parametre_matrisi(self.silolar, tavli_analizler, TAVLI_PARAMETRELERI)
+        self.tavli_var = np.array([bool(tavli_analizler.get(s)) for s in self.silolar], dtype=bool)
+        self.kuru = _parametre_matrisi(self.silolar, kuru_analizler, KURU_PARAMETRELERI)
+        self.maliyet = np.zeros(len(self.silolar))
+
+        if silo_kartlari is not None and not silo_kartlari.empty:
+            kartlar = silo_kartlari.drop_duplicates('isim').set_index('isim')
+            kartlar = kartlar.reindex(self.silolar)
+            if 'maliyet' in kartlar.columns:
+                self.maliyet = pd.to_numeric(kartlar['maliyet'], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+            if 'protein' in kartlar.columns:
+                kart_protein = pd.to_numeric(kartlar['protein'], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+                p = KURU_PARAMETRELERI.index('protein')
+                self.kuru[:, p] = np.where(self.kuru[:, p] == 0, kart_protein, self.kuru[:, p])
+
+    def column(self, kaynak, parametre):
+        """Tek parametrenin silo vektörü (kaynak: 'tavli' | 'kuru'; parametre yoksa None)"""
+        if kaynak == 'tavli' and parametre in TAVLI_PARAMETRELERI:
+            return self.tavli[:, TAVLI_PARAMETRELERI.index(parametre)]
+        if kaynak == 'kuru' and parametre in KURU_PARAMETRELERI:
+            return self.kuru[:, KURU_PARAMETRELERI.index(parametre)]
+        return None
+
+    def ratio_vector(self, oranlar):
+        """{silo: yüzde} -> silo sırasıyla katsayı vektörü (0-1)"""
+        w = np.zeros(len(self.silolar))
+        for silo, oran in oranlar.items():
+            i = self._konum.get(silo)
+            if i is not None and oran > 0:
+                w[i] = oran / 100.0
+        return w
+
+    def evaluate_batch(self, oran_matrisi):
+        """
+        Aday paçalları tek seferde değerlendirir.
+
+        Args:
+            oran_matrisi: (aday x silo) yüzde oranlar (0-100)
+
+        Returns:
+            dict: tavli (aday x parametre), tavli_var (aday), kuru (aday x parametre), maliyet (aday)
+        """
+        W = np.atleast_2d(np.asarray(oran_matrisi, dtype=float)) / 100.0
+        W = np.where(W > 0, W, 0.0)
+        return {
+            'tavli': W @ self.tavli,
+            'tavli_var': (W[:, self.tavli_var] > 0).any(axis=1),
+            'kuru': W @ self.kuru,
+            'maliyet': W @ self.maliyet,
+        }
+
+    def evaluate(self, oranlar):
+        """
+        Tek paçalın tahmini değerleri.
+
+        Returns:
+            dict: tavli ({parametre: değer} veya tavlı analizi yoksa None),
+                  kuru ({parametre: değer}), maliyet (float)
+        """
+        sonuc = self.evaluate_batch(self.ratio_vector(oranlar) * 100.0)
+        tavli = dict(zip(TAVLI_PARAMETRELERI, sonuc['tavli'][0].tolist())) if sonuc['tavli_var'][0] else None
+        return {
+            'tavli': tavli,
+            'kuru': dict(zip(KURU_PARAMETRELERI, sonuc['kuru'][0].tolist())),
+            'maliyet': float(sonuc['maliyet'][0]),
+        }
+
+
+def optimize_blend(matris, kisitlar, ust_sinirlar=None):
+    """
+    Spesifikasyonu sağlayan EN DÜŞÜK MALİYETLİ paçalı doğrusal programla bulur.
+
+        min  maliyet · x
+        st   min_p <= değer_p · x <= max_p   (her kısıt için)
+             sum(x) = 1,  0 <= x_i <= üst_sınır_i
+
+    Veri olmayan silolar (tavlı analizi yok / kuru değer 0) ilgili kısıt varken
+    paçala alınmaz; aksi halde 0 değer ortalamayı yanlış aşağı çeker.
+
+    Args:
+        matris: PacalMatrix
+        kisitlar: [(kaynak, parametre, min, max), ...] - min / max None ise o yön serbest
+        ust_sinirlar: silo başına en fazla pay (0-1), ör. stok / paçal miktarı
+
+    Returns:
+        tuple: (başarılı_mı: bool, mesaj: str, {silo: yüzde})
+    """
+    if not LP_AVAILABLE:
+        return False, "Optimizasyon için scipy kurulu değil (pip install scipy).", {}
+
+    n = len(matris.silolar)
+    if n == 0:
+        return False, "Paçala alınabilecek silo yok.", {}
+
+    ust = np.ones(n) if ust_sinirlar is None else np.clip(np.asarray(ust_sinirlar, dtype=float), 0.0, 1.0)
+    A_ub, b_ub = [], []
+    for kaynak, parametre, alt_deger, ust_deger in kisitlar:
+        vektor = matris.column(kaynak, parametre)
+        if vektor is None:
+            continue
+        veri_yok = ~matris.tavli_var if kaynak == 'tavli' else (vektor == 0)
+        ust = np.where(veri_yok, 0.0, ust)
+        if alt_deger is not None:
+            A_ub.append(-vektor)
+            b_ub.append(-float(alt_deger))
+        if ust_deger is not None:
+            A_ub.append(vektor)
+            b_ub.append(float(ust_deger))
+
+    if ust.sum() < 1.0 - 1e-9:
+        return False, "Stok / analiz verisi olan silolar paçal miktarını karşılamıyor.", {}
+
+    sonuc = linprog(
+        c=matris.maliyet,
+        A_ub=np.array(A_ub) if A_ub else None,
+        b_ub=np.array(b_ub) if b_ub else None,
+        A_eq=np.ones((1, n)),
+        b_eq=[1.0],
+        bounds=list(zip(np.zeros(n), ust)),
+        method='highs',
+    )
+    if sonuc.status == 2:
+        return False, "Spesifikasyonu sağlayan bir paçal bulunamadı (kısıtlar birbiriyle çelişiyor).", {}
+    if not sonuc.success:
+        return False, f"Optimizasyon tamamlanamadı: {sonuc.message}", {}
+
+    oranlar = {silo: float(pay * 100.0) for silo, pay in zip(matris.silolar, sonuc.x) if pay > 1e-6}
+    return True, "Optimum paçal bulundu.", oranlar
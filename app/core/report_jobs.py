@@ -0,0 +1,213 @@
+"""
+RAPOR İŞ KUYRUĞU (REPORT JOB QUEUE)
+PDF / Excel raporları Streamlit betiği içinde değil, ayrı işlemlerde (process pool) üretilir.
+Her iş bir kimlik alır; ekran iş durumunu sorar ve rapor hazır olunca indirme düğmesi gösterir.
+Aynı girdilerle tekrar istenen rapor yeniden üretilmez, önbellekteki sonuç verilir.
+"""
+
+import atexit
+import hashlib
+import importlib
+import multiprocessing
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core.config import REPORT_WORKERS, REPORT_CACHE_SECONDS, REPORT_MAX_JOBS
+
+# İş durumları
+BEKLIYOR = "bekliyor"
+CALISIYOR = "calisiyor"
+TAMAM = "tamam"
+HATA = "hata"
+
+# Süre geçmişi olmayan rapor türleri için tahmini süre (ilerleme çubuğu)
+_VARSAYILAN_SURE = 5.0
+
+
+def _run_report(target, payload):
+    """İşçi işlemde çalışır: 'paket.modul:fonksiyon' hedefini içe aktarıp çağırır"""
+    module_name, func_name = target.split(":")
+    func = getattr(importlib.import_module(module_name), func_name)
+    args, kwargs = pickle.loads(payload)
+    result = func(*args, **kwargs)
+    # BytesIO döndüren raporlar da düz bytes olarak taşınır
+    if hasattr(result, "getvalue"):
+        result = result.getvalue()
+    return result
+
+
+class ReportJob:
+    """Tek bir rapor işi (durum, sonuç, süre bilgisi)"""
+
+    def __init__(self, target, label, cache_key):
+        self.id = uuid.uuid4().hex[:12]
+        self.target = target
+        self.label = label or target.split(":")[-1]
+        self.cache_key = cache_key
+        self.status = BEKLIYOR
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.expected_seconds = _VARSAYILAN_SURE
+
+    @property
+    def done(self):
+        return self.status in (TAMAM, HATA)
+
+    @property
+    def progress(self):
+        """0-1 arası ilerleme (çalışırken geçmiş sürelere göre tahmin)"""
+        if self.done:
+            return 1.0
+        if self.status != CALISIYOR or self.started_at is None:
+            return 0.0
+        gecen = time.time() - self.started_at
+        return min(0.95, gecen / max(self.expected_seconds, 0.1))
+
+
+class ReportJobQueue:
+    """
+    Süreç genelinde paylaşılan rapor kuyruğu.
+
+    - İşler ayrı işlemlerde (spawn) çalışır; Streamlit oturumu beklemez
+    - İşlem açılamayan ortamlarda thread havuzuna düşer
+    - Sonuçlar (hedef + girdiler) anahtarıyla REPORT_CACHE_SECONDS boyunca saklanır
+    """
+
+    def __init__(self, workers=REPORT_WORKERS, cache_seconds=REPORT_CACHE_SECONDS, max_jobs=REPORT_MAX_JOBS):
+        self.workers = workers
+        self.cache_seconds = cache_seconds
+        self.max_jobs = max_jobs
+        self._lock = threading.RLock()
+        self._jobs = OrderedDict()      # iş kimliği -> ReportJob
+        self._by_key = {}               # önbellek anahtarı -> iş kimliği
+        self._durations = {}            # hedef -> son süre (saniye)
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                try:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                except (OSError, NotImplementedError, ValueError):
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report")
+            return self._executor
+
+    def _expired(self, job):
+        return job.done and time.time() - job.finished_at > self.cache_seconds
+
+    def _evict(self):
+        """Süresi dolan ve sınırı aşan bitmiş işleri siler (kilit altında çağrılır)"""
+        for job_id in [j.id for j in self._jobs.values() if self._expired(j)]:
+            self._remove(job_id)
+        bitmis = [j.id for j in self._jobs.values() if j.done]
+        while len(self._jobs) > self.max_jobs and bitmis:
+            self._remove(bitmis.pop(0))
+
+    def _remove(self, job_id):
+        job = self._jobs.pop(job_id, None)
+        if job is not None and self._by_key.get(job.cache_key) == job_id:
+            del self._by_key[job.cache_key]
+
+    def submit(self, target, *args, label=None, **kwargs):
+        """
+        Rapor işini kuyruğa ekler.
+
+        Args:
+            target: 'paket.modul:fonksiyon' (işçi işlemde içe aktarılır)
+            *args, **kwargs: Fonksiyon girdileri (pickle edilebilir olmalı)
+            label: Ekranda gösterilecek ad
+
+        Returns:
+            str: İş kimliği (aynı girdili bitmemiş / önbellekteki iş varsa onun kimliği)
+        """
+        payload = pickle.dumps((args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+        cache_key = hashlib.sha1(target.encode("utf-8") + payload).hexdigest()
+
+        with self._lock:
+            self._evict()
+            mevcut = self._jobs.get(self._by_key.get(cache_key))
+            if mevcut is not None and mevcut.status != HATA:
+                self._jobs.move_to_end(mevcut.id)
+                return mevcut.id
+
+            job = ReportJob(target, label, cache_key)
+            job.expected_seconds = self._durations.get(target, _VARSAYILAN_SURE)
+            self._jobs[job.id] = job
+            self._by_key[cache_key] = job.id
+
+        try:
+            future = self._get_executor().submit(_run_report, target, payload)
+        except (BrokenProcessPool, RuntimeError):
+            # Ölen işçi havuzu bir kez yeniden kurulur
+            with self._lock:
+                self._executor = None
+            future = self._get_executor().submit(_run_report, target, payload)
+
+        job.future = future
+        future.add_done_callback(lambda f, job=job: self._on_done(job, f))
+        return job.id
+
+    def _on_done(self, job, future):
+        with self._lock:
+            job.finished_at = time.time()
+            if job.started_at is None:
+                job.started_at = job.created_at
+            try:
+                result = future.result()
+            except Exception as e:
+                job.status, job.error = HATA, str(e) or type(e).__name__
+                if isinstance(e, BrokenProcessPool):
+                    self._executor = None
+            else:
+                if result is None:
+                    job.status, job.error = HATA, "Rapor oluşturulamadı."
+                else:
+                    job.status, job.result = TAMAM, result
+                    self._durations[job.target] = job.finished_at - job.started_at
+            job.future = None
+
+    def get(self, job_id):
+        """İşi güncel durumuyla döndürür (yoksa / süresi dolduysa None)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or self._expired(job):
+                return None
+            if job.status == BEKLIYOR and job.future is not None and job.future.running():
+                job.status = CALISIYOR
+                job.started_at = time.time()
+            return job
+
+    def stats(self):
+        """Debug ekranı için özet"""
+        with self._lock:
+            durumlar = {}
+            for job in self._jobs.values():
+                durumlar[job.status] = durumlar.get(job.status, 0) + 1
+            return {
+                "is_sayisi": len(self._jobs),
+                "durumlar": durumlar,
+                "havuz": type(self._executor).__name__ if self._executor else None,
+                "ortalama_sure_sn": {t.split(":")[-1]: round(s, 2) for t, s in self._durations.items()},
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Süreç genelinde tek örnek
+report_jobs = ReportJobQueue()
+atexit.register(report_jobs.shutdown)
@@ -0,0 +1,238 @@
+"""
+TABLO ŞEMA KAYDI (SCHEMA REGISTRY)
+Her worksheet için (sütun, tip, varsayılan) tanımları.
+Tip dönüşümü tablo yüklenirken BİR KEZ yapılır; tipli tablo cache'te ve
+Parquet snapshot'ta saklanır, modüller her yeniden çizimde tekrar parse etmez.
+"""
+
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_float_dtype
+
+from app.core.config import ARCHIVE_SUFFIX
+
+# Desteklenen tipler
+FLOAT = "float"
+DATETIME = "datetime"
+CATEGORY = "category"
+
+# Silo kartındaki sayısal alanlar (boşlar 0 kabul edilir)
+_SILO_SAYISAL = ['kapasite', 'mevcut_miktar', 'protein', 'gluten', 'rutubet',
+                 'hektolitre', 'sedim', 'maliyet', 'toplam_giris', 'toplam_cikis']
+
+# Buğday analiz değerleri (boş = ölçülmedi, NaN kalır)
+_BUGDAY_ANALIZ = ['protein', 'gluten', 'rutubet', 'hektolitre', 'sedim',
+                  'gluten_index', 'gecikmeli_sedim', 'sune', 'kirik_ciliz', 'yabanci_tane']
+
+# Tavlı buğday analiz değerleri
+_TAVLI_ANALIZ = ['protein', 'rutubet', 'gluten', 'gluten_index',
+                 'sedim', 'g_sedim', 'fn', 'ffn', 'amilograph', 'kul',
+                 'su_kaldirma_f', 'gelisme_suresi', 'stabilite', 'yumusama',
+                 'su_kaldirma_e', 'enerji45', 'direnc45', 'taban45',
+                 'enerji90', 'direnc90', 'taban90', 'enerji135',
+                 'direnc135', 'taban135']
+
+# Un analiz değerleri
+_UN_ANALIZ = ['protein', 'rutubet', 'gluten', 'gluten_index', 'sedim', 'gecikmeli_sedim',
+              'fn', 'ffn', 'amilograph', 'kul', 'nisasta_zedelenmesi',
+              'su_kaldirma_f', 'gelisme_suresi', 'stabilite', 'yumusama', 'su_kaldirma_e',
+              'direnc45', 'taban45', 'enerji45', 'direnc90', 'taban90', 'enerji90',
+              'direnc135', 'taban135', 'enerji135']
+
+# Üretim kaydı tonaj / oran alanları
+_URETIM_SAYISAL = ['kirilan_bugday', 'nem_orani', 'tav_suresi', 'un_1', 'un_2',
+                   'razmol', 'kepek', 'bongalite', 'kirik_bugday', 'randiman_1',
+                   'toplam_randiman', 'kayip']
+
+# worksheet -> [(sütun, tip, varsayılan), ...]
+# varsayılan None ise boş hücreler NaN / NaT olarak kalır
+TABLE_SCHEMAS = {
+    "silolar": [(col, FLOAT, 0.0) for col in _SILO_SAYISAL],
+    "hareketler": [
+        ('tarih', DATETIME, None),
+        ('hareket_tipi', CATEGORY, None),
+        ('miktar', FLOAT, 0.0),
+        ('maliyet', FLOAT, 0.0),
+    ] + [(col, FLOAT, None) for col in _BUGDAY_ANALIZ],
+    "bugday_giris_arsivi": [
+        ('tarih', DATETIME, None),
+        ('tonaj', FLOAT, None),
+        ('fiyat', FLOAT, None),
+    ] + [(col, FLOAT, None) for col in _BUGDAY_ANALIZ],
+    "tavli_analiz": [
+        ('tarih', DATETIME, None),
+        ('analiz_tonaj', FLOAT, 0.0),
+    ] + [(col, FLOAT, None) for col in _TAVLI_ANALIZ],
+    "uretim_kaydi": [('tarih', DATETIME, None)] + [(col, FLOAT, 0.0) for col in _URETIM_SAYISAL],
+    "un_maliyet_hesaplamalari": [('tarih', DATETIME, None)],
+    "un_analiz": [('tarih', DATETIME, None)] + [(col, FLOAT, None) for col in _UN_ANALIZ],
+    "mixing_batches": [('tarih', DATETIME, None)],
+    "enzim_receteleri": [('tarih', DATETIME, None)],
+    "katki_maliyet_arsivi": [('tarih', DATETIME, None)],
+    "audit_log": [
+        ('tarih', DATETIME, None),
+        ('modul', CATEGORY, None),
+        ('rol', CATEGORY, None),
+    ],
+    "arsiv_bolumleri": [
+        ('baslangic', DATETIME, None),
+        ('bitis', DATETIME, None),
+        ('satir', FLOAT, 0.0),
+    ],
+}
+
+
+# Arşiv bölümü adı: {ana_tablo}_arsiv_{YYYY} veya {ana_tablo}_arsiv_{YYYY_MM}
+_BOLUM_ADI = re.compile(rf"^(.+){re.escape(ARCHIVE_SUFFIX)}\d{{4}}(?:_\d{{2}})?$")
+
+
+def base_table(worksheet_name):
+    """Arşiv bölümünün ana tablosu ('hareketler_arsiv_2025_01' -> 'hareketler'), bölüm değilse kendisi"""
+    eslesme = _BOLUM_ADI.match(str(worksheet_name))
+    return eslesme.group(1) if eslesme else worksheet_name
+
+
+# Depodaki tarih metinlerinin bilinen biçimleri (sırayla denenir).
+# 'mixed' ay/gün sırasını tahmin ettiği için kullanılmaz: 03.04.2025 her zaman 3 Nisan'dır.
+_TARIH_FORMATLARI = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d.%m.%Y %H:%M:%S', '%d.%m.%Y %H:%M',
+                     '%d.%m.%Y', '%d/%m/%Y', 'ISO8601')
+
+# Parse edilemeyen tarih hücrelerinin ham metinleri: tablo -> {sütun: {satır anahtarı: metin}}
+# Tam tablo yeniden yazılırken bu hücrelere NaT (boş) değil orijinal metin yazılır.
+_HAM_ATTR = 'ham_tarihler'
+_HAM_TARIHLER = {}
+_HAM_LOCK = threading.Lock()
+
+
+def get_schema(worksheet_name):
+    """Tablonun şema tanımı (kayıtlı değilse boş liste); arşiv bölümleri ana tablonunkini kullanır"""
+    return TABLE_SCHEMAS.get(worksheet_name) or TABLE_SCHEMAS.get(base_table(worksheet_name), [])
+
+
+def parse_datetime(series):
+    """Tarih sütununu bilinen biçimlerle sırayla parse eder (her biçim sadece kalan boşlara uygulanır)"""
+    sonuc = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    metin = series.map(lambda v: v.strip() if isinstance(v, str) else None)
+
+    # Metin olmayan değerler (datetime / Timestamp nesneleri) doğrudan çevrilir
+    diger = (metin.isna() & series.notna()).to_numpy()
+    if diger.any():
+        sonuc.iloc[diger] = pd.to_datetime(series[diger], errors='coerce')
+
+    for fmt in _TARIH_FORMATLARI:
+        eksik = (sonuc.isna() & metin.notna() & (metin != '')).to_numpy()
+        if not eksik.any():
+            break
+        sonuc.iloc[eksik] = pd.to_datetime(metin[eksik], format=fmt, errors='coerce')
+    return sonuc
+
+
+def _key(value):
+    """Satır anahtarı için değer normalizasyonu (5 / 5.0 / '5' aynı)"""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _row_keys(df, date_columns):
+    """Satır anahtarları: 'id' varsa id, yoksa tarih dışı sütunların birleşimi"""
+    if 'id' in df.columns:
+        return [f"id:{_key(v)}" for v in df['id'].tolist()]
+    diger = [c for c in df.columns if c not in date_columns]
+    return ["|".join(_key(v) for v in row) for row in df[diger].itertuples(index=False, name=None)]
+
+
+def restore_unparsed_dates(worksheet_name, df):
+    """
+    Tam tablo yazımından önce çağrılır: okunurken parse edilemeyip NaT olan tarih
+    hücrelerine orijinal metinlerini geri koyar (bozuk/bilinmeyen biçimdeki tarih silinmez).
+    """
+    with _HAM_LOCK:
+        kayit = {c: dict(m) for c, m in _HAM_TARIHLER.get(worksheet_name, {}).items()}
+    if not kayit or not isinstance(df, pd.DataFrame) or df.empty:
+        return df
+
+    anahtarlar = None
+    sonuc = df
+    for column, ham in kayit.items():
+        if column not in df.columns or not ham:
+            continue
+        bos = df[column].isna().to_numpy()
+        if not bos.any():
+            continue
+        if anahtarlar is None:
+            anahtarlar = _row_keys(df, kayit.keys())
+        degerler = sonuc[column].astype(object).to_numpy(copy=True)
+        degisti = False
+        for i in np.flatnonzero(bos):
+            metin = ham.get(anahtarlar[i])
+            if metin is not None:
+                degerler[i] = metin
+                degisti = True
+        if degisti:
+            if sonuc is df:
+                sonuc = df.copy()
+            sonuc[column] = degerler
+    return sonuc
+
+
+def _coerce(series, dtype, default):
+    if dtype == FLOAT:
+        if not is_float_dtype(series):
+            series = pd.to_numeric(series, errors='coerce').astype(float)
+    elif dtype == DATETIME:
+        if not is_datetime64_any_dtype(series):
+            series = parse_datetime(series)
+    elif dtype == CATEGORY:
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype('category')
+        return series
+
+    if default is not None and series.hasnans:
+        series = series.fillna(default)
+    return series
+
+
+def apply_schema(worksheet_name, df):
+    """
+    Tabloya kayıtlı şemayı uygular (yerinde değil, yeni DataFrame döner).
+
+    - Sadece tabloda VAR olan sütunlar dönüştürülür (sütun eklenmez;
+      tam yeniden yazılan tablolarda sayfa yapısı değişmesin)
+    - Zaten doğru tipteki sütunlar tekrar parse edilmez (snapshot / cache yolu ucuzdur)
+    """
+    schema = get_schema(worksheet_name)
+    if df is None or df.empty or not schema:
+        return df
+
+    df = df.copy()
+    tarih_kolonlari = [c for c, dtype, _ in schema if dtype == DATETIME and c in df.columns]
+    ham = {c: dict(m) for c, m in (df.attrs.get(_HAM_ATTR) or {}).items()}
+    anahtarlar = None
+    for column, dtype, default in schema:
+        if column in df.columns:
+            onceki = df[column]
+            df[column] = _coerce(onceki, dtype, default)
+            if dtype == DATETIME and not is_datetime64_any_dtype(onceki):
+                # Dolu ama hiçbir biçime uymayan hücreler: ham metin saklanır
+                kayip = (df[column].isna() & onceki.notna() & (onceki.astype(str).str.strip() != '')).to_numpy()
+                if kayip.any():
+                    if anahtarlar is None:
+                        anahtarlar = _row_keys(df, tarih_kolonlari)
+                    hedef = ham.setdefault(column, {})
+                    for i in np.flatnonzero(kayip):
+                        hedef[anahtarlar[i]] = str(onceki.iloc[i])
+
+    with _HAM_LOCK:
+        if ham:
+            tablo = _HAM_TARIHLER.setdefault(worksheet_name, {})
+            for column, m in ham.items():
+                tablo.setdefault(column, {}).update(m)
+        tablo = _HAM_TARIHLER.get(worksheet_name)
+        if tablo:
+            # Snapshot (Parquet) ile birlikte saklansın diye çerçeveye de eklenir
+            df.attrs[_HAM_ATTR] = {c: dict(m) for c, m in tablo.items()}
+    return df
@@ -0,0 +1,310 @@
+"""
+ARŞİV ARAMA İNDEKSİ (INVERTED INDEX)
+Seçili metin sütunlarındaki kelimelerden satır numaralarına ters indeks.
+Arama her tuş vuruşunda tüm tabloyu metne çevirip taramak yerine
+kelime sözlüğünde önek (prefix) araması yapar; yeni satırlar indekse artımlı eklenir.
+"""
+
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.core.storage import add_write_listener
+from app.core.table_cache import table_cache
+
+# Tablo -> aranabilir sütunlar (olmayan sütunlar atlanır)
+SEARCH_COLUMNS = {
+    "bugday_giris_arsivi": ['lot_no', 'tedarikci', 'plaka', 'yore', 'bugday_cinsi', 'silo_isim', 'notlar'],
+    "hareketler": ['lot_no', 'silo_isim', 'hareket_tipi', 'tedarikci', 'yore', 'notlar'],
+    "audit_log": ['kullanici', 'rol', 'modul', 'islem', 'detay'],
+    "un_analiz": ['lot_no', 'islem_tipi', 'un_markasi', 'un_cinsi_marka', 'musteri_adi',
+                  'plaka_no', 'kaynak_parti_no', 'uretim_silosu', 'notlar'],
+}
+
+_KELIME = re.compile(r"\w+", re.UNICODE)
+
+# Türkçe büyük/küçük harf farkı aramayı etkilemesin (İ/I/ı -> i)
+_HARF_CEVIR = str.maketrans({'İ': 'i', 'I': 'i', 'ı': 'i'})
+
+
+def normalize_text(value):
+    return str(value).translate(_HARF_CEVIR).lower()
+
+
+def tokenize(value):
+    """
+    Hücre değerini arama kelimelerine ayırır.
+    'WHT-2602 / 34 ABC 12' -> {'wht-2602', 'wht', '2602', '34', 'abc', '12', ...}
+    Tam değer de kelime olarak eklenir (lot numarasının önekle aranabilmesi için).
+    """
+    if value is None:
+        return set()
+    try:
+        if pd.isna(value):
+            return set()
+    except (TypeError, ValueError):
+        pass
+    metin = normalize_text(value).strip()
+    if not metin or metin == 'nan':
+        return set()
+    kelimeler = set(_KELIME.findall(metin))
+    kelimeler.update(parca for parca in metin.split() if parca)
+    return kelimeler
+
+
+class _TableIndex:
+    """
+    Tek tablonun ters indeksi: kelime -> satır konumları (0..n-1, tablo sırası).
+
+    Kelimeler sıralı bir dizide, satır listeleri bu sırayla art arda tek bir
+    dizide tutulur (CSR). Bir önekle başlayan tüm kelimeler sözlükte bitişik
+    olduğundan önek araması iki ikili arama + tek bir dilimdir.
+    Sonradan eklenen satırlar küçük bir ek sözlükte (delta) tutulur ve
+    belli bir boyutu aşınca ana diziye katılır.
+    """
+
+    DELTA_LIMIT = 20000     # ek sözlükteki (kelime, satır) çifti sınırı
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.n = 0
+        self.generation = None
+        self.version = None
+        self.vocab = np.array([], dtype=object)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.rows = np.array([], dtype=np.int64)
+        self.delta = {}
+        self._delta_size = 0
+
+    def build(self, df):
+        """
+        Tablonun tamamından indeksi kurar.
+        Her farklı hücre değeri bir kez (vektörel string işlemleriyle) ayrıştırılır.
+        """
+        cift_kelimeler, cift_satirlar = [], []
+        for col in self.columns:
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=True)
+            gecerli = np.flatnonzero(codes >= 0)
+            if not len(gecerli):
+                continue
+            sira = gecerli[np.argsort(codes[gecerli], kind='stable')]
+            adet = np.bincount(codes[gecerli], minlength=len(uniques))
+            baslangic = np.concatenate(([0], np.cumsum(adet)[:-1]))
+
+            # (değer kodu, kelime) çiftleri - tokenize() ile aynı kurallar
+            metin = pd.Series(np.asarray(uniques, dtype=object)).astype(str) \
+                .str.translate(_HARF_CEVIR).str.lower().str.strip()
+            kelimeler = pd.concat([metin.str.findall(_KELIME.pattern), metin.str.split()]).explode()
+            kelimeler = kelimeler[kelimeler.notna() & (kelimeler != '') & (kelimeler != 'nan')]
+            ciftler = pd.DataFrame({'kod': kelimeler.index, 'kelime': kelimeler.to_numpy()}).drop_duplicates()
+            if ciftler.empty:
+                continue
+
+            cift_kod = ciftler['kod'].to_numpy(dtype=np.int64)
+            uzunluk = adet[cift_kod]
+            toplam = int(uzunluk.sum())
+            # Her (değer, kelime) çiftini o değere sahip tüm satırlara aç
+            ic_konum = np.arange(toplam) - np.repeat(np.cumsum(uzunluk) - uzunluk, uzunluk)
+            cift_satirlar.append((sira[np.repeat(baslangic[cift_kod], uzunluk) + ic_konum], uzunluk))
+            cift_kelimeler.append(ciftler['kelime'].to_numpy(dtype=object))
+
+        self.n = len(df)
+        self.delta, self._delta_size = {}, 0
+        if not cift_kelimeler:
+            self._set_postings(np.array([], dtype=object), np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+            return
+
+        kelime_kodlari, kelimeler = pd.factorize(np.concatenate(cift_kelimeler))
+        uzunluklar = np.concatenate([u for _, u in cift_satirlar])
+        self._set_postings(
+            np.asarray(kelimeler, dtype=object),
+            np.repeat(kelime_kodlari, uzunluklar),
+            np.concatenate([r for r, _ in cift_satirlar]),
+        )
+
+    def _set_postings(self, kelimeler, kelime_dizisi, satir_dizisi):
+        """kelimeler: kelime listesi; kelime_dizisi / satir_dizisi: (kelime no, satır) çiftleri"""
+        sozluk_sirasi = np.argsort(kelimeler, kind='stable') if len(kelimeler) else np.array([], dtype=np.int64)
+        rutbe = np.empty(len(kelimeler), dtype=np.int64)
+        rutbe[sozluk_sirasi] = np.arange(len(kelimeler))
+
+        kelime_rutbe = rutbe[kelime_dizisi]
+        sira = np.argsort(kelime_rutbe, kind='stable')
+
+        self.vocab = kelimeler[sozluk_sirasi]
+        self.rows = satir_dizisi[sira]
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(kelime_rutbe, minlength=len(kelimeler)))))
+
+    def add_rows(self, rows):
+        """Yeni satırları ek sözlüğe işler (tablonun sonuna eklenmiş kabul edilir)"""
+        for row in rows:
+            for col in self.columns:
+                for kelime in tokenize(row.get(col)):
+                    self.delta.setdefault(kelime, []).append(self.n)
+                    self._delta_size += 1
+            self.n += 1
+        if self._delta_size > self.DELTA_LIMIT:
+            self._merge_delta()
+
+    def _merge_delta(self):
+        kelime_id = {k: i for i, k in enumerate(self.vocab)}
+        ana_kelime = np.repeat(np.arange(len(self.vocab)), np.diff(self.offsets))
+        ek_kelime, ek_satir = [], []
+        for kelime, satirlar in self.delta.items():
+            ek_kelime.extend([kelime_id.setdefault(kelime, len(kelime_id))] * len(satirlar))
+            ek_satir.extend(satirlar)
+        self._set_postings(
+            np.array(list(kelime_id), dtype=object),
+            np.concatenate([ana_kelime, np.asarray(ek_kelime, dtype=np.int64)]),
+            np.concatenate([self.rows, np.asarray(ek_satir, dtype=np.int64)]),
+        )
+        self.delta, self._delta_size = {}, 0
+
+    def prefix_rows(self, prefix):
+        """Öneki verilen kelimelerden herhangi birini içeren satır konumları (tekrar içerebilir)"""
+        lo = int(np.searchsorted(self.vocab, prefix, side='left'))
+        hi = int(np.searchsorted(self.vocab, prefix + '\U0010ffff', side='left'))
+        parcalar = [self.rows[self.offsets[lo]:self.offsets[hi]]]
+        for kelime, satirlar in self.delta.items():
+            if kelime.startswith(prefix):
+                parcalar.append(np.asarray(satirlar, dtype=np.int64))
+        return np.concatenate(parcalar)
+
+
+def _query_terms(query):
+    """
+    Sorgu terimleri: ayraç içeren parçalar ('wht-0012') bütün olarak,
+    diğerleri kelime olarak aranır. Her terim bir önektir.
+    """
+    terimler = []
+    for parca in normalize_text(query).split():
+        kelimeler = _KELIME.findall(parca)
+        if len(kelimeler) > 1 or (kelimeler and kelimeler[0] != parca):
+            terimler.append(parca)
+        else:
+            terimler.extend(kelimeler)
+    return terimler
+
+
+class SearchIndex:
+    """
+    Süreç genelinde paylaşılan arama indeksleri (tablo başına bir tane).
+
+    - İlk aramada tablodan kurulur, ekleme (append) yazmalarında artımlı büyür
+    - Cache'teki tablo yeniden okunduğunda veya geçersiz kılındığında
+      (nesil / sürüm değiştiğinde) tekrar kurulur
+    - Sorgu kelimelerinin HEPSİ (AND) önek olarak eşleşmelidir
+    - İndekslenemeyen tablolar (arşivle birleştirilmiş, filtrelenmiş) aynı kurallarla taranır
+    """
+
+    def __init__(self, columns=SEARCH_COLUMNS):
+        self.columns = columns
+        self._lock = threading.RLock()
+        self._indexes = {}
+
+    def _build(self, name, df):
+        index = _TableIndex([c for c in self.columns[name] if c in df.columns])
+        index.build(df)
+        return index
+
+    def _get(self, name, df):
+        surum = (table_cache.generation(name), table_cache.version(name))
+        with self._lock:
+            index = self._indexes.get(name)
+            guncel = index is not None and (index.generation, index.version) == surum
+            if guncel and index.n < len(df):
+                # Kuyruk senkronuyla gelen satırlar (başka süreçlerin eklemeleri) artımlı işlenir;
+                # kuyruk senkronu sürümü değiştirmez
+                index.add_rows(df.sort_index().iloc[index.n:].to_dict('records'))
+            if not guncel or index.n != len(df):
+                # Kurulum tablo sırasıyla yapılır (satır konumu = index etiketi)
+                index = self._build(name, df.sort_index())
+                index.generation, index.version = surum
+                self._indexes[name] = index
+            return index
+
+    def _scan(self, name, df, query):
+        """İndekssiz tarama: indeksle AYNI kurallar (aranabilir sütunlar, kelime öneki, tüm terimler)"""
+        kolon_kelimeleri = []
+        for col in self.columns[name]:
+            if col in df.columns:
+                codes, uniques = pd.factorize(df[col], use_na_sentinel=True)
+                kolon_kelimeleri.append((codes, [tokenize(v) for v in uniques]))
+
+        eslesen = np.ones(len(df), dtype=bool)
+        for terim in _query_terms(query):
+            terim_maskesi = np.zeros(len(df), dtype=bool)
+            for codes, kelimeler in kolon_kelimeleri:
+                if not kelimeler:
+                    continue
+                uyan = np.array([any(k.startswith(terim) for k in ks) for ks in kelimeler], dtype=bool)
+                terim_maskesi |= (codes >= 0) & uyan[np.maximum(codes, 0)]
+            eslesen &= terim_maskesi
+            if not eslesen.any():
+                break
+        return eslesen
+
+    def search(self, name, df, query):
+        """
+        Sorguya uyan satırlar için boolean maske döndürür (df ile aynı sırada).
+        İndeks, df fetch_data(name) ile alınmış tablo ise (sıralanmış olabilir; df.index
+        etiketleri konum olarak kullanılır) kullanılır. Arşivle birleştirilmiş veya
+        filtrelenmiş tablolar aynı önek kurallarıyla taranır: sonuç kümesi, hangi yoldan
+        gelirse gelsin aynıdır. Kayıtlı olmayan tablolarda düz metin taraması yapılır.
+        """
+        if df is None or df.empty or not str(query).strip():
+            return np.ones(0 if df is None else len(df), dtype=bool)
+
+        if name not in self.columns:
+            return df.astype(str).apply(
+                lambda x: x.str.contains(str(query), case=False, na=False, regex=False)
+            ).any(axis=1).to_numpy()
+
+        # Sıralanmış tablolarda orijinal konumlar index etiketlerindedir
+        konumlar = df.index.to_numpy()
+        if not (pd.api.types.is_integer_dtype(konumlar) and konumlar.min() == 0
+                and konumlar.max() == len(df) - 1 and df.index.is_unique
+                and table_cache.length(name) == len(df)):
+            # Konum eşleşmesi yok (arşivli / filtrelenmiş / bekleyen yazmalı tablo) - indekssiz tara
+            return self._scan(name, df, query)
+
+        index = self._get(name, df)
+        eslesen = np.ones(len(df), dtype=bool)
+        with self._lock:
+            for terim in _query_terms(query):
+                terim_maskesi = np.zeros(len(df), dtype=bool)
+                terim_maskesi[index.prefix_rows(terim)] = True
+                eslesen &= terim_maskesi
+                if not eslesen.any():
+                    break
+        return eslesen[konumlar]
+
+    # --- Yazma dinleyicisi ---
+    def on_write(self, worksheet, action, rows):
+        """Eklenen satırlar indekse işlenir; diğer yazmalarda indeks atılır"""
+        if worksheet not in self.columns:
+            return
+        with self._lock:
+            index = self._indexes.get(worksheet)
+            if index is None:
+                return
+            if action == "append" and rows:
+                index.add_rows(rows)
+                # Cache'e ekleme de sürümü bir artırır; indeks o sürümle eşleşik kalır
+                if index.version is not None:
+                    index.version += 1
+            elif action != "append":
+                self._indexes.pop(worksheet, None)
+
+    def stats(self):
+        """Debug ekranı için özet"""
+        with self._lock:
+            return {name: {"satir": idx.n, "kelime": len(idx.vocab), "ek": idx._delta_size}
+                    for name, idx in self._indexes.items()}
+
+
+# Süreç genelinde tek örnek
+search_index = SearchIndex()
+add_write_listener(search_index.on_write)
@@ -0,0 +1,190 @@
+"""
+SİLO STOK MOTORU
+Hareket bazlı artımlı silo güncellemesi (tam tarama gerektirmez)
+"""
+
+import pandas as pd
+
+# Girişlerden tonaj ağırlıklı ortalaması tutulan kalite/maliyet alanları
+SILO_KALITE_PARAMETRELERI = ['protein', 'gluten', 'rutubet', 'hektolitre', 'sedim', 'maliyet']
+
+# Artımlı hesap için silolar tablosunda tutulan kümülatif alanlar
+SILO_KUMULATIF_KOLONLAR = ['toplam_giris', 'toplam_cikis']
+
+# Silo kartının yazma sürümü: artımlı güncelleme bu değer değişmemişse yazılır (compare-and-set)
+SILO_SURUM_KOLONU = 'kart_surumu'
+
+# Arşivleme sonrası sıcak tabloda kalan silo başına devir satırları:
+# arşivlenen girişlerin / çıkışların toplamı (giriş parametreleri tonaj ağırlıklı)
+DEVIR_GIRIS = 'Devir Giriş'
+DEVIR_CIKIS = 'Devir Çıkış'
+GIRIS_TIPLERI = ('Giriş', DEVIR_GIRIS)
+CIKIS_TIPLERI = ('Çıkış', DEVIR_CIKIS)
+
+
+def _num(value):
+    """Boş / hatalı değerleri 0.0 kabul eden sayı dönüşümü"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if pd.isna(value) else value
+
+
+def apply_movement(silo, hareket_tipi, miktar, params=None, geri_al=False):
+    """
+    Tek bir stok hareketini silo kartına uygular.
+
+    Ağırlıklı ortalamalar ortalama × toplam_giris çarpımı üzerinden yürür;
+    yani yeni değer = (eski_ort × eski_giris ± miktar × değer) / yeni_giris.
+    Böylece geçmiş hareketler hiç okunmadan tam yeniden hesapla aynı sonuç elde edilir.
+
+    Args:
+        silo: Silo satırı (dict) - toplam_giris / toplam_cikis alanlarını içermeli
+        hareket_tipi: 'Giriş' veya 'Çıkış'
+        miktar: Hareket tonajı
+        params: Hareketin kalite/maliyet değerleri (sadece Giriş için)
+        geri_al: True ise hareketin etkisi geri alınır (silme / düzeltme)
+
+    Returns:
+        dict: Silo satırında değişen alanlar (boş dict = etkisiz hareket)
+    """
+    params = params or {}
+    isaret = -1.0 if geri_al else 1.0
+    tonaj = abs(_num(miktar))
+
+    eski_giris = _num(silo.get('toplam_giris'))
+    eski_cikis = _num(silo.get('toplam_cikis'))
+    degisen = {}
+
+    if hareket_tipi == 'Giriş':
+        yeni_giris = max(0.0, eski_giris + isaret * tonaj)
+        if yeni_giris < 1e-9:
+            yeni_giris = 0.0
+
+        for param in SILO_KALITE_PARAMETRELERI:
+            if param not in silo:
+                continue
+            agirlikli_toplam = _num(silo.get(param)) * eski_giris + isaret * tonaj * _num(params.get(param))
+            degisen[param] = agirlikli_toplam / yeni_giris if yeni_giris > 0 else 0.0
+
+        degisen['toplam_giris'] = yeni_giris
+    elif hareket_tipi == 'Çıkış':
+        degisen['toplam_cikis'] = max(0.0, eski_cikis + isaret * tonaj)
+    else:
+        return {}
+
+    degisen['mevcut_miktar'] = max(
+        0.0,
+        degisen.get('toplam_giris', eski_giris) - degisen.get('toplam_cikis', eski_cikis)
+    )
+    return degisen
+
+
+def reconcile_silos(df_silolar, df_hareketler):
+    """
+    Tüm silo kartlarını hareket geçmişinden TEK GEÇİŞTE yeniden hesaplar (mutabakat).
+
+    Tek bir groupby(['silo_isim', 'hareket_tipi']) ile giriş/çıkış tonajları ve
+    tonaj × parametre toplamları çıkarılır, sonuç silolar tablosuna map ile işlenir.
+    Maliyet O(hareket sayısı)'dır; silo sayısıyla çarpılmaz.
+    Devir satırları giriş / çıkış sayılır; arşivlenmiş geçmiş okunmadan aynı sonuç çıkar.
+
+    Args:
+        df_silolar: Silolar tablosu ('isim' sütunu zorunlu)
+        df_hareketler: Hareketler tablosu
+
+    Returns:
+        DataFrame: Güncellenmiş silolar tablosu (kopya)
+    """
+    df = df_silolar.copy()
+    isim = df['isim']
+
+    if df_hareketler is None or df_hareketler.empty or \
+            'silo_isim' not in df_hareketler.columns or 'hareket_tipi' not in df_hareketler.columns:
+        df_hareketler = pd.DataFrame(columns=['silo_isim', 'hareket_tipi', 'miktar'])
+
+    miktar = pd.to_numeric(df_hareketler['miktar'], errors='coerce').fillna(0.0) \
+        if 'miktar' in df_hareketler.columns else pd.Series(0.0, index=df_hareketler.index)
+
+    calisma = {
+        'silo_isim': df_hareketler['silo_isim'],
+        'hareket_tipi': df_hareketler['hareket_tipi'],
+        'miktar': miktar,
+    }
+    for param in SILO_KALITE_PARAMETRELERI:
+        if param in df_hareketler.columns:
+            calisma[param] = miktar * pd.to_numeric(df_hareketler[param], errors='coerce').fillna(0.0)
+        else:
+            calisma[param] = 0.0
+
+    toplamlar = pd.DataFrame(calisma).groupby(['silo_isim', 'hareket_tipi'], sort=False, observed=True).sum()
+    tipler = toplamlar.index.get_level_values('hareket_tipi')
+    girisler = toplamlar[tipler.isin(GIRIS_TIPLERI)].groupby(level='silo_isim', sort=False).sum()
+    cikislar = toplamlar[tipler.isin(CIKIS_TIPLERI)].groupby(level='silo_isim', sort=False).sum()
+
+    toplam_giris = isim.map(girisler['miktar']).fillna(0.0).astype(float)
+    toplam_cikis = isim.map(cikislar['miktar']).fillna(0.0).astype(float)
+    giris_var = toplam_giris > 0
+
+    df['toplam_giris'] = toplam_giris
+    df['toplam_cikis'] = toplam_cikis
+    # Mutabakattan önce okunmuş kartlarla yapılan artımlı yazmalar reddedilsin
+    surum = pd.to_numeric(df[SILO_SURUM_KOLONU], errors='coerce') if SILO_SURUM_KOLONU in df.columns else 0
+    df[SILO_SURUM_KOLONU] = (pd.Series(surum, index=df.index).fillna(0) + 1).astype(int)
+    df['mevcut_miktar'] = (toplam_giris - toplam_cikis).clip(lower=0.0)
+
+    # Ağırlıklı ortalamalar sadece girişlerden
+    for param in SILO_KALITE_PARAMETRELERI:
+        ortalama = (isim.map(girisler[param]).fillna(0.0) / toplam_giris.where(giris_var)).fillna(0.0)
+        if param in ('protein', 'maliyet'):
+            # Girişi olmayan silolarda sıfırlanır
+            df[param] = ortalama
+        elif param in df.columns:
+            # Diğer parametreler sadece giriş varsa güncellenir
+            df[param] = ortalama.where(giris_var, df[param])
+
+    return df
+
+
+def carry_forward(df_hareketler, params):
+    """
+    Arşive taşınan hareketlerin silo başına devir satırları.
+
+    Toplamlar reconcile_silos ile aynı yoldan çıkar: devir girişi arşivlenen girişlerin
+    tonajı, parametreleri tonaj ağırlıklı ortalamasıdır. Böylece sıcak tablo + devir
+    satırlarıyla yapılan mutabakat tüm geçmişle yapılanla aynı sonucu verir.
+
+    Args:
+        df_hareketler: Arşivlenmiş hareketler (tüm bölümler)
+        params: Devir girişine taşınacak parametre sütunları
+
+    Returns:
+        list[dict]: silo_isim, hareket_tipi (DEVIR_GIRIS / DEVIR_CIKIS), miktar ve parametreler
+    """
+    if df_hareketler is None or df_hareketler.empty or \
+            'silo_isim' not in df_hareketler.columns or 'hareket_tipi' not in df_hareketler.columns:
+        return []
+
+    miktar = pd.to_numeric(df_hareketler['miktar'], errors='coerce').fillna(0.0) \
+        if 'miktar' in df_hareketler.columns else pd.Series(0.0, index=df_hareketler.index)
+    params = [p for p in params if p in df_hareketler.columns]
+    tip = df_hareketler['hareket_tipi'].astype(str)
+
+    satirlar = []
+    giris = tip.isin(GIRIS_TIPLERI)
+    calisma = pd.DataFrame({'miktar': miktar[giris]})
+    for param in params:
+        calisma[param] = miktar[giris] * pd.to_numeric(df_hareketler.loc[giris, param], errors='coerce').fillna(0.0)
+    for silo, toplam in calisma.groupby(df_hareketler.loc[giris, 'silo_isim'], sort=True).sum().iterrows():
+        if toplam['miktar'] == 0:
+            continue
+        satir = {'silo_isim': silo, 'hareket_tipi': DEVIR_GIRIS, 'miktar': float(toplam['miktar'])}
+        satir.update({param: float(toplam[param] / toplam['miktar']) for param in params})
+        satirlar.append(satir)
+
+    cikis = tip.isin(CIKIS_TIPLERI)
+    for silo, toplam in miktar[cikis].groupby(df_hareketler.loc[cikis, 'silo_isim'], sort=True).sum().items():
+        if toplam != 0:
+            satirlar.append({'silo_isim': silo, 'hareket_tipi': DEVIR_CIKIS, 'miktar': float(toplam)})
+    return satirlar
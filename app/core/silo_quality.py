@@ -0,0 +1,190 @@
+"""
+SİLO TAVLI KALİTE ÖZETİ (MATERIALIZED VIEW)
+Her silo için tavlı analizlerin tonaj ve tonaj x parametre toplamları.
+Ağırlıklı ortalama her istekte tablodan yeniden hesaplanmaz; kayıt eklendiğinde,
+düzenlendiğinde veya silindiğinde sadece ilgili toplamlar güncellenir.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import SILO_QUALITY_MAX_AGE
+from app.core.schema import apply_schema
+from app.core.storage import add_write_listener
+
+TAVLI_TABLE = "tavli_analiz"
+
+# Ağırlıklı ortalaması tutulan tavlı analiz parametreleri
+TAVLI_PARAMETRELERI = [
+    'protein', 'rutubet', 'gluten', 'gluten_index',
+    'sedim', 'g_sedim', 'fn', 'ffn', 'amilograph', 'kul',
+    'su_kaldirma_f', 'gelisme_suresi', 'stabilite', 'yumusama',
+    'su_kaldirma_e', 'enerji45', 'direnc45', 'taban45',
+    'enerji90', 'direnc90', 'taban90', 'enerji135',
+    'direnc135', 'taban135'
+]
+
+# Toplam vektörü: [tonaj, analiz sayısı, tonaj x parametre ...]
+_TONAJ, _ADET, _ILK_PARAMETRE = 0, 1, 2
+
+# Bu tonajın altı "analiz yok" sayılır (artımlı çıkarmalardaki yuvarlama artığı)
+_BOS_TONAJ = 1e-9
+
+
+def _to_frame(rows):
+    if rows is None:
+        return pd.DataFrame()
+    if isinstance(rows, pd.DataFrame):
+        return rows
+    if isinstance(rows, pd.Series):
+        return rows.to_frame().T
+    if isinstance(rows, dict):
+        rows = [rows]
+    return pd.DataFrame(list(rows))
+
+
+def _katkilar(df):
+    """Satırların silo adları ve toplam vektörlerine katkı matrisi"""
+    if df is None or df.empty or 'silo_isim' not in df.columns:
+        return np.array([], dtype=object), np.zeros((0, _ILK_PARAMETRE + len(TAVLI_PARAMETRELERI)))
+
+    df = apply_schema(TAVLI_TABLE, df)
+    if 'analiz_tonaj' in df.columns:
+        tonaj = pd.to_numeric(df['analiz_tonaj'], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+    else:
+        tonaj = np.zeros(len(df))
+
+    matris = np.zeros((len(df), _ILK_PARAMETRE + len(TAVLI_PARAMETRELERI)))
+    matris[:, _TONAJ] = tonaj
+    matris[:, _ADET] = 1.0
+    for i, param in enumerate(TAVLI_PARAMETRELERI):
+        if param in df.columns:
+            degerler = pd.to_numeric(df[param], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+            matris[:, _ILK_PARAMETRE + i] = tonaj * degerler
+    return df['silo_isim'].to_numpy(dtype=object), matris
+
+
+class SiloQualityStore:
+    """
+    Süreç genelinde paylaşılan silo -> tavlı analiz toplamları.
+
+    - İlk kullanımda tablodan bir kez kurulur (tek groupby)
+    - Ekleme (append) yazmaları toplamlara artımlı işlenir
+    - Düzenleme / silme: expect_change() ile bildirilen fark uygulanır,
+      bildirilmeyen tam tablo yazmaları yeniden kurulumu tetikler
+    - max_age sonunda dış yazmalar için tekrar kurulur
+    """
+
+    def __init__(self, max_age=SILO_QUALITY_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._sums = {}
+        self._built_at = None
+        self._pending = threading.local()
+
+    def build(self, df):
+        """Toplamları tablonun tamamından kurar"""
+        silolar, matris = _katkilar(df)
+        sums = {}
+        if len(silolar):
+            toplam = pd.DataFrame(matris).groupby(silolar, sort=False).sum()
+            sums = dict(zip(toplam.index, toplam.to_numpy()))
+        with self._lock:
+            self._sums = sums
+            self._built_at = time.time()
+
+    def ensure(self, loader):
+        """Kurulu değilse veya süresi dolduysa loader() ile tabloyu alıp kurar"""
+        with self._lock:
+            taze = self._built_at is not None and time.time() - self._built_at < self.max_age
+        if not taze:
+            self.build(loader())
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _apply(self, rows, sign):
+        silolar, matris = _katkilar(_to_frame(rows))
+        for silo, katki in zip(silolar, matris):
+            if pd.isna(silo):
+                continue
+            onceki = self._sums.get(silo)
+            self._sums[silo] = sign * katki if onceki is None else onceki + sign * katki
+
+    @contextmanager
+    def expect_change(self, removed=None, added=None):
+        """
+        Blok içindeki tam tablo yazması (conn.update) için fark bildirir:
+        removed satırları toplamlardan çıkarılır, added satırları eklenir.
+        Yazma gerçekleşmezse toplamlar değişmez.
+        """
+        self._pending.degisiklik = (removed, added)
+        try:
+            yield
+        finally:
+            self._pending.degisiklik = None
+
+    # --- Yazma dinleyicisi ---
+    def on_write(self, worksheet, action, rows):
+        if worksheet != TAVLI_TABLE:
+            return
+        bekleyen = getattr(self._pending, 'degisiklik', None)
+        self._pending.degisiklik = None
+        with self._lock:
+            if self._built_at is None:
+                return
+            if action == "append":
+                if rows:
+                    self._apply(rows, 1.0)
+            elif bekleyen is not None:
+                removed, added = bekleyen
+                self._apply(removed, -1.0)
+                self._apply(added, 1.0)
+            else:
+                self._built_at = None
+
+    # --- Okuma ---
+    @staticmethod
+    def _ortalama(toplam):
+        tonaj = float(toplam[_TONAJ])
+        if tonaj <= _BOS_TONAJ:
+            return None
+        ortalama = {param: float(toplam[_ILK_PARAMETRE + i] / tonaj)
+                    for i, param in enumerate(TAVLI_PARAMETRELERI)}
+        ortalama['toplam_tonaj'] = tonaj
+        ortalama['analiz_sayisi'] = int(round(toplam[_ADET]))
+        return ortalama
+
+    def get(self, silo_isim):
+        """Silonun tonaj ağırlıklı ortalamaları (analiz yoksa None)"""
+        with self._lock:
+            toplam = self._sums.get(silo_isim)
+            return None if toplam is None else self._ortalama(toplam)
+
+    def get_all(self):
+        """Analizi olan tüm silolar: {silo: ortalamalar}"""
+        with self._lock:
+            sonuc = {}
+            for silo, toplam in self._sums.items():
+                ortalama = self._ortalama(toplam)
+                if ortalama is not None:
+                    sonuc[silo] = ortalama
+            return sonuc
+
+    def stats(self):
+        """Debug ekranı için özet"""
+        with self._lock:
+            return {
+                "silo": len(self._sums),
+                "yas_sn": None if self._built_at is None else round(time.time() - self._built_at, 1),
+            }
+
+
+# Süreç genelinde tek örnek
+silo_quality = SiloQualityStore()
+add_write_listener(silo_quality.on_write)
@@ -0,0 +1,103 @@
+"""
+YEREL SÜTUNLU ANLIK GÖRÜNTÜ (PARQUET SNAPSHOT)
+Her worksheet diskte Parquet olarak, depodaki sürüm işaretiyle (etag) birlikte tutulur.
+Soğuk başlangıçta sürüm değişmemişse tablo ağdan değil diskten (milisaniyede) yüklenir.
+"""
+
+import os
+import threading
+import time
+
+from app.core.config import SNAPSHOT_DIR, SNAPSHOT_ENABLED
+
+# pyarrow opsiyonel: yoksa snapshot devre dışı kalır, sistem eskisi gibi çalışır
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+_ETAG_KEY = b"smartmill_etag"
+_SAVED_AT_KEY = b"smartmill_saved_at"
+
+
+class SnapshotStore:
+    """
+    Worksheet başına bir Parquet dosyası.
+
+    Sütun tipleri dosyayla birlikte saklanır; yüklenen tablo backend'den
+    okunan tabloyla aynı dtype'lara sahiptir. Tipleri tutarlı saklanamayan
+    (aynı sütunda sayı + metin karışık) tablolar için snapshot tutulmaz.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, enabled=SNAPSHOT_ENABLED):
+        self.directory = directory
+        self.enabled = enabled and PARQUET_AVAILABLE
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        guvenli = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(name))
+        return os.path.join(self.directory, f"{guvenli}.parquet")
+
+    def load(self, name, etag):
+        """
+        Snapshot'ı döndürür; yoksa, etag bilinmiyorsa veya eşleşmiyorsa None.
+        """
+        if not self.enabled or etag is None:
+            return None
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            metadata = pq.read_schema(path).metadata or {}
+            if metadata.get(_ETAG_KEY, b"").decode("utf-8") != str(etag):
+                return None
+            return pq.read_table(path).to_pandas()
+        except Exception:
+            return None
+
+    def save(self, name, df, etag):
+        """
+        Tabloyu etag ile birlikte diske yazar (atomik). Başarısızsa eski dosyayı siler.
+        Returns: bool
+        """
+        if not self.enabled or etag is None or df is None:
+            return False
+        path = self._path(name)
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[_ETAG_KEY] = str(etag).encode("utf-8")
+            metadata[_SAVED_AT_KEY] = str(time.time()).encode("utf-8")
+            table = table.replace_schema_metadata(metadata)
+
+            with self._lock:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                pq.write_table(table, tmp_path)
+                os.replace(tmp_path, path)
+            return True
+        except Exception:
+            # Karışık tipli sütun vb. - bu tablo için snapshot tutma
+            self.remove(name)
+            return False
+
+    def remove(self, name=None):
+        """Tek bir tablonun (veya tümünün) snapshot'ını siler"""
+        if not os.path.isdir(self.directory):
+            return
+        with self._lock:
+            if name is not None:
+                paths = [self._path(name)]
+            else:
+                paths = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.endswith(".parquet")]
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+# Süreç genelinde tek örnek
+snapshot_store = SnapshotStore()
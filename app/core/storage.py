@@ -0,0 +1,901 @@
+"""
+DEPOLAMA KATMANI (STORAGE BACKEND)
+Google Sheets veya yerel SQLite - aynı arayüz, değiştirilebilir motor
+"""
+
+import bisect
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, date
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from app.core.config import STORAGE_BACKEND, SQLITE_DB_PATH, SQLITE_INDEX_COLUMNS, ETAG_CACHE_SECONDS
+from app.core.backend_client import backend_client
+from app.core.schema import parse_datetime, restore_unparsed_dates
+
+# Toplu ekleme: tek API çağrısında gönderilecek maksimum satır sayısı
+APPEND_BATCH_SIZE = 500
+
+
+# ==================== HATALAR ====================
+class StorageError(Exception):
+    """Depolama katmanı hatası"""
+
+
+class MissingColumnError(StorageError):
+    """Filtre veya güncelleme için istenen sütun tabloda yok"""
+
+    def __init__(self, column):
+        super().__init__(f"'{column}' sütunu bulunamadı!")
+        self.column = column
+
+
+# ==================== YAZMA DİNLEYİCİLERİ ====================
+_WRITE_LISTENERS = []
+_ETAG_CACHE = {}   # anahtar -> (etag, zaman)
+
+
+def add_write_listener(callback):
+    """
+    Her başarılı yazmadan sonra çağrılacak fonksiyonu kaydeder.
+    callback(worksheet, action, rows) - action: 'append' | 'update' | 'update_where' | 'delete_where'
+    rows yalnızca 'append' için dolu gelir.
+    """
+    if callback not in _WRITE_LISTENERS:
+        _WRITE_LISTENERS.append(callback)
+
+
+def _notify_write(worksheet, action, rows=None):
+    """Dinleyicileri bilgilendirir; dinleyici hatası yazmayı bozmaz"""
+    _ETAG_CACHE.clear()
+    for callback in list(_WRITE_LISTENERS):
+        try:
+            callback(worksheet, action, rows)
+        except Exception:
+            pass
+
+
+# ==================== YARDIMCILAR ====================
+def _to_cell(value):
+    """Python/Pandas değerini depoya yazılabilir sade bir değere çevirir (boş -> None)"""
+    if value is None:
+        return None
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def _sheet_cell(value):
+    """Google Sheets için hücre değeri (boş hücre = "")"""
+    value = _to_cell(value)
+    return "" if value is None else value
+
+
+def _filter_mask(df, filter_dict):
+    """
+    DataFrame üzerinde eşitlik filtresi (tüm koşullar AND).
+    Değerler _key ile karşılaştırılır (5 / 5.0 / '5' aynı, boş = NaN) - tüm motorlarla aynı kural.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for key, value in filter_dict.items():
+        if key not in df.columns:
+            raise MissingColumnError(key)
+        aranan = _key(value)
+        # Her farklı değer bir kez normalize edilir
+        codes, uniques = pd.factorize(df[key], use_na_sentinel=True)
+        eslesen = np.fromiter((_key(u) == aranan for u in uniques), dtype=bool, count=len(uniques))
+        mask &= np.where(codes >= 0, eslesen[np.maximum(codes, 0)] if len(uniques) else False, aranan == "")
+    return mask
+
+
+def _key_variants(value):
+    """
+    _key ile aynı anahtara düşen saklama biçimleri. SQLite sütunları tipsizdir;
+    5, 5.0 ve '5' ayrı değerlerdir, filtre hepsini (indeks kullanılarak) yakalamalıdır.
+    """
+    anahtar = _key(value)
+    bicimler = [anahtar]
+    try:
+        sayi = float(anahtar)
+    except ValueError:
+        return bicimler
+    if math.isfinite(sayi):
+        for aday in ([int(sayi)] if sayi.is_integer() else []) + [sayi]:
+            if _key(aday) == anahtar:
+                bicimler.append(aday)
+    return bicimler
+
+
+# ==================== ARAYÜZ ====================
+class StorageBackend:
+    """
+    Tüm depolama motorlarının uyması gereken arayüz.
+
+    read/update imzaları st.connection("gsheets") ile aynıdır; böylece
+    modüllerdeki mevcut conn.read(...) / conn.update(...) çağrıları
+    motor değişse de çalışmaya devam eder.
+    """
+
+    name = "base"
+
+    # Motor gerçek işlem (rollback) destekliyor mu?
+    atomic = False
+
+    def read(self, worksheet, ttl=None):
+        """Tablonun tamamını DataFrame olarak döndürür"""
+        raise NotImplementedError
+
+    def update(self, worksheet, data):
+        """Tablonun tamamını verilen DataFrame ile değiştirir"""
+        raise NotImplementedError
+
+    def create(self, worksheet, data):
+        """Yeni tablo (sekme) oluşturur ve verilen DataFrame'i yazar"""
+        return self.update(worksheet, data)
+
+    def append(self, worksheet, rows):
+        """Satırları (dict listesi) tablonun sonuna ekler"""
+        raise NotImplementedError
+
+    def update_where(self, worksheet, filter_dict, update_dict, add_columns=False):
+        """
+        Filtreye uyan satırları günceller, etkilenen satır sayısını döndürür.
+        add_columns=True ise tabloda olmayan güncelleme sütunları oluşturulur.
+        """
+        raise NotImplementedError
+
+    def update_many(self, worksheet, updates, add_columns=False):
+        """
+        Birden fazla (filtre, güncelleme) çiftini tek yazmada uygular.
+        updates: [(filter_dict, update_dict), ...]; her çift için etkilenen satır sayısı döner.
+        """
+        with self.transaction():
+            return [self.update_where(worksheet, f, u, add_columns=add_columns) for f, u in updates]
+
+    def delete_where(self, worksheet, filter_dict):
+        """Filtreye uyan satırları siler, silinen satır sayısını döndürür"""
+        raise NotImplementedError
+
+    def delete_head(self, worksheet, count, boundary=None):
+        """
+        İlk `count` veri satırını siler (zaman sıralı tablonun arşivlenen başı).
+        boundary ({sütun: değer}) silinecek son satırla karşılaştırılır; tablo bu arada
+        değiştiyse StorageError fırlatılır ve hiçbir satır silinmez.
+        """
+        raise NotImplementedError
+
+    def read_tail(self, worksheet, start_row):
+        """
+        start_row (0 tabanlı veri satırı) ve sonrasını DataFrame olarak döndürür.
+        Append-only tabloların kuyruk senkronu içindir; desteklenmiyorsa None.
+        """
+        return None
+
+    def etag(self, worksheet):
+        """
+        Tablonun sürüm işareti (değiştiğinde farklı bir değer döner).
+        Motor bunu ucuzca sağlayamıyorsa None (yerel snapshot kullanılmaz).
+        """
+        return None
+
+    @contextmanager
+    def transaction(self):
+        """İşlem bloğu (destekleyen motorlarda ya hep ya hiç)"""
+        yield self
+
+
+# ==================== SATIR İNDEKSİ (GOOGLE SHEETS) ====================
+def _key(value):
+    """Anahtar karşılaştırması için normalize metin (12.0 -> '12', boş -> '')"""
+    value = _to_cell(value)
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+# Google Sheets tarih seri numaralarının başlangıcı (UNFORMATTED_VALUE)
+_SHEETS_EPOCH = pd.Timestamp('1899-12-30')
+
+
+def _same_cell(current, expected):
+    """
+    Sınır satırı karşılaştırması: normalize metin aynı mı; değilse ikisi de aynı anı mı
+    gösteriyor (tarih metni farklı biçimde veya Sheets seri numarası olarak dönebilir)
+    """
+    if _key(current) == _key(expected):
+        return True
+    if isinstance(current, (int, float)) and not isinstance(current, bool):
+        current = _SHEETS_EPOCH + pd.to_timedelta(float(current), unit='D')
+    anlar = parse_datetime(pd.Series([current, expected], dtype=object))
+    return bool(anlar.notna().all()) and abs(anlar.iloc[0] - anlar.iloc[1]) < pd.Timedelta(seconds=1)
+
+
+def _boundary_matches(current, boundary):
+    return current is not None and all(_same_cell(current.get(c), v) for c, v in boundary.items())
+
+
+def _a1(row, col):
+    """(satır, sütun) -> A1 notasyonu (1 tabanlı)"""
+    harfler = ""
+    while col > 0:
+        col, kalan = divmod(col - 1, 26)
+        harfler = chr(65 + kalan) + harfler
+    return f"{harfler}{row}"
+
+
+def _first_row_of_range(a1_range):
+    """Aralığın ilk satır numarası: 'hareketler'!A101:P103 -> 101 (bulunamazsa None)"""
+    match = re.search(r"![A-Z]+(\d+)", a1_range or "")
+    return int(match.group(1)) if match else None
+
+
+class SheetRowIndex:
+    """
+    Bir worksheet için başlık + anahtar değeri -> satır numarası indeksi.
+
+    Anahtar sütunu ilk kullanıldığında tek sütun okunarak kurulur; ekleme,
+    güncelleme ve silmelerde yerinde güncellenir. Tam sayfa yeniden
+    yazıldığında (update) indeks atılır. Yazmadan önce hedef satırlar
+    okunup doğrulandığından, dışarıdan yapılan değişiklikler indeksi bozsa bile
+    yanlış satıra yazılmaz (indeks yeniden kurulur).
+    """
+
+    def __init__(self, header):
+        self.header = list(header)
+        self.keys = {}   # sütun -> {anahtar: [satır_no, ...]}
+
+    def rows_for(self, ws, column, value, call=None):
+        """call(func, *args, **kwargs): API çağrısını yapan sarmalayıcı (hız sınırı için)"""
+        if column not in self.keys:
+            call = call or (lambda func, *args, **kwargs: func(*args, **kwargs))
+            values = call(ws.col_values, self.header.index(column) + 1, value_render_option="UNFORMATTED_VALUE")
+            mapping = {}
+            for row_no, cell in enumerate(values[1:], start=2):
+                mapping.setdefault(_key(cell), []).append(row_no)
+            self.keys[column] = mapping
+        return list(self.keys[column].get(_key(value), []))
+
+    def on_append(self, first_row, rows):
+        for column, mapping in self.keys.items():
+            for offset, row in enumerate(rows):
+                mapping.setdefault(_key(row.get(column)), []).append(first_row + offset)
+
+    def on_update(self, row_no, old_row, changes):
+        for column, mapping in self.keys.items():
+            if column not in changes:
+                continue
+            eski = mapping.get(_key(old_row.get(column)), [])
+            if row_no in eski:
+                eski.remove(row_no)
+            mapping.setdefault(_key(changes[column]), []).append(row_no)
+
+    def on_delete(self, row_numbers):
+        silinen = sorted(row_numbers)
+        for column, mapping in self.keys.items():
+            for key, rows in list(mapping.items()):
+                kalan = [r - bisect.bisect_left(silinen, r) for r in rows if r not in row_numbers]
+                if kalan:
+                    mapping[key] = kalan
+                else:
+                    del mapping[key]
+
+
+_ROW_INDEXES = {}
+_SHEET_WRITE_LOCK = threading.RLock()
+
+
+def _drop_row_index(worksheet):
+    _ROW_INDEXES.pop(worksheet, None)
+
+
+# ==================== GOOGLE SHEETS ====================
+class GSheetsBackend(StorageBackend):
+    """
+    st.connection("gsheets") üzerine ince sarmalayıcı.
+    Google Sheets gerçek işlem (transaction) desteklemediği için
+    transaction() bloğu yalnızca gruplama amaçlıdır.
+
+    update_where / delete_where satır indeksi ile sadece ilgili hücreleri /
+    satırları yazar; tablo indirilip yeniden yüklenmez. Böylece farklı
+    satırları düzenleyen iki kullanıcı birbirinin değişikliğini ezmez.
+
+    Tüm API çağrıları backend_client üzerinden gider (kota hız sınırı + tekrar deneme).
+    """
+
+    name = "gsheets"
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _call(self, func, *args, idempotent=False, retries=None, **kwargs):
+        return backend_client.call(self.name, func, *args, idempotent=idempotent, retries=retries, **kwargs)
+
+    def worksheet(self, worksheet):
+        """
+        Satır bazlı işlemler için gspread Worksheet nesnesini döndürür.
+        Servis hesabı olmayan (public) bağlantılarda None döner.
+        """
+        client = getattr(self.conn, "client", None)
+        if client is None or not hasattr(client, "_select_worksheet"):
+            return None
+        return self._call(client._select_worksheet, worksheet=worksheet, idempotent=True)
+
+    def read(self, worksheet, ttl=None):
+        return self._call(self.conn.read, worksheet=worksheet, ttl=ttl, idempotent=True)
+
+    def etag(self, worksheet):
+        """
+        Google Sheets sekme bazlı değişiklik zamanı vermez; Drive'daki dosya
+        modifiedTime değeri (tek hafif API çağrısı) tüm sekmeler için işaret olarak
+        kullanılır ve ETAG_CACHE_SECONDS boyunca tekrar sorulmaz.
+        İşarete dosya kimliği de eklenir (başka bir dosyanın snapshot'ı eşleşmesin).
+        """
+        client = getattr(self.conn, "client", None)
+        if client is None or not hasattr(client, "_open_spreadsheet"):
+            return None
+
+        cached = _ETAG_CACHE.get("gsheets")
+        if cached and time.time() - cached[1] < ETAG_CACHE_SECONDS:
+            return cached[0]
+
+        try:
+            spreadsheet = _ETAG_CACHE.get("gsheets_spreadsheet")
+            if spreadsheet is None:
+                spreadsheet = self._call(client._open_spreadsheet, idempotent=True, retries=0)
+            # Sürüm işareti opsiyoneldir: kota doluysa beklemeden snapshot atlanır
+            token = f"gsheets:{spreadsheet.id}:{self._call(spreadsheet.get_lastUpdateTime, idempotent=True, retries=0)}"
+        except Exception:
+            return None
+
+        _ETAG_CACHE["gsheets"] = (token, time.time())
+        _ETAG_CACHE["gsheets_spreadsheet"] = spreadsheet
+        return token
+
+    def update(self, worksheet, data):
+        data = restore_unparsed_dates(worksheet, data)
+        with _SHEET_WRITE_LOCK:
+            result = self._call(self.conn.update, worksheet=worksheet, data=data)
+            _drop_row_index(worksheet)
+        _notify_write(worksheet, "update")
+        return result
+
+    def create(self, worksheet, data):
+        with _SHEET_WRITE_LOCK:
+            result = self._call(self.conn.create, worksheet=worksheet, data=data)
+            _drop_row_index(worksheet)
+        _notify_write(worksheet, "update")
+        return result
+
+    # --- Başlık / indeks yardımcıları ---
+    def _row_index(self, ws, worksheet):
+        index = _ROW_INDEXES.get(worksheet)
+        if index is None:
+            index = SheetRowIndex(self._call(ws.row_values, 1, idempotent=True))
+            _ROW_INDEXES[worksheet] = index
+        return index
+
+    def _extend_header(self, ws, index, columns):
+        """Başlıkta olmayan sütunları sona ekler"""
+        yeni_kolonlar = [c for c in dict.fromkeys(columns) if c not in index.header]
+        if not yeni_kolonlar:
+            return
+        header = index.header + yeni_kolonlar
+        if len(header) > ws.col_count:
+            self._call(ws.add_cols, len(header) - ws.col_count)
+        self._call(ws.update, range_name="A1", values=[header])
+        index.header = header
+
+    def _match_rows(self, ws, worksheet, filter_dict):
+        """
+        Filtreye uyan satırları [(satır_no, {sütun: değer}), ...] olarak döndürür.
+        İlk filtre sütunu indeks anahtarıdır; aday satırlar tek batch_get ile
+        okunup tüm koşullar doğrulanır. İndeks bayatsa bir kez yeniden kurulur.
+        """
+        if not filter_dict:
+            raise StorageError("Satır bazlı işlem için en az bir filtre gerekli")
+        key_col = next(iter(filter_dict))
+
+        for deneme in range(2):
+            index = self._row_index(ws, worksheet)
+            for column in filter_dict:
+                if column not in index.header:
+                    raise MissingColumnError(column)
+
+            rows = index.rows_for(ws, key_col, filter_dict[key_col], call=partial(self._call, idempotent=True))
+            if not rows:
+                if deneme == 0:
+                    # Başka bir süreç yeni satır eklemiş olabilir
+                    _drop_row_index(worksheet)
+                    continue
+                return index, []
+
+            ranges = [f"{_a1(r, 1)}:{_a1(r, len(index.header))}" for r in rows]
+            fetched = self._call(ws.batch_get, ranges, value_render_option="UNFORMATTED_VALUE", idempotent=True)
+
+            eslesen, bayat = [], False
+            for row_no, value_range in zip(rows, fetched):
+                values = value_range[0] if value_range else []
+                current = {col: (values[i] if i < len(values) else "") for i, col in enumerate(index.header)}
+                if _key(current[key_col]) != _key(filter_dict[key_col]):
+                    bayat = True
+                    break
+                if all(_key(current[c]) == _key(v) for c, v in filter_dict.items()):
+                    eslesen.append((row_no, current))
+
+            if not bayat:
+                return index, eslesen
+            _drop_row_index(worksheet)
+
+        raise StorageError(f"{worksheet}: satır indeksi doğrulanamadı, lütfen tekrar deneyin")
+
+    # --- Arayüz ---
+    def append(self, worksheet, rows):
+        ws = self.worksheet(worksheet)
+
+        if ws is None:
+            # Satır API'si yoksa eski yöntem: tüm sayfayı yeniden yaz
+            df = self.read(worksheet, ttl=0)
+            self.update(worksheet, pd.concat([df, pd.DataFrame(rows)], ignore_index=True))
+            return
+
+        with _SHEET_WRITE_LOCK:
+            # Sütun sırasını başlıktan al, yeni sütun varsa başlığa ekle
+            index = self._row_index(ws, worksheet)
+            self._extend_header(ws, index, [key for row in rows for key in row.keys()])
+            header = index.header
+
+            values = [[_sheet_cell(row.get(col)) for col in header] for row in rows]
+
+            # Toplu gönderim (her parti tek API çağrısı)
+            for start in range(0, len(values), APPEND_BATCH_SIZE):
+                response = self._call(
+                    ws.append_rows,
+                    values[start:start + APPEND_BATCH_SIZE],
+                    value_input_option="USER_ENTERED",
+                    insert_data_option="INSERT_ROWS",
+                    table_range="A1"
+                )
+                first_row = _first_row_of_range((response or {}).get("updates", {}).get("updatedRange"))
+                if first_row is None:
+                    _drop_row_index(worksheet)
+                    index = self._row_index(ws, worksheet)
+                else:
+                    index.on_append(first_row, rows[start:start + APPEND_BATCH_SIZE])
+
+        _notify_write(worksheet, "append", rows)
+
+    def update_where(self, worksheet, filter_dict, update_dict, add_columns=False):
+        return self.update_many(worksheet, [(filter_dict, update_dict)], add_columns=add_columns)[0]
+
+    def update_many(self, worksheet, updates, add_columns=False):
+        ws = self.worksheet(worksheet)
+        if ws is None:
+            return self._update_many_full(worksheet, updates, add_columns)
+
+        with _SHEET_WRITE_LOCK:
+            # Önce tüm hedef satırlar bulunur; eksik sütun / filtre hatası yazmadan önce çıkar
+            eslesmeler = []
+            for filter_dict, _ in updates:
+                index, eslesen = self._match_rows(ws, worksheet, filter_dict)
+                eslesmeler.append(eslesen)
+            index = self._row_index(ws, worksheet)
+
+            eksik = [c for _, update_dict in updates for c in update_dict if c not in index.header]
+            if eksik:
+                if not add_columns:
+                    raise MissingColumnError(eksik[0])
+                self._extend_header(ws, index, eksik)
+
+            # Sadece gerçekten değişen hücreler gönderilir (tüm çiftler tek API çağrısında)
+            data = []
+            for (_, update_dict), eslesen in zip(updates, eslesmeler):
+                for row_no, current in eslesen:
+                    for column, value in update_dict.items():
+                        cell = _sheet_cell(value)
+                        if _key(current.get(column)) == _key(cell):
+                            continue
+                        data.append({"range": _a1(row_no, index.header.index(column) + 1), "values": [[cell]]})
+
+            if data:
+                self._call(ws.batch_update, data, value_input_option="USER_ENTERED")
+            for (_, update_dict), eslesen in zip(updates, eslesmeler):
+                for row_no, current in eslesen:
+                    index.on_update(row_no, current, update_dict)
+
+        if data:
+            _notify_write(worksheet, "update_where")
+        return [len(eslesen) for eslesen in eslesmeler]
+
+    def delete_where(self, worksheet, filter_dict):
+        ws = self.worksheet(worksheet)
+        if ws is None:
+            return self._delete_where_full(worksheet, filter_dict)
+
+        with _SHEET_WRITE_LOCK:
+            index, eslesen = self._match_rows(ws, worksheet, filter_dict)
+            if not eslesen:
+                return 0
+
+            # Alttan yukarı sil ki satır numaraları kaymasın (tek API çağrısı)
+            row_numbers = sorted({row_no for row_no, _ in eslesen}, reverse=True)
+            self._call(ws.spreadsheet.batch_update, {"requests": [
+                {"deleteDimension": {"range": {
+                    "sheetId": ws.id, "dimension": "ROWS",
+                    "startIndex": row_no - 1, "endIndex": row_no
+                }}}
+                for row_no in row_numbers
+            ]})
+            index.on_delete(set(row_numbers))
+
+        _notify_write(worksheet, "delete_where")
+        return len(row_numbers)
+
+    def delete_head(self, worksheet, count, boundary=None):
+        if count <= 0:
+            return 0
+        ws = self.worksheet(worksheet)
+        if ws is None:
+            return self._delete_head_full(worksheet, count, boundary)
+
+        with _SHEET_WRITE_LOCK:
+            if boundary:
+                # Sınır satırı: başlık 1. satır, silinecek son veri satırı count + 1
+                header = self._row_index(ws, worksheet).header
+                values = self._call(ws.row_values, count + 1, value_render_option="UNFORMATTED_VALUE",
+                                    idempotent=True)
+                current = {col: (values[i] if i < len(values) else "") for i, col in enumerate(header)}
+                if not _boundary_matches(current, boundary):
+                    raise StorageError(f"{worksheet}: tablo başı değişmiş, satırlar silinmedi")
+
+            # Tek API çağrısı: başlığın altındaki ilk count satır
+            self._call(ws.spreadsheet.batch_update, {"requests": [
+                {"deleteDimension": {"range": {
+                    "sheetId": ws.id, "dimension": "ROWS", "startIndex": 1, "endIndex": count + 1
+                }}}
+            ]})
+            _drop_row_index(worksheet)
+
+        _notify_write(worksheet, "delete_head")
+        return count
+
+    def read_tail(self, worksheet, start_row):
+        """
+        Başlık satırı ve start_row sonrası tek values_batch_get çağrısıyla okunur.
+        Değerler tam okumadaki gibi (gspread_dataframe) işlenir: formülsüz değer,
+        metin tarih, TextParser ile tip çıkarımı, tamamen boş satır ve adsız boş sütun atılır.
+        """
+        ws = self.worksheet(worksheet)
+        if ws is None:
+            return None
+
+        baslik = "'" + ws.title.replace("'", "''") + "'"
+        son_sutun = re.sub(r"\d", "", _a1(1, max(ws.col_count, 1)))
+        cevap = self._call(
+            ws.spreadsheet.values_batch_get,
+            [f"{baslik}!1:1", f"{baslik}!A{start_row + 2}:{son_sutun}"],
+            params={"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"},
+            idempotent=True,
+        )
+        araliklar = cevap.get("valueRanges", [])
+        header = (araliklar[0].get("values") or [[]])[0] if araliklar else []
+        satirlar = araliklar[1].get("values", []) if len(araliklar) > 1 else []
+        if not header:
+            return None
+
+        genislik = max([len(header)] + [len(r) for r in satirlar])
+        header = list(header) + [""] * (genislik - len(header))
+        satirlar = [list(r) + [""] * (genislik - len(r)) for r in satirlar]
+        if not satirlar:
+            return pd.DataFrame(columns=[c for c in header if c != ""])
+
+        df = TextParser([header] + satirlar).read().dropna(how="all")
+        adsiz_bos = [c for c in df.columns if str(c).startswith("Unnamed:") and df[c].isna().all()]
+        return df.drop(columns=adsiz_bos)
+
+    # --- Satır API'si olmayan bağlantılar için tam tablo yedeği ---
+    def _update_many_full(self, worksheet, updates, add_columns=False):
+        df = self.read(worksheet, ttl=0)
+        sayilar = []
+        for filter_dict, update_dict in updates:
+            mask = _filter_mask(df, filter_dict)
+            sayilar.append(int(mask.sum()))
+            if not mask.any():
+                continue
+            for key, value in update_dict.items():
+                if key not in df.columns and not add_columns:
+                    raise MissingColumnError(key)
+                df.loc[mask, key] = value
+
+        if any(sayilar):
+            self.update(worksheet, df)
+        return sayilar
+
+    def _delete_where_full(self, worksheet, filter_dict):
+        df = self.read(worksheet, ttl=0)
+        mask = _filter_mask(df, filter_dict)
+        if not mask.any():
+            return 0
+
+        self.update(worksheet, df[~mask])
+        return int(mask.sum())
+
+    def _delete_head_full(self, worksheet, count, boundary=None):
+        df = self.read(worksheet, ttl=0)
+        if len(df) < count:
+            raise StorageError(f"{worksheet}: tabloda {count} satır yok, satırlar silinmedi")
+        if boundary:
+            if not _boundary_matches(df.iloc[count - 1].to_dict(), boundary):
+                raise StorageError(f"{worksheet}: tablo başı değişmiş, satırlar silinmedi")
+
+        self.update(worksheet, df.iloc[count:])
+        return count
+
+
+# ==================== SQLITE ====================
+def _q(identifier):
+    """SQL tanımlayıcısını tırnaklar (tablo / sütun adı)"""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+# Tablo sürüm sayaçları (etag) için iç tablo
+_META_TABLE = "_smartmill_meta"
+# Veritabanı kimliği (etag'e girer; aynı sayaçlı başka / yeniden oluşturulmuş veritabanı
+# başka bir veritabanının snapshot'ını almasın)
+_DB_ID_TABLE = "_smartmill_db"
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Yerel SQLite motoru - çevrimdışı çalışma, milisaniye seviyesinde okuma/yazma.
+
+    Her worksheet bir tabloya karşılık gelir. Sütunlar ilk yazımda oluşur,
+    yeni anahtarlar geldikçe ALTER TABLE ile eklenir. SQLITE_INDEX_COLUMNS
+    içindeki sütunlar (lot_no, silo_isim, batch_id, parti_no) otomatik
+    olarak indekslenir.
+    """
+
+    name = "sqlite"
+    atomic = True
+
+    def __init__(self, path=SQLITE_DB_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._pending = []
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS {_q(_META_TABLE)} (tablo TEXT PRIMARY KEY, surum INTEGER)")
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS {_q(_DB_ID_TABLE)} (kimlik TEXT)")
+        row = self._db.execute(f"SELECT kimlik FROM {_q(_DB_ID_TABLE)}").fetchone()
+        if row is None:
+            row = (uuid.uuid4().hex,)
+            self._db.execute(f"INSERT INTO {_q(_DB_ID_TABLE)} (kimlik) VALUES (?)", row)
+        self.db_id = row[0]
+
+    # --- İşlem yönetimi ---
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            outer = self._depth == 0
+            if outer:
+                self._db.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except Exception:
+                self._depth -= 1
+                if outer:
+                    self._db.execute("ROLLBACK")
+                    self._pending = []
+                raise
+            else:
+                self._depth -= 1
+                if outer:
+                    self._db.execute("COMMIT")
+                    pending, self._pending = self._pending, []
+                    for event in pending:
+                        _notify_write(*event)
+
+    def _emit(self, worksheet, action, rows=None):
+        """
+        Yazma olayını işlem (transaction) onaylanana kadar bekletir
+        ve tablonun sürüm sayacını artırır (etag için).
+        """
+        self._db.execute(
+            f"INSERT INTO {_q(_META_TABLE)} (tablo, surum) VALUES (?, 1) "
+            f"ON CONFLICT(tablo) DO UPDATE SET surum = surum + 1",
+            (worksheet,)
+        )
+        self._pending.append((worksheet, action, rows))
+
+    # --- Şema yardımcıları ---
+    def _columns(self, table):
+        rows = self._db.execute(f"PRAGMA table_info({_q(table)})").fetchall()
+        return [r[1] for r in rows]
+
+    def _ensure_table(self, table, columns):
+        """Tabloyu ve eksik sütunları oluşturur, indeksleri garanti eder"""
+        mevcut = self._columns(table)
+        if not mevcut:
+            kolonlar = list(dict.fromkeys(columns))
+            if not kolonlar:
+                return []
+            self._db.execute(f"CREATE TABLE {_q(table)} ({', '.join(_q(c) for c in kolonlar)})")
+            mevcut = kolonlar
+        else:
+            for col in columns:
+                if col not in mevcut:
+                    self._db.execute(f"ALTER TABLE {_q(table)} ADD COLUMN {_q(col)}")
+                    mevcut.append(col)
+
+        for col in SQLITE_INDEX_COLUMNS:
+            if col in mevcut:
+                self._db.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_q(f'ix_{table}_{col}')} ON {_q(table)} ({_q(col)})"
+                )
+        return mevcut
+
+    def _insert(self, table, columns, records):
+        if not records:
+            return
+        sql = (
+            f"INSERT INTO {_q(table)} ({', '.join(_q(c) for c in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        self._db.executemany(sql, records)
+
+    @staticmethod
+    def _where(filter_dict, columns):
+        for key in filter_dict:
+            if key not in columns:
+                raise MissingColumnError(key)
+        # Sheets ile aynı eşleşme: değerler _key ile normalize edilir (5 / 5.0 / '5', boş = NULL)
+        kosullar, params = [], []
+        for key, value in filter_dict.items():
+            bicimler = _key_variants(value)
+            kosul = f"{_q(key)} IN ({', '.join('?' for _ in bicimler)})"
+            if bicimler[0] == "":
+                kosul = f"({kosul} OR {_q(key)} IS NULL)"
+            kosullar.append(kosul)
+            params.extend(bicimler)
+        return " AND ".join(kosullar) or "1=1", params
+
+    # --- Arayüz ---
+    def read(self, worksheet, ttl=None):
+        with self._lock:
+            if not self._columns(worksheet):
+                return pd.DataFrame()
+            return pd.read_sql_query(f"SELECT * FROM {_q(worksheet)} ORDER BY rowid", self._db)
+
+    def read_tail(self, worksheet, start_row):
+        with self._lock:
+            if not self._columns(worksheet):
+                return None
+            return pd.read_sql_query(
+                f"SELECT * FROM {_q(worksheet)} ORDER BY rowid LIMIT -1 OFFSET ?", self._db, params=(int(start_row),)
+            )
+
+    def etag(self, worksheet):
+        with self._lock:
+            row = self._db.execute(f"SELECT surum FROM {_q(_META_TABLE)} WHERE tablo = ?", (worksheet,)).fetchone()
+        return f"sqlite:{self.db_id}:{row[0] if row else 0}"
+
+    def update(self, worksheet, data):
+        df = pd.DataFrame(restore_unparsed_dates(worksheet, data))
+        columns = [str(c) for c in df.columns]
+        records = [[_to_cell(v) for v in row] for row in df.itertuples(index=False, name=None)]
+
+        with self.transaction():
+            self._db.execute(f"DROP TABLE IF EXISTS {_q(worksheet)}")
+            self._ensure_table(worksheet, columns)
+            self._insert(worksheet, columns, records)
+            self._emit(worksheet, "update")
+
+    def append(self, worksheet, rows):
+        columns = list(dict.fromkeys(key for row in rows for key in row.keys()))
+        with self.transaction():
+            self._ensure_table(worksheet, columns)
+            records = [[_to_cell(row.get(col)) for col in columns] for row in rows]
+            self._insert(worksheet, columns, records)
+            self._emit(worksheet, "append", rows)
+
+    def update_where(self, worksheet, filter_dict, update_dict, add_columns=False):
+        with self.transaction():
+            columns = self._columns(worksheet)
+            clause, params = self._where(filter_dict, columns)
+            for key in update_dict:
+                if key not in columns:
+                    if not add_columns:
+                        raise MissingColumnError(key)
+                    columns = self._ensure_table(worksheet, list(update_dict.keys()))
+            if not update_dict:
+                return 0
+            set_clause = ", ".join(f"{_q(k)} = ?" for k in update_dict)
+            cur = self._db.execute(
+                f"UPDATE {_q(worksheet)} SET {set_clause} WHERE {clause}",
+                [_to_cell(v) for v in update_dict.values()] + params
+            )
+            if cur.rowcount:
+                self._emit(worksheet, "update_where")
+            return cur.rowcount
+
+    def delete_where(self, worksheet, filter_dict):
+        with self.transaction():
+            clause, params = self._where(filter_dict, self._columns(worksheet))
+            cur = self._db.execute(f"DELETE FROM {_q(worksheet)} WHERE {clause}", params)
+            if cur.rowcount:
+                self._emit(worksheet, "delete_where")
+            return cur.rowcount
+
+    def delete_head(self, worksheet, count, boundary=None):
+        if count <= 0:
+            return 0
+        with self.transaction():
+            columns = self._columns(worksheet)
+            if boundary:
+                row = self._db.execute(
+                    f"SELECT * FROM {_q(worksheet)} ORDER BY rowid LIMIT 1 OFFSET ?", (int(count) - 1,)
+                ).fetchone()
+                current = dict(zip(columns, row)) if row else None
+                if not _boundary_matches(current, boundary):
+                    raise StorageError(f"{worksheet}: tablo başı değişmiş, satırlar silinmedi")
+
+            cur = self._db.execute(
+                f"DELETE FROM {_q(worksheet)} WHERE rowid IN "
+                f"(SELECT rowid FROM {_q(worksheet)} ORDER BY rowid LIMIT ?)", (int(count),)
+            )
+            if cur.rowcount:
+                self._emit(worksheet, "delete_head")
+            return cur.rowcount
+
+
+# ==================== MOTOR SEÇİMİ ====================
+_SQLITE_BACKENDS = {}
+_SQLITE_LOCK = threading.Lock()
+
+
+def get_sqlite_backend(path=SQLITE_DB_PATH):
+    """Aynı dosya için süreç boyunca tek bir SQLite bağlantısı kullanır"""
+    with _SQLITE_LOCK:
+        if path not in _SQLITE_BACKENDS:
+            _SQLITE_BACKENDS[path] = SQLiteBackend(path)
+        return _SQLITE_BACKENDS[path]
+
+
+def get_backend_name():
+    """Aktif motor adı (SMARTMILL_STORAGE ortam değişkeni config'i ezer)"""
+    return os.environ.get("SMARTMILL_STORAGE", STORAGE_BACKEND).strip().lower()
+
+
+def get_backend():
+    """Yapılandırmaya göre aktif depolama motorunu döndürür"""
+    if get_backend_name() == "sqlite":
+        return get_sqlite_backend(os.environ.get("SMARTMILL_SQLITE_PATH", SQLITE_DB_PATH))
+
+    import streamlit as st
+    from streamlit_gsheets import GSheetsConnection
+    return GSheetsBackend(st.connection("gsheets", type=GSheetsConnection))
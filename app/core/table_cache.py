@@ -0,0 +1,168 @@
+"""
+PAYLAŞIMLI TABLO CACHE'İ
+Tüm oturumlar (kullanıcılar) tek bir süreç içi cache'i kullanır.
+Worksheet bazlı TTL + bellek sınırı (LRU) + yazma anında ortak geçersizleştirme
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from app.core.config import TABLE_CACHE_MAX_MB
+
+
+class SharedTableCache:
+    """
+    Süreç genelinde paylaşılan DataFrame cache'i.
+
+    - Her tablo bir kez tutulur (oturum sayısından bağımsız)
+    - Toplam bellek TABLE_CACHE_MAX_MB'ı aşarsa en eski kullanılan tablo atılır
+    - Herhangi bir oturum yazdığında ilgili tablo tüm oturumlar için geçersiz olur
+    - Sürüm numarası sayesinde yazma sırasında süren bir okuma eski veriyi geri koyamaz
+    """
+
+    def __init__(self, max_bytes=TABLE_CACHE_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()   # isim -> (df, zaman, boyut)
+        self._versions = {}             # isim -> yazma sayacı
+        self._generations = {}          # isim -> depodan tam okuma sayacı
+        self._total_bytes = 0
+
+    @staticmethod
+    def _size(df):
+        try:
+            return int(df.memory_usage(index=True, deep=True).sum())
+        except Exception:
+            return 0
+
+    def version(self, name):
+        """Tablonun yazma sürümü (okuma öncesi alınır, put'a verilir)"""
+        with self._lock:
+            return self._versions.get(name, 0)
+
+    def generation(self, name):
+        """
+        Tablonun depodan kaç kez tam okunup cache'e konduğu.
+        Ekleme (append) nesli değiştirmez; türetilmiş indeksler buna göre yenilenir.
+        """
+        with self._lock:
+            return self._generations.get(name, 0)
+
+    def length(self, name):
+        """Cache'teki tablonun satır sayısı (kopya almadan; yoksa None)"""
+        with self._lock:
+            entry = self._entries.get(name)
+            return None if entry is None else len(entry[0])
+
+    def get(self, name, max_age=None):
+        """
+        Cache'teki tablonun kopyasını döndürür.
+        max_age verilirse daha eski kayıtlar için None döner.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            df, fetched_at, _ = entry
+            if max_age is not None and time.time() - fetched_at >= max_age:
+                return None
+            self._entries.move_to_end(name)
+            return df.copy()
+
+    def age(self, name):
+        """Tablonun cache'te kaç saniyedir durduğu (yoksa None)"""
+        with self._lock:
+            entry = self._entries.get(name)
+            return None if entry is None else time.time() - entry[1]
+
+    def put(self, name, df, version=None):
+        """
+        Tabloyu cache'e koyar.
+        version verilmiş ve o arada yazma olmuşsa (sürüm değişmişse) kayıt yapılmaz.
+        """
+        with self._lock:
+            if version is not None and version != self._versions.get(name, 0):
+                return False
+            self._generations[name] = self._generations.get(name, 0) + 1
+            self._store(name, df.copy(), time.time())
+            return True
+
+    def append(self, name, rows, normalize=None):
+        """
+        Yeni satırları cache'teki tabloya ekler (tablo cache'te yoksa bir şey yapmaz).
+        normalize verilirse birleşik tabloya uygulanır (tip dönüşümü vb.)
+        """
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            df, fetched_at, _ = entry
+            merged = pd.concat([df, pd.DataFrame(rows)], ignore_index=True)
+            if normalize is not None:
+                merged = normalize(merged)
+            self._store(name, merged, fetched_at)
+
+    def extend(self, name, rows, version=None, normalize=None):
+        """
+        Depodan okunan yeni (kuyruk) satırları cache'teki tabloya ekler ve tabloyu taze sayar.
+        Nesil değişmez (türetilmiş indeksler baştan kurulmaz).
+        O arada yazma olduysa (sürüm değiştiyse) veya tablo cache'te yoksa None döner.
+
+        Returns:
+            DataFrame: Birleşik tablonun kopyası
+        """
+        with self._lock:
+            if version is not None and version != self._versions.get(name, 0):
+                return None
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            merged = entry[0]
+            if len(rows):
+                merged = pd.concat([merged, rows], ignore_index=True)
+                if normalize is not None:
+                    merged = normalize(merged)
+            self._store(name, merged, time.time())
+            return merged.copy()
+
+    def invalidate(self, name=None):
+        """Tek bir tabloyu (veya name=None ise tümünü) tüm oturumlar için geçersiz kılar"""
+        with self._lock:
+            names = [name] if name else list(self._entries.keys())
+            for n in names:
+                self._versions[n] = self._versions.get(n, 0) + 1
+                entry = self._entries.pop(n, None)
+                if entry is not None:
+                    self._total_bytes -= entry[2]
+
+    def stats(self):
+        """Debug ekranı için özet bilgi"""
+        with self._lock:
+            return {
+                "tablo_sayisi": len(self._entries),
+                "toplam_mb": round(self._total_bytes / (1024 * 1024), 2),
+                "limit_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "tablolar": list(self._entries.keys()),
+            }
+
+    def _store(self, name, df, fetched_at):
+        old = self._entries.pop(name, None)
+        if old is not None:
+            self._total_bytes -= old[2]
+
+        size = self._size(df)
+        self._entries[name] = (df, fetched_at, size)
+        self._total_bytes += size
+
+        # LRU: limit aşılırsa en az kullanılan tabloları at (sonuncuyu asla atma)
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_size
+
+
+# Süreç genelinde tek örnek (tüm Streamlit oturumları paylaşır)
+table_cache = SharedTableCache()
@@ -5,7 +5,9 @@ from datetime import datetime
 import time
 
 # Database importları - clear_cache EKLENDİ
-from app.core.database import fetch_data, add_data, update_data, get_conn, clear_cache
+from app.core.database import fetch_data, add_data, update_data, get_conn, clear_cache, log_activity, flush_audit_log
+from app.core.search_index import search_index
+from app.core.archive import archiver, fetch_with_archive
 
 # ----------------------------------------------------------------
 # 1. KULLANICI YÖNETİMİ
@@ -792,20 +794,22 @@ def show_system_logs():
     # ================================================================
     with tab_audit:
         try:
-            df_log = fetch_data("audit_log", force_refresh=True)
+            bugun     = pd.Timestamp.now().normalize()
+            bu_hafta  = bugun - pd.Timedelta(days=7)
+            bu_ay     = bugun - pd.Timedelta(days=30)
+
+            # Kuyrukta bekleyen olaylar da görünsün (yazılanlar cache'e eklenir, tam okuma gerekmez)
+            flush_audit_log()
+            # Son 30 gün arşive taşınmış olabilir: kesişen arşiv bölümleri de okunur
+            df_log = fetch_with_archive("audit_log", bu_ay)
 
             if df_log is None or df_log.empty:
                 st.info("Henüz kayıtlı aktivite logu yok. Kullanıcılar sistemi kullandıkça burada görünecek.")
                 return
 
-            # Tarih dönüşümü
-            df_log['tarih'] = pd.to_datetime(df_log['tarih'], errors='coerce')
+            # Tarih tipi yükleme anında uygulanır (app/core/schema.py)
             df_log = df_log.sort_values('tarih', ascending=False)
 
-            bugun     = pd.Timestamp.now().normalize()
-            bu_hafta  = bugun - pd.Timedelta(days=7)
-            bu_ay     = bugun - pd.Timedelta(days=30)
-
             # --- İSTATİSTİK KARTLARI ---
             c1, c2, c3, c4 = st.columns(4)
             with c1:
@@ -857,9 +861,17 @@ def show_system_logs():
             with t2:
                 bit_tarih = st.date_input("📅 Bitiş", value=bugun.date(), key="log_bit")
 
+            arama_log = st.text_input("🔍 Logda Ara (Kullanıcı, İşlem, Detay...)", key="log_arama")
+
             # --- FİLTRE UYGULA ---
-            df_filtre = df_log.copy()
+            if bas_tarih < bu_ay.date():
+                # Daha eski aralık: o dönemlerin arşiv bölümleri eklenir
+                df_filtre = fetch_with_archive("audit_log", bas_tarih, bit_tarih).sort_values('tarih', ascending=False)
+            else:
+                df_filtre = df_log.copy()
 
+            if arama_log:
+                df_filtre = df_filtre[search_index.search("audit_log", df_filtre, arama_log)]
             if sec_kullanici != "Tümü":
                 df_filtre = df_filtre[df_filtre['kullanici'] == sec_kullanici]
             if sec_modul != "Tümü":
@@ -907,23 +919,21 @@ def show_system_logs():
     # ================================================================
     with tab_stok:
         try:
-            df_h = fetch_data("hareketler")
+            arsiv_dahil = st.checkbox("🗄️ Arşivlenmiş dönemleri de göster", key="stok_arsiv_dahil",
+                                      help="Eski aylar arşiv bölümlerine taşınır; işaretlenirse tüm geçmiş listelenir.")
+            df_h = fetch_with_archive("hareketler") if arsiv_dahil else fetch_data("hareketler")
 
             if df_h.empty:
                 st.info("Henüz stok hareketi kaydı yok.")
                 return
 
             if 'tarih' in df_h.columns:
-                df_h['tarih'] = pd.to_datetime(df_h['tarih'], errors='coerce')
                 df_h = df_h.sort_values('tarih', ascending=False)
 
             # Arama kutusu
             arama = st.text_input("🔍 Ara (Silo, İşlem Tipi, Lot No...)", key="stok_arama")
             if arama:
-                mask = df_h.astype(str).apply(
-                    lambda x: x.str.contains(arama, case=False, na=False)
-                ).any(axis=1)
-                df_h = df_h[mask]
+                df_h = df_h[search_index.search("hareketler", df_h, arama)]
 
             st.caption(f"🔎 {len(df_h)} hareket kaydı gösteriliyor.")
             st.dataframe(df_h, use_container_width=True, hide_index=True, height=400)
@@ -958,6 +968,56 @@ def show_debug_tools():
                     del st.session_state[key]
                 st.rerun()
                 
+        st.divider()
+        st.write("**Silo Mutabakatı:** Silo kartları her harekette artımlı güncellenir. Şüpheli bir fark görürseniz tüm hareket geçmişinden yeniden hesaplatın.")
+        if st.button("🧮 Siloları Hareketlerden Yeniden Hesapla"):
+            from app.modules.wheat import recalculate_silos_from_logs
+            with st.spinner("Tüm hareketler taranıyor..."):
+                if recalculate_silos_from_logs():
+                    log_activity("Admin", "Silo Mutabakatı", "Tam yeniden hesaplama")
+                    st.success("✅ Silo stokları ve ortalamalar hareket geçmişiyle eşitlendi.")
+        
+        st.write("**Dönem Arşivi:** Eski hareketler ve aktivite logları aylık arşiv bölümlerine taşınır (otomatik, arka planda). Arşivlenen hareketler silo başına devir satırı olarak kalır.")
+        if st.button("🗄️ Eski Dönemleri Şimdi Arşivle"):
+            with st.spinner("Eski dönemler arşivleniyor..."):
+                sonuclar = archiver.run(get_conn(), force=True)
+            if not sonuclar:
+                st.info("Arşivleme zaten arka planda çalışıyor, birazdan tekrar deneyin.")
+            else:
+                hatalar = {tablo: s['hata'] for tablo, s in sonuclar.items() if 'hata' in s}
+                tasinan = sum(s.get('tasinan', 0) for s in sonuclar.values())
+                log_activity("Admin", "Dönem Arşivi", f"{tasinan} satır arşivlendi")
+                if hatalar:
+                    st.error("❌ Arşivleme hatası: " + " | ".join(f"{t}: {h}" for t, h in hatalar.items()))
+                else:
+                    st.success(f"✅ {tasinan} satır arşiv bölümlerine taşındı.")
+        
+        st.write("**Paylaşımlı Tablo Cache'i (Tüm Oturumlar):**")
+        from app.core.table_cache import table_cache
+        st.json(table_cache.stats())
+        
+        st.write("**Depolama İstemcisi (Kota / Birleşen Okumalar):**")
+        from app.core.backend_client import backend_client
+        st.json(backend_client.stats())
+        
+        st.write("**Audit Log Kuyruğu:**")
+        from app.core.audit_queue import audit_queue
+        st.json(audit_queue.stats())
+        
+        st.write("**Arama İndeksleri:**")
+        st.json(search_index.stats())
+        
+        st.write("**Silo Tavlı Kalite Özeti:**")
+        from app.core.silo_quality import silo_quality
+        st.json(silo_quality.stats())
+        
+        st.write("**Rapor İş Kuyruğu:**")
+        from app.core.report_jobs import report_jobs
+        st.json(report_jobs.stats())
+        
+        st.write("**Dönem Arşivi:**")
+        st.json(archiver.stats())
+        
         st.write("**Aktif Session State Verileri:**")
         st.json(dict(st.session_state))
 
@@ -29,7 +29,6 @@ def get_active_mixing_batches_for_enzyme():
         if df.empty: return []
         
         if 'tarih' in df.columns:
-            df['tarih'] = pd.to_datetime(df['tarih'], errors='coerce')
             df = df.sort_values('tarih', ascending=False)
             
         batch_list = []
@@ -345,7 +344,6 @@ def show_katki_maliyeti_modulu():
         df_arsiv_guncel = fetch_data("katki_maliyet_arsivi")
         
         if not df_arsiv_guncel.empty and 'tarih' in df_arsiv_guncel.columns:
-            df_arsiv_guncel['tarih'] = pd.to_datetime(df_arsiv_guncel['tarih'], errors='coerce')
             df_show = df_arsiv_guncel.dropna(subset=['tarih']).sort_values('tarih', ascending=False)
             
             if not df_show.empty:
@@ -593,7 +591,6 @@ def show_enzim_dozajlama():
             st.info("📭 Henüz kayıtlı bir reçete bulunmamaktadır.")
         else:
             if 'tarih' in df_arsiv.columns:
-                df_arsiv['tarih'] = pd.to_datetime(df_arsiv['tarih'], errors='coerce')
                 df_arsiv = df_arsiv.sort_values('tarih', ascending=False)
 
             def format_icerik(json_str):
@@ -4,9 +4,10 @@ import time
 from datetime import datetime, timedelta
 
 # --- CORE VE DATABASE IMPORTLARI ---
-from app.core.database import fetch_data, get_conn
+from app.core.database import fetch_data, fetch_many, get_conn
 from app.core.styles import card_metric
 from app.core.error_handling import error_handler, log_warning
+from app.core.components import render_report_job, render_freshness_indicator
 
 
 # PDF Rapor Fonksiyonları (Senin Orijinal Raporlama Sistemin)
@@ -54,27 +55,25 @@ def draw_silo(fill_ratio, name):
 # --------------------------------------------------------------------------
 # VERİ KATMANI (DATA LAYER) - GÜVENLİ VE HIZLI
 # --------------------------------------------------------------------------
-def fetch_all_dashboard_data():
+DASHBOARD_TABLOLARI = ["silolar", "hareketler", "uretim_kaydi"]
+
+def fetch_all_dashboard_data(force_refresh=False):
     """Tüm verileri tek seferde çeker, temizler ve session_state'e kaydeder"""
     with st.spinner('📊 Veriler güncelleniyor...'):
         try:
-            data = {
-                'silolar': fetch_data("silolar"),
-                'hareketler': fetch_data("hareketler"),
-                'uretim_kaydi': fetch_data("uretim_kaydi") 
-            }
+            # Üç tablo paralel çekilir (süre = en yavaş tablo); süresi yeni dolan
+            # tablolar beklemeden gösterilir ve arka planda yenilenir
+            data = fetch_many(DASHBOARD_TABLOLARI, force_refresh=force_refresh)
             
             # --- 1. SİLO VERİSİ KONTROLÜ VE TEMİZLİĞİ ---
             df_silo = data['silolar']
             if not df_silo.empty:
                 # Kritik sütunlar yoksa oluştur ve 0 bas (Sütun Varlık Kontrolü)
                 critical_cols = ['protein', 'gluten', 'hektolitre', 'maliyet', 'kapasite', 'mevcut_miktar']
+                # (mevcut sütunlar yüklemede şemayla sayıya çevrilip 0 ile doldurulur)
                 for col in critical_cols:
                     if col not in df_silo.columns:
-                        df_silo[col] = 0
-                    else:
-                        # Sayısal dönüşüm (hatalı verileri 0 yapar)
-                        df_silo[col] = pd.to_numeric(df_silo[col], errors='coerce').fillna(0)
+                        df_silo[col] = 0.0
 
                 if 'isim' in df_silo.columns:
                     df_silo = df_silo.sort_values('isim')
@@ -86,8 +85,7 @@ def fetch_all_dashboard_data():
                 if 'tarih' not in df_hareket.columns:
                      df_hareket['tarih'] = datetime.now()
                 
-                # Tarih formatını zorla, bozuk olanları temizle (Tarih Sütunu Kontrolü)
-                df_hareket['tarih'] = pd.to_datetime(df_hareket['tarih'], errors='coerce')
+                # Tarih tipi yüklemede uygulanır; bozuk tarihler (NaT) temizlenir
                 df_hareket = df_hareket.dropna(subset=['tarih'])
                 data['hareketler'] = df_hareket
 
@@ -108,7 +106,7 @@ def get_dashboard_data(force_refresh=False):
     """
     # Eski zamanlayıcı (if ... timer < 300) kodunu sildik.
     # Doğrudan güncel veriyi çekmesini söylüyoruz.
-    return fetch_all_dashboard_data()
+    return fetch_all_dashboard_data(force_refresh=force_refresh)
 # --------------------------------------------------------------------------
 # SİLO KARTI (Senin "Aynı Kalsın" Dediğin Orijinal Kart Yapısı)
 # --------------------------------------------------------------------------
@@ -151,32 +149,25 @@ def show_silo_card(silo_data):
         # SENİN İSTEDİĞİN ORİJİNAL PDF RAPOR BUTONU
         st.divider()
         safe_name = str(silo_data.get('isim', 'silo')).replace(" ", "_")
-        if st.button("📥 PDF Rapor İndir", key=f"pdf_{safe_name}", use_container_width=True, type="primary"):
-            with st.spinner("Rapor hazırlanıyor..."):
-                try:
-                    from app.modules.mixing import get_tavli_analiz_agirlikli_ortalama
-                    from app.modules.wheat import get_kuru_bugday_agirlikli_ortalama  # YENİ!
-                    
-                    tavli_ort = get_tavli_analiz_agirlikli_ortalama(silo_data['isim'])
-                    kuru_ort = get_kuru_bugday_agirlikli_ortalama(silo_data['isim'])  # YENİ!
-                    
-                    pdf_bytes = create_silo_pdf_report(
-                        silo_data['isim'], 
-                        silo_data, 
-                        tavli_ort, 
-                        kuru_ort  # YENİ PARAMETRE!
-                    )
-                    
-                    if pdf_bytes:
-                        st.download_button(
-                            label="💾 İndirmeyi Başlat",
-                            data=pdf_bytes,
-                            file_name=f"SILO_RAPORU_{turkce_karakter_duzelt_pdf(silo_data['isim'])}.pdf",
-                            mime="application/pdf",
-                            key=f"dl_{safe_name}"
-                        )
-                except Exception as e:
-                    st.error(f"Rapor hatası: {e}")
+        
+        def _silo_rapor_girdileri():
+            # Analiz ortalamaları sadece rapor istendiğinde toplanır; PDF arka planda üretilir
+            from app.modules.mixing import get_tavli_analiz_agirlikli_ortalama
+            from app.modules.wheat import get_kuru_bugday_agirlikli_ortalama
+            
+            tavli_ort = get_tavli_analiz_agirlikli_ortalama(silo_data['isim'])
+            kuru_ort = get_kuru_bugday_agirlikli_ortalama(silo_data['isim'])
+            return silo_data['isim'], silo_data, tavli_ort, kuru_ort
+        
+        render_report_job(
+            f"pdf_{safe_name}",
+            "app.modules.reports:create_silo_pdf_report",
+            _silo_rapor_girdileri,
+            file_name=f"SILO_RAPORU_{turkce_karakter_duzelt_pdf(silo_data['isim'])}.pdf",
+            mime="application/pdf",
+            label=f"{silo_data['isim']} silo raporu",
+            button_label="📥 PDF Rapor Hazırla"
+        )
 
 # --------------------------------------------------------------------------
 # ANA DASHBOARD
@@ -211,6 +202,8 @@ def show_dashboard():
         if 'dashboard_last_update' in st.session_state:
             last_up = st.session_state['dashboard_last_update'].strftime('%H:%M:%S')
             st.caption(f"🕒 Son Güncelleme: {last_up}")
+        # Cache tazeliği (bayat veri arka planda yenilenirken gösterilir)
+        render_freshness_indicator(DASHBOARD_TABLOLARI)
     
     st.divider()
 
@@ -255,7 +248,6 @@ def show_dashboard():
             # Son 24 saatteki hareketler
             if not df_hareket.empty and 'tarih' in df_hareket.columns:
                 try:
-                    df_hareket['tarih'] = pd.to_datetime(df_hareket['tarih'], errors='coerce')
                     son_24h = df_hareket[df_hareket['tarih'] >= (datetime.now() - timedelta(hours=24))]
                     
                     giris_24h = son_24h[son_24h['hareket_tipi'] == 'Giriş']['miktar'].sum()
@@ -5,7 +5,8 @@ from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 
-from app.core.database import fetch_data, add_data, get_conn
+from app.core.database import fetch_data, add_data, get_conn, update_row_by_filter, delete_rows_by_filter
+from app.core.search_index import search_index
 from app.core.utils import turkce_karakter_duzelt
 from app.core.config import INPUT_LIMITS, TERMS, get_limit
 
@@ -49,7 +50,6 @@ def get_active_production_lots():
 
         # 3. Tarihe göre sırala (En yeni en üstte)
         if 'tarih' in df.columns:
-            df['tarih'] = pd.to_datetime(df['tarih'], errors='coerce')
             df = df.sort_values('tarih', ascending=False)
             
         lot_list = []
@@ -88,7 +88,6 @@ def get_active_mixing_batches():
             return []
         
         if 'tarih' in df.columns:
-            df['tarih'] = pd.to_datetime(df['tarih'])
             df = df.sort_values('tarih', ascending=False)
             
         batch_list = []
@@ -109,7 +108,6 @@ def get_un_maliyet_gecmisi():
     if df.empty:
         return pd.DataFrame()
     if 'tarih' in df.columns:
-        df['tarih'] = pd.to_datetime(df['tarih'], errors='coerce')
         df = df.sort_values('tarih', ascending=False)
     return df
 
@@ -534,40 +532,22 @@ def save_un_analiz(lot_no, islem_tipi, **analiz_degerleri):
 def update_un_analiz_record(old_lot_no, new_data):
     """Un analiz kaydını günceller"""
     try:
-        conn = get_conn()
-        df = fetch_data("un_analiz")
-        
-        # Lot numarasına göre satırı bul
-        if not df.empty and 'lot_no' in df.columns:
-            # Pandas indexini bul
-            idx_list = df.index[df['lot_no'].astype(str) == str(old_lot_no)].tolist()
-            
-            if idx_list:
-                idx = idx_list[0]
-                # Verileri güncelle
-                for key, val in new_data.items():
-                    df.at[idx, key] = val
-                
-                conn.update(worksheet="un_analiz", data=df)
-                return True, "✅ Kayıt başarıyla güncellendi."
-            else:
-                return False, "Kayıt bulunamadı."
-        return False, "Veritabanı boş."
+        # Lot numarasına göre satırı bul ve sadece değişen hücreleri yaz
+        ok, msg = update_row_by_filter("un_analiz", {'lot_no': str(old_lot_no)}, new_data, add_columns=True)
+        if ok:
+            return True, "✅ Kayıt başarıyla güncellendi."
+        return False, "Kayıt bulunamadı."
     except Exception as e:
         return False, f"Güncelleme Hatası: {str(e)}"
 
 def delete_un_analiz_record(lot_no):
     """Un analiz kaydını siler"""
     try:
-        conn = get_conn()
-        df = fetch_data("un_analiz")
-        
-        if not df.empty and 'lot_no' in df.columns:
-            # O lot numarası dışındakileri al (Filtreleme ile silme)
-            df_new = df[df['lot_no'].astype(str) != str(lot_no)]
-            conn.update(worksheet="un_analiz", data=df_new)
+        # Sadece o lot numarasına ait satır(lar) silinir
+        ok, msg, _ = delete_rows_by_filter("un_analiz", {'lot_no': str(lot_no)})
+        if ok:
             return True, "🗑️ Kayıt silindi."
-        return False, "Veritabanı hatası."
+        return False, msg
     except Exception as e:
         return False, f"Silme Hatası: {str(e)}"
 
@@ -788,25 +768,22 @@ def show_un_analiz_kayitlari():
         st.info("📭 Henüz kayıtlı işlem bulunmamaktadır.")
         return
 
+    # --- ARAMA ---
+    arama = st.text_input("🔍 Lot No, Müşteri, Plaka veya Marka Ara", key="un_analiz_arama")
+    if arama:
+        df = df[search_index.search("un_analiz", df, arama)]
+        if df.empty:
+            st.info("Aramaya uyan kayıt bulunamadı.")
+            return
+
     # --- VERİ HAZIRLIĞI ---
     if 'tarih' in df.columns:
-        df['tarih'] = pd.to_datetime(df['tarih'], errors='coerce')
         df = df.sort_values('tarih', ascending=False)
     
     df.reset_index(drop=True, inplace=True)
     df.insert(0, 'ID NO', range(1, len(df) + 1))
 
-    # Sayısal dönüştürme (Sadece analiz sütunları için)
-    numeric_cols = [
-        'protein', 'rutubet', 'gluten', 'gluten_index', 'sedim', 'gecikmeli_sedim',
-        'fn', 'ffn', 'amilograph', 'kul', 'nisasta_zedelenmesi',
-        'su_kaldirma_f', 'gelisme_suresi', 'stabilite', 'yumusama', 'su_kaldirma_e',
-        'direnc45', 'taban45', 'enerji45', 'direnc90', 'taban90', 'enerji90',
-        'direnc135', 'taban135', 'enerji135'
-    ]
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    # Analiz sütunları yüklemede şemayla sayıya çevrilmiş olarak gelir
 
     # Başlıkları Eşle (YENİ SÜTUNLAR EKLENDİ)
     col_map = {
@@ -917,12 +894,9 @@ def delete_un_maliyet_record(tarih_val):
         df = fetch_data("un_maliyet_hesaplamalari")
         if df.empty: return False
 
-        # Tarih sütununu stringe çevirip karşılaştıralım (Eşleşme garantisi için)
-        df['tarih'] = df['tarih'].astype(str)
-        tarih_str = str(tarih_val)
-        
-        # Eşleşmeyenleri tut (Silme mantığı)
-        df_new = df[df['tarih'] != tarih_str]
+        # Tarih sütunu şemadan datetime gelir; aynı tipte karşılaştır
+        # (metne çevirmek gece yarısı kayıtlarında saat kısmını düşürüyordu)
+        df_new = df[df['tarih'] != pd.Timestamp(tarih_val)]
         
         # Eğer satır sayısı azaldıysa silme başarılıdır
         if len(df_new) < len(df):
@@ -5,7 +5,8 @@ import time
 import uuid
 
 # Veritabanı fonksiyonları
-from app.core.database import fetch_data, add_data
+from app.core.database import fetch_data, add_data, update_row_by_filter, delete_rows_by_filter
+from app.core.components import render_report_job
 
 # Excel kütüphanesi kontrolü
 try:
@@ -24,7 +25,6 @@ def get_active_mixing_batches():
         
         # Tarihe göre sırala (En yeni en üstte)
         if 'tarih' in df.columns:
-            df['tarih'] = pd.to_datetime(df['tarih'])
             df = df.sort_values('tarih', ascending=False)
         
         # Dropdown listesi hazırla: "İsim | Tarih | ID"
@@ -111,9 +111,8 @@ def get_uretim_kayitlari():
         df = get_uretim_kayitlari_cached() 
         if df.empty: return pd.DataFrame()
         
-        # Tarih formatını düzelt ve sırala
+        # Tarihe göre sırala (tipler yüklemede şemadan gelir)
         if 'tarih' in df.columns:
-            df['tarih'] = pd.to_datetime(df['tarih'], errors='coerce')
             df = df.sort_values('tarih', ascending=False)
             
         return df
@@ -124,17 +123,9 @@ def get_uretim_kayitlari():
 def delete_uretim_record(parti_no):
     """Üretim kaydını siler"""
     try:
-        from app.core.database import get_conn
-        conn = get_conn()
-        df = fetch_data("uretim_kaydi")
-        if df.empty:
-            return False, "Kayıt bulunamadı"
-        
-        # Parti No'ya göre filtrele (silmek istediğimiz hariç)
-        df_new = df[df['parti_no'] != parti_no]
-        
-        if len(df_new) < len(df):
-            conn.update(worksheet="uretim_kaydi", data=df_new)
+        # Sadece ilgili satır silinir (tablo yeniden yazılmaz)
+        ok, msg, _ = delete_rows_by_filter("uretim_kaydi", {'parti_no': parti_no})
+        if ok:
             st.cache_data.clear()
             return True, "✅ Kayıt silindi!"
         else:
@@ -146,23 +137,16 @@ def delete_uretim_record(parti_no):
 def update_uretim_record(parti_no, updated_data):
     """Üretim kaydını günceller"""
     try:
-        from app.core.database import get_conn
-        conn = get_conn()
         df = fetch_data("uretim_kaydi")
         if df.empty:
             return False, "Kayıt bulunamadı"
         
-        # Parti No'yu bul
-        mask = df['parti_no'] == parti_no
-        if not mask.any():
+        # Sadece tabloda olan alanlar güncellenir (sadece değişen hücreler yazılır)
+        degisen = {key: value for key, value in updated_data.items() if key in df.columns}
+        ok, msg = update_row_by_filter("uretim_kaydi", {'parti_no': parti_no}, degisen)
+        if not ok:
             return False, "Kayıt bulunamadı"
         
-        # Güncelle
-        for key, value in updated_data.items():
-            if key in df.columns:
-                df.loc[mask, key] = value
-        
-        conn.update(worksheet="uretim_kaydi", data=df)
         st.cache_data.clear()
         return True, "✅ Kayıt güncellendi!"
     except Exception as e:
@@ -616,22 +600,16 @@ def show_yonetim_dashboard():
     col_r1, col_r2 = st.columns(2)
     
     with col_r1:
-        if st.button("📊 Excel Rapor İndir", type="primary", use_container_width=True):
-            with st.spinner("📊 Excel raporu hazırlanıyor..."):
-                excel_file = create_excel_performance_report(df_filtered, f"{period}")
-                
-                if excel_file:
-                    # Dosya adı
-                    filename = f"Uretim_Performans_{period.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
-                    
-                    st.download_button(
-                        label="💾 Excel Dosyasını İndir",
-                        data=excel_file,
-                        file_name=filename,
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True
-                    )
-                    st.success("✅ Excel rapor hazır!")
+        # Rapor arka plan kuyruğunda üretilir, hazır olunca indirme düğmesi çıkar
+        render_report_job(
+            "uretim_performans_excel",
+            "app.modules.mill:create_excel_performance_report",
+            lambda: (df_filtered, f"{period}"),
+            file_name=f"Uretim_Performans_{period.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            label="Excel performans raporu",
+            button_label="📊 Excel Rapor Hazırla"
+        )
     
     with col_r2:
         st.info("📄 PDF Rapor yakında eklenecek...")
@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import json
 import time
 from datetime import datetime
@@ -7,14 +8,16 @@ import io
 import uuid
 
 # --- DATABASE IMPORTLARI ---
-from app.core.database import fetch_data, add_data, get_conn
+from app.core.database import fetch_data, add_data, get_conn, update_row_by_filter, delete_rows_by_filter
 from app.core.utils import turkce_karakter_duzelt
+from app.core.silo_quality import silo_quality
+from app.core.pacal_engine import PacalMatrix, optimize_blend, LP_AVAILABLE
 
 # KURU BUĞDAY VERİSİNİ ÇEKMEK İÇİN
 try:
-    from app.modules.wheat import get_kuru_bugday_agirlikli_ortalama
+    from app.modules.wheat import get_kuru_bugday_ortalamalari
 except ImportError:
-    def get_kuru_bugday_agirlikli_ortalama(silo_isim): return {}
+    def get_kuru_bugday_ortalamalari(): return {}
 
 # RAPORLAMA
 try:
@@ -55,79 +58,147 @@ def get_pacal_history():
         df = fetch_data("mixing_batches") 
         if df.empty: return pd.DataFrame()
         if 'tarih' in df.columns:
-            df['tarih'] = pd.to_datetime(df['tarih'])
             df = df.sort_values('tarih', ascending=False)
         return df
     except Exception as e:
         return pd.DataFrame()
         
 def get_tavli_analiz_agirlikli_ortalama(silo_isim):
-    """Silo için tüm tavlı analizlerin tonaj ağırlıklı ortalamasını hesapla"""
+    """Silo için tüm tavlı analizlerin tonaj ağırlıklı ortalaması (silo kalite özetinden)"""
     try:
-        df = fetch_data("tavli_analiz")
-        if df.empty: return None
-            
-        df = df[df['silo_isim'] == silo_isim]
-        if df.empty: return None
-        
-        analiz_parametreleri = [
-            'protein', 'rutubet', 'gluten', 'gluten_index',
-            'sedim', 'g_sedim', 'fn', 'ffn', 'amilograph', 'kul',
-            'su_kaldirma_f', 'gelisme_suresi', 'stabilite', 'yumusama',
-            'su_kaldirma_e', 'enerji45', 'direnc45', 'taban45',
-            'enerji90', 'direnc90', 'taban90', 'enerji135',
-            'direnc135', 'taban135'
-        ]
-        
-        df['analiz_tonaj'] = pd.to_numeric(df['analiz_tonaj'], errors='coerce').fillna(0)
-        toplam_tonaj = df['analiz_tonaj'].sum()
-        
-        if toplam_tonaj <= 0: return None
-        
-        agirlikli_ortalama = {}
-        for param in analiz_parametreleri:
-            if param in df.columns:
-                df[param] = pd.to_numeric(df[param], errors='coerce').fillna(0)
-                try:
-                    val = (df['analiz_tonaj'] * df[param]).sum() / toplam_tonaj
-                    agirlikli_ortalama[param] = float(val)
-                except:
-                    agirlikli_ortalama[param] = 0.0
-            else:
-                agirlikli_ortalama[param] = 0.0
-        
-        agirlikli_ortalama['toplam_tonaj'] = float(toplam_tonaj)
-        agirlikli_ortalama['analiz_sayisi'] = len(df)
-        return agirlikli_ortalama
-        
+        silo_quality.ensure(lambda: fetch_data("tavli_analiz"))
+        return silo_quality.get(silo_isim)
     except Exception as e:
         return None
 
+def get_tavli_analiz_ortalamalari():
+    """Analizi olan TÜM silolar için ağırlıklı ortalamalar: {silo: ortalamalar}"""
+    try:
+        silo_quality.ensure(lambda: fetch_data("tavli_analiz"))
+        return silo_quality.get_all()
+    except Exception as e:
+        return {}
+
 def calculate_pacal_metrics(oranlar, tavli_analizler):
-    """Paçal oranlarına göre beklenen TAVLI analiz değerlerini hesaplar."""
-    analiz_sonuclari = {
-        'protein': 0.0, 'rutubet': 0.0, 'gluten': 0.0, 'gluten_index': 0.0,
-        'sedim': 0.0, 'g_sedim': 0.0, 'fn': 0.0, 'ffn': 0.0, 
-        'amilograph': 0.0, 'kul': 0.0,
-        'su_kaldirma_f': 0.0, 'gelisme_suresi': 0.0, 'stabilite': 0.0, 'yumusama': 0.0,
-        'su_kaldirma_e': 0.0, 'enerji45': 0.0, 'direnc45': 0.0, 'taban45': 0.0,
-        'enerji90': 0.0, 'direnc90': 0.0, 'taban90': 0.0, 'enerji135': 0.0,
-        'direnc135': 0.0, 'taban135': 0.0
-    }
+    """Paçal oranlarına göre beklenen TAVLI analiz değerlerini hesaplar (oran vektörü x silo matrisi)."""
+    matris = PacalMatrix(list(oranlar.keys()), tavli_analizler)
+    return matris.evaluate(oranlar)['tavli']
+
+# --- OPTİMİZASYON (EN DÜŞÜK MALİYETLİ PAÇAL) ---
+
+# Ekrandaki seçenek -> (spec tablosu, cins sütunu, paçal matrisindeki değer kaynağı)
+PACAL_SPEC_KAYNAKLARI = {
+    "🌾 Buğday Spekleri (Kuru)": ("bugday_spekleri", "bugday_cinsi", "kuru"),
+    "🍞 Un Spekleri (Tavlı)": ("un_spekleri", "un_cinsi", "tavli"),
+}
+
+def get_pacal_spec_kisitlari(df_spec, cins_kolonu, cins, kaynak, matris):
+    """
+    Spec tablosundaki min / max değerlerini optimizasyon kısıtlarına çevirir (0 = sınır yok).
     
-    analiz_var_mi = False
+    Returns:
+        tuple: ([(kaynak, parametre, min, max), ...], silo verisi olmadığı için atlanan parametreler)
+    """
+    kisitlar, atlanan = [], []
+    if df_spec.empty or cins_kolonu not in df_spec.columns:
+        return kisitlar, atlanan
     
-    for isim, oran in oranlar.items():
-        if oran > 0 and isim in tavli_analizler:
-            analiz_var_mi = True
-            analiz_data = tavli_analizler[isim]
-            katsayi = oran / 100.0
+    df_cins = df_spec[df_spec[cins_kolonu].astype(str) == str(cins)]
+    for _, row in df_cins.iterrows():
+        parametre = str(row.get('parametre', '')).strip()
+        alt = pd.to_numeric(row.get('min_deger'), errors='coerce')
+        ust = pd.to_numeric(row.get('max_deger'), errors='coerce')
+        alt = float(alt) if pd.notna(alt) and alt > 0 else None
+        ust = float(ust) if pd.notna(ust) and ust > 0 else None
+        if alt is None and ust is None:
+            continue
+        if matris.column(kaynak, parametre) is None:
+            atlanan.append(parametre)
+            continue
+        kisitlar.append((kaynak, parametre, alt, ust))
+    return kisitlar, atlanan
+
+def _yuvarla_oranlar(oranlar, adim=0.1):
+    """Oranları adım katlarına yuvarlar, toplamı %100'de tutar (en büyük kalan yöntemi)"""
+    if not oranlar:
+        return {}
+    birim = np.array(list(oranlar.values())) / adim
+    taban = np.floor(birim + 1e-9)
+    eksik = int(round(100 / adim - taban.sum()))
+    if eksik > 0:
+        taban[np.argsort(-(birim - taban))[:eksik]] += 1
+    return {silo: round(float(deger * adim), 1) for silo, deger in zip(oranlar, taban)}
+
+def _show_pacal_optimizasyonu(dolu_silolar, pacal_matrisi):
+    """Spec + stok + maliyete göre en ucuz paçal oranlarını doğrusal programla önerir"""
+    with st.expander("🎯 Optimizasyon Modu (En Düşük Maliyetli Paçal)"):
+        if not LP_AVAILABLE:
+            st.info("Optimizasyon modu için scipy kurulu olmalıdır (pip install scipy).")
+            return
+        
+        c1, c2 = st.columns(2)
+        spec_secimi = c1.radio("Spesifikasyon Kaynağı", list(PACAL_SPEC_KAYNAKLARI.keys()), key="opt_spec_kaynagi")
+        tablo, cins_kolonu, kaynak = PACAL_SPEC_KAYNAKLARI[spec_secimi]
+        
+        df_spec = fetch_data(tablo)
+        if df_spec.empty or cins_kolonu not in df_spec.columns:
+            st.warning("Bu kaynakta tanımlı spesifikasyon yok.")
+            return
+        
+        cinsler = sorted(df_spec[cins_kolonu].dropna().astype(str).unique().tolist())
+        cins = c2.selectbox("Hedef Standart", cinsler, key="opt_spec_cins")
+        
+        c3, c4 = st.columns(2)
+        pacal_miktari = c3.number_input("Paçal Miktarı (Ton)", min_value=0.0, value=100.0, step=10.0, key="opt_pacal_miktari")
+        stok_secimi = c4.radio("Kullanılabilir Stok", ["Mevcut Stok", "Tavlı Stok"], horizontal=True, key="opt_stok_kaynagi")
+        
+        kisitlar, atlanan = get_pacal_spec_kisitlari(df_spec, cins_kolonu, cins, kaynak, pacal_matrisi)
+        if atlanan:
+            st.caption(f"ℹ️ Silo verisi olmayan parametreler atlandı: {', '.join(atlanan)}")
+        if not kisitlar:
+            st.warning("Bu standart için min / max değeri girilmiş parametre yok; sadece maliyet minimize edilir.")
+        
+        if st.button("⚙️ En Ucuz Paçalı Hesapla", type="primary", use_container_width=True, key="opt_hesapla"):
+            stok_kolonu = 'tavli_bugday_stok' if stok_secimi == "Tavlı Stok" else 'mevcut_miktar'
+            if stok_kolonu in dolu_silolar.columns:
+                stok = pd.to_numeric(dolu_silolar[stok_kolonu], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+            else:
+                stok = np.zeros(len(dolu_silolar))
+            ust_sinirlar = stok / pacal_miktari if pacal_miktari > 0 else None
             
-            for param in analiz_sonuclari.keys():
-                val = float(analiz_data.get(param, 0) or 0)
-                analiz_sonuclari[param] += val * katsayi
-    
-    return analiz_sonuclari if analiz_var_mi else None
+            baslangic = time.perf_counter()
+            ok, msg, optimum = optimize_blend(pacal_matrisi, kisitlar, ust_sinirlar)
+            st.session_state['pacal_opt_sonuc'] = {
+                'ok': ok, 'mesaj': msg, 'oranlar': optimum, 'kisitlar': kisitlar,
+                'miktar': pacal_miktari, 'sure_ms': (time.perf_counter() - baslangic) * 1000,
+            }
+        
+        sonuc = st.session_state.get('pacal_opt_sonuc')
+        if not sonuc:
+            return
+        if not sonuc['ok']:
+            st.error(f"❌ {sonuc['mesaj']}")
+            return
+        
+        tahmin = pacal_matrisi.evaluate(sonuc['oranlar'])
+        st.success(f"✅ {sonuc['mesaj']} ({sonuc['sure_ms']:.0f} ms) - Ort. Maliyet: {tahmin['maliyet']:.2f} TL")
+        
+        st.dataframe(pd.DataFrame([
+            {"Silo": silo, "Oran (%)": round(oran, 2), "Miktar (Ton)": round(oran / 100 * sonuc['miktar'], 2)}
+            for silo, oran in sorted(sonuc['oranlar'].items(), key=lambda x: -x[1])
+        ]), use_container_width=True, hide_index=True)
+        
+        if sonuc['kisitlar']:
+            tahmin_degerleri = {'tavli': tahmin['tavli'] or {}, 'kuru': tahmin['kuru']}
+            st.dataframe(pd.DataFrame([
+                {"Parametre": parametre, "Min": alt, "Max": ust,
+                 "Tahmin": round(tahmin_degerleri[k].get(parametre, 0.0), 2)}
+                for k, parametre, alt, ust in sonuc['kisitlar']
+            ]), use_container_width=True, hide_index=True)
+        
+        if st.button("📥 Oranları Hesaplayıcıya Aktar", use_container_width=True, key="opt_uygula"):
+            st.session_state['pacal_opt_uygula'] = _yuvarla_oranlar(sonuc['oranlar'])
+            st.rerun()
 
 # Helper: Değer formatlama
 def fmt(val, decimals=1):
@@ -143,30 +214,16 @@ def fmt(val, decimals=1):
 def update_pacal_record(batch_id, new_data):
     """Paçal kaydını Google Sheets'te günceller"""
     try:
-        conn = get_conn()
-        worksheet = conn.worksheet("mixing_batches")
-        df = pd.DataFrame(worksheet.get_all_records())
-        
+        df = fetch_data("mixing_batches")
         if df.empty:
             return False
         
-        # Batch ID'ye göre satırı bul
-        row_idx = df[df['batch_id'] == batch_id].index
-        
-        if len(row_idx) == 0:
+        # Sadece tabloda olan kolonlar, sadece değişen hücreler yazılır
+        degisen = {key: value for key, value in new_data.items() if key in df.columns}
+        ok, msg = update_row_by_filter("mixing_batches", {'batch_id': batch_id}, degisen)
+        if not ok:
             return False
         
-        # Satır numarasını al (Google Sheets 1'den başlar ve header var)
-        sheet_row = row_idx[0] + 2
-        
-        # Güncellenecek kolonları bul ve güncelle
-        headers = worksheet.row_values(1)
-        
-        for key, value in new_data.items():
-            if key in headers:
-                col_idx = headers.index(key) + 1
-                worksheet.update_cell(sheet_row, col_idx, value)
-        
         st.cache_data.clear()
         return True
         
@@ -177,25 +234,11 @@ def update_pacal_record(batch_id, new_data):
 def delete_pacal_record(batch_id):
     """Paçal kaydını Google Sheets'ten siler"""
     try:
-        conn = get_conn()
-        worksheet = conn.worksheet("mixing_batches")
-        df = pd.DataFrame(worksheet.get_all_records())
-        
-        if df.empty:
-            return False
-        
-        # Batch ID'ye göre satırı bul
-        row_idx = df[df['batch_id'] == batch_id].index
-        
-        if len(row_idx) == 0:
+        # Batch ID'ye ait satırı sil (satır numarası indeksten gelir)
+        ok, msg, _ = delete_rows_by_filter("mixing_batches", {'batch_id': batch_id})
+        if not ok:
             return False
         
-        # Satır numarasını al (Google Sheets 1'den başlar ve header var)
-        sheet_row = row_idx[0] + 2
-        
-        # Satırı sil
-        worksheet.delete_rows(sheet_row)
-        
         st.cache_data.clear()
         return True
         
@@ -228,22 +271,35 @@ def show_pacal_hesaplayici():
     
     st.info(f"✅ {len(dolu_silolar)} adet dolu silo bulundu.")
     
-    col_input, col_result = st.columns([1, 1.2], gap="medium")
+    # Optimizasyondan aktarılan oranlar (oran kutuları çizilmeden önce yazılmalı)
+    aktarilan = st.session_state.pop('pacal_opt_uygula', None)
+    if aktarilan is not None:
+        for index, row in dolu_silolar.iterrows():
+            st.session_state[f"oran_{index}"] = float(aktarilan.get(row['isim'], 0.0))
+    
     oranlar = {}
     toplam_oran = 0.0
     
     tavli_analizler = {}
     analiz_durumlari = {}
     
-    # 2. Analiz Verilerini Hazırla
-    with st.spinner("Analiz verileri hazırlanıyor..."):
-        for index, row in dolu_silolar.iterrows():
-            analiz = get_tavli_analiz_agirlikli_ortalama(row['isim'])
-            if analiz and analiz['toplam_tonaj'] > 0:
-                tavli_analizler[row['isim']] = analiz
-                analiz_durumlari[row['isim']] = {'var': True, 'sayi': analiz['analiz_sayisi']}
-            else:
-                analiz_durumlari[row['isim']] = {'var': False}
+    # 2. Analiz Verilerini Hazırla (tüm silolar tek seferde, kalite özetinden)
+    tum_ortalamalar = get_tavli_analiz_ortalamalari()
+    for isim in dolu_silolar['isim']:
+        analiz = tum_ortalamalar.get(isim)
+        if analiz and analiz['toplam_tonaj'] > 0:
+            tavli_analizler[isim] = analiz
+            analiz_durumlari[isim] = {'var': True, 'sayi': analiz['analiz_sayisi']}
+        else:
+            analiz_durumlari[isim] = {'var': False}
+    
+    # Kuru analizler de tek geçişte; paçal matrisi bu yeniden çizimde bir kez kurulur
+    kuru_analizler = get_kuru_bugday_ortalamalari()
+    pacal_matrisi = PacalMatrix(dolu_silolar['isim'].tolist(), tavli_analizler, kuru_analizler, dolu_silolar)
+    
+    _show_pacal_optimizasyonu(dolu_silolar, pacal_matrisi)
+    
+    col_input, col_result = st.columns([1, 1.2], gap="medium")
     
     # --- SOL: GİRİŞ ---
     with col_input:
@@ -263,6 +319,8 @@ def show_pacal_hesaplayici():
                 oranlar[row['isim']] = val
                 toplam_oran += val
         
+        # 0.1'lik adımların kayan nokta toplamı tam 100 çıkmayabilir
+        toplam_oran = round(toplam_oran, 6)
         st.metric("Toplam", f"%{toplam_oran:.1f}")
         if toplam_oran != 100: st.warning("Toplam %100 olmalı.")
 
@@ -271,31 +329,11 @@ def show_pacal_hesaplayici():
         st.subheader("📈 Tahmini Sonuçlar (Paçal Ort.)")
         
         if toplam_oran > 0:
-            pacal_maliyeti = 0.0
-            kuru_ozet = {'protein': 0.0, 'rutubet': 0.0, 'gluten': 0.0}
-            
-            for isim, oran in oranlar.items():
-                if oran > 0:
-                    silo_row = dolu_silolar[dolu_silolar['isim'] == isim].iloc[0]
-                    katsayi = oran / 100.0
-                    
-                    # Maliyet
-                    pacal_maliyeti += float(silo_row.get('maliyet', 0)) * katsayi
-                    
-                    # HİBRİT KURU VERİ ÇEKME (Protein 0.00 Çözümü)
-                    kuru_data = get_kuru_bugday_agirlikli_ortalama(isim)
-                    
-                    # Protein: Logdan çek, yoksa Silo Kartından çek
-                    k_prot = float(kuru_data.get('protein', 0) or 0)
-                    if k_prot == 0: 
-                        k_prot = float(silo_row.get('protein', 0) or 0)
-                    
-                    kuru_ozet['protein'] += k_prot * katsayi
-                    kuru_ozet['gluten'] += float(kuru_data.get('gluten', 0) or 0) * katsayi
-                    kuru_ozet['rutubet'] += float(kuru_data.get('rutubet', 0) or 0) * katsayi
-
-            # Tavlı Hesaplama
-            tavli_sonuc = calculate_pacal_metrics(oranlar, tavli_analizler)
+            # Maliyet, kuru (kuru protein yoksa silo kartından) ve tavlı tahminler tek matris çarpımında
+            pacal_sonuc = pacal_matrisi.evaluate(oranlar)
+            pacal_maliyeti = pacal_sonuc['maliyet']
+            kuru_ozet = pacal_sonuc['kuru']
+            tavli_sonuc = pacal_sonuc['tavli']
             
             if toplam_oran == 100:
                 with st.container(border=True):
@@ -376,7 +414,7 @@ def show_pacal_hesaplayici():
                                 if o > 0:
                                     # Verileri Garantiye Al
                                     raw = dolu_silolar[dolu_silolar['isim'] == s].iloc[0]
-                                    k_analiz = get_kuru_bugday_agirlikli_ortalama(s)
+                                    k_analiz = kuru_analizler.get(s, {})
                                     t_analiz = tavli_analizler.get(s, {})
                                     
                                     # Cins Bilgisi (Yedekli)
@@ -3,6 +3,7 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
+import time
 from app.modules.flour import get_un_maliyet_gecmisi
 
 # --- AYARLAR VE SABİTLER (MAGIC NUMBERS GİDERİLDİ) ---
@@ -10,7 +11,8 @@ STRATEGY_CONFIG = {
     'SACK_WEIGHT': 50,        # Bir çuvalın ağırlığı (kg)
     'TON_TO_KG': 1000,        # 1 Ton kaç kg
     'CACHE_TTL': 300,         # Veri hafıza süresi (saniye)
-    'SEARCH_PRECISION': 50    # Başabaş noktası arama hassasiyeti
+    'MC_DEFAULT_SCENARIOS': 100000,  # Monte-Carlo senaryo sayısı
+    'MC_MIN_HISTORY': 3       # Dağılım uydurmak için gereken en az geçmiş kayıt
 }
 
 # --- PERFORMANS İYİLEŞTİRMESİ: CACHE EKLENDİ ---
@@ -40,74 +42,271 @@ def get_baseline_data():
         pass
     
     return {}
-def calculate_profit_dynamic(bugday_fiyat, un_fiyat, tonaj, baseline=None):
+# Veritabanında maliyet kaydı yoksa kullanılan varsayılan baz senaryo
+DEFAULT_BASELINE = {
+    'un_randimani': 70.0, 'un2_orani': 7.0, 'bongalite_orani': 1.5,
+    'kepek_orani': 9.0, 'razmol_orani': 11.0,
+    'un2_fiyati': 15.0, 'bongalite_fiyati': 10.0, 'kepek_fiyati': 8.0, 'razmol_fiyati': 8.0,
+    'ton_bugday_elektrik': 500.0, 'nakliye': 20.0, 'satis_pazarlama': 20.0,
+    'pp_cuval': 15.0, 'katki_maliyeti': 9.0, 'aylik_sabit_gider_toplam': 1500000.0
+}
+
+# Oranı ve kg fiyatı baz senaryoda tutulan yan ürünler
+YAN_URUNLER = ('un2', 'bongalite', 'kepek', 'razmol')
+
+def _num(baseline, key, default=0.0):
+    try:
+        value = float(baseline.get(key, default))
+    except (TypeError, ValueError):
+        return float(default)
+    return float(default) if np.isnan(value) else value
+
+def get_profit_model(baseline=None):
     """
-    Dinamik Kar Hesaplama Motoru (Optimize Edilmiş)
-    Tüm değişkenleri veritabanından alır, Fiyat ve Tonaj senaryosunu işler.
+    Baz senaryoyu BİR KEZ ayrıştırıp kar formülünün katsayılarına indirger.
+    
+    Kar, tonaj başına doğrusal bir ifadedir:
+        kar = tonaj x (cuval_per_ton x un_fiyat - kg_per_ton x bugday_fiyat + ton_basi_net) + sabit_net
+    
+    Returns:
+        dict: cuval_per_ton, kg_per_ton, ton_basi_net, sabit_net,
+              yan_urun_oranlari / yan_urun_fiyatlari (ton_basi_net'e dahil baz değerler)
     """
-    # Baseline verisi yoksa çekelim (Cache'ten hızlıca gelir)
+    # Baseline verisi yoksa çekelim (Cache'ten hızlıca gelir); hala yoksa varsayılanlar
     if baseline is None or not baseline:
-        baseline = get_baseline_data()
-        # Eğer hala veri yoksa (Veritabanı boşsa) varsayılan değerler
-        if not baseline: 
-             baseline = {
-                'un_randimani': 70.0, 'un2_orani': 7.0, 'bongalite_orani': 1.5,
-                'kepek_orani': 9.0, 'razmol_orani': 11.0,
-                'un2_fiyati': 15.0, 'bongalite_fiyati': 10.0, 'kepek_fiyati': 8.0, 'razmol_fiyati': 8.0,
-                'ton_bugday_elektrik': 500.0, 'nakliye': 20.0, 'satis_pazarlama': 20.0,
-                'pp_cuval': 15.0, 'katki_maliyeti': 9.0, 'aylik_sabit_gider_toplam': 1500000.0
-             }
-
-    # 1. AYARLARI YÜKLE (Magic Numbers yerine Config)
+        baseline = get_baseline_data() or DEFAULT_BASELINE
+    
     sack_weight = STRATEGY_CONFIG['SACK_WEIGHT']
     ton_to_kg = STRATEGY_CONFIG['TON_TO_KG']
-    randiman = float(baseline.get('un_randimani', 70))
+    randiman = _num(baseline, 'un_randimani', 70)
+    cuval_per_ton = ton_to_kg * (randiman / 100) / sack_weight
     
-    # 2. ÜRETİM MİKTARLARI
-    toplam_bugday_kg = tonaj * ton_to_kg
-    un_kg = toplam_bugday_kg * (randiman / 100)
-    cuval_sayisi = un_kg / sack_weight
+    # Yan ürün geliri (kg buğday başına) - oran % x fiyat TL/kg
+    yan_urun_oranlari = {urun: _num(baseline, f'{urun}_orani') / 100 for urun in YAN_URUNLER}
+    yan_urun_fiyatlari = {urun: _num(baseline, f'{urun}_fiyati') for urun in YAN_URUNLER}
+    yan_urun_kg_basi = sum(yan_urun_oranlari[urun] * yan_urun_fiyatlari[urun] for urun in YAN_URUNLER)
     
-    # 3. GELİRLER
-    # a) Ana Un Geliri
-    gelir_un = cuval_sayisi * un_fiyat
-    
-    # b) Yan Ürün Gelirleri
-    gelir_yan_urunler = (
-        (toplam_bugday_kg * float(baseline.get('un2_orani', 0)) / 100) * float(baseline.get('un2_fiyati', 0)) +
-        (toplam_bugday_kg * float(baseline.get('bongalite_orani', 0)) / 100) * float(baseline.get('bongalite_fiyati', 0)) +
-        (toplam_bugday_kg * float(baseline.get('kepek_orani', 0)) / 100) * float(baseline.get('kepek_fiyati', 0)) +
-        (toplam_bugday_kg * float(baseline.get('razmol_orani', 0)) / 100) * float(baseline.get('razmol_fiyati', 0)) +
-        (float(baseline.get('belge_geliri', 0)) * cuval_sayisi) + 
-        (float(baseline.get('kirik_tonaj', 0)) * float(baseline.get('kirik_fiyat', 0))) +
-        (float(baseline.get('basak_tonaj', 0)) * float(baseline.get('basak_fiyat', 0)))
+    # Çuval başına değişken giderler
+    cuval_maliyeti_birim = (
+        _num(baseline, 'nakliye') + _num(baseline, 'satis_pazarlama') +
+        _num(baseline, 'pp_cuval') + _num(baseline, 'katki_maliyeti')
     )
     
-    toplam_gelir = gelir_un + gelir_yan_urunler
+    ton_basi_net = (
+        ton_to_kg * yan_urun_kg_basi +
+        cuval_per_ton * (_num(baseline, 'belge_geliri') - cuval_maliyeti_birim) -
+        _num(baseline, 'ton_bugday_elektrik')
+    )
+    sabit_net = (
+        _num(baseline, 'kirik_tonaj') * _num(baseline, 'kirik_fiyat') +
+        _num(baseline, 'basak_tonaj') * _num(baseline, 'basak_fiyat') -
+        _num(baseline, 'aylik_sabit_gider_toplam')
+    )
+    return {
+        'cuval_per_ton': cuval_per_ton,
+        'kg_per_ton': float(ton_to_kg),
+        'ton_basi_net': ton_basi_net,
+        'sabit_net': sabit_net,
+        'yan_urun_oranlari': yan_urun_oranlari,
+        'yan_urun_fiyatlari': yan_urun_fiyatlari,
+    }
+
+def calculate_profit_vectorized(bugday_fiyat, un_fiyat, tonaj, baseline=None, model=None, yan_urun_fiyatlari=None):
+    """
+    Vektörel Kar Hesaplama Motoru.
+    Girdiler skaler veya NumPy dizisi olabilir; NumPy yayınlama (broadcasting) kurallarıyla
+    tek çağrıda tüm senaryolar hesaplanır (Monte-Carlo örnekleri, ızgaralar vb.).
     
-    # 4. GİDERLER
-    # a) Buğday Maliyeti
-    gider_bugday = toplam_bugday_kg * bugday_fiyat
+    yan_urun_fiyatlari: {urun: TL/kg (skaler / dizi)} - verilen yan ürünlerde baz fiyatın yerine geçer
+    """
+    model = model or get_profit_model(baseline)
+    bugday_fiyat = np.asarray(bugday_fiyat, dtype=float)
+    un_fiyat = np.asarray(un_fiyat, dtype=float)
+    tonaj = np.asarray(tonaj, dtype=float)
     
-    # b) Sabit Giderler
-    gider_sabit = float(baseline.get('aylik_sabit_gider_toplam', 0))
+    ton_basi_net = model['ton_basi_net']
+    for urun, fiyat in (yan_urun_fiyatlari or {}).items():
+        # Baz fiyattan farkın ton başına gelire etkisi
+        fark = np.asarray(fiyat, dtype=float) - model['yan_urun_fiyatlari'][urun]
+        ton_basi_net = ton_basi_net + model['kg_per_ton'] * model['yan_urun_oranlari'][urun] * fark
     
-    # c) Değişken Giderler (Çuval başına)
-    cuval_maliyeti_birim = (
-        float(baseline.get('nakliye', 0)) +
-        float(baseline.get('satis_pazarlama', 0)) +
-        float(baseline.get('pp_cuval', 0)) +
-        float(baseline.get('katki_maliyeti', 0))
+    ton_basi_kar = (
+        model['cuval_per_ton'] * un_fiyat -
+        model['kg_per_ton'] * bugday_fiyat +
+        ton_basi_net
     )
-    gider_cuval_bazli = cuval_sayisi * cuval_maliyeti_birim
+    return tonaj * ton_basi_kar + model['sabit_net']
+
+def calculate_profit_grid(bugday_fiyatlari, un_fiyatlari, tonajlar, baseline=None, model=None):
+    """
+    Buğday fiyatı x un fiyatı x tonaj ızgarasının tamamı için kar tensörü.
+    
+    Returns:
+        np.ndarray: (len(bugday_fiyatlari), len(un_fiyatlari), len(tonajlar))
+    """
+    b, u, t = np.ix_(np.atleast_1d(bugday_fiyatlari), np.atleast_1d(un_fiyatlari), np.atleast_1d(tonajlar))
+    return calculate_profit_vectorized(b, u, t, baseline, model)
+
+# --- BAŞABAŞ ÇÖZÜCÜLERİ (KAPALI FORM) ---
+# Kar tonaja, un fiyatına ve buğday fiyatına göre doğrusal olduğundan her başabaş
+# noktası tek bir bölmeyle bulunur; arama / tekrarlı kar hesabı gerekmez.
+# Girdiler skaler veya NumPy dizisi olabilir. Çözüm yoksa NaN döner.
+
+def _ton_basi_katki(model, bugday_fiyat, un_fiyat):
+    """Sabit giderler hariç ton başı kar (katkı payı)"""
+    return (model['cuval_per_ton'] * np.asarray(un_fiyat, dtype=float) -
+            model['kg_per_ton'] * np.asarray(bugday_fiyat, dtype=float) +
+            model['ton_basi_net'])
+
+def solve_break_even_tonaj(bugday_fiyat, un_fiyat, baseline=None, model=None, hedef_kar=0.0):
+    """
+    Karı hedef_kar yapan tonaj: T = (hedef_kar - sabit_net) / ton_başı_katkı
+    Ton başı katkı sıfır / negatifse hiçbir tonajda hedefe ulaşılamaz (NaN).
+    """
+    model = model or get_profit_model(baseline)
+    katki = _ton_basi_katki(model, bugday_fiyat, un_fiyat)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tonaj = np.where(katki > 0, (hedef_kar - model['sabit_net']) / katki, np.nan)
+    # Sabit gelir zaten hedefi karşılıyorsa alt sınır 0 ton
+    return np.maximum(tonaj, 0.0)
+
+def solve_break_even_un_fiyati(bugday_fiyat, tonaj, baseline=None, model=None, hedef_kar=0.0):
+    """Karı hedef_kar yapan un çuval fiyatı (TL/50kg)"""
+    model = model or get_profit_model(baseline)
+    tonaj = np.asarray(tonaj, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gerekli_katki = np.where(tonaj > 0, (hedef_kar - model['sabit_net']) / tonaj, np.nan)
+    return (gerekli_katki + model['kg_per_ton'] * np.asarray(bugday_fiyat, dtype=float)
+            - model['ton_basi_net']) / model['cuval_per_ton']
+
+def solve_break_even_bugday_fiyati(un_fiyat, tonaj, baseline=None, model=None, hedef_kar=0.0):
+    """Karı hedef_kar yapan en yüksek buğday fiyatı (TL/kg)"""
+    model = model or get_profit_model(baseline)
+    tonaj = np.asarray(tonaj, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gerekli_katki = np.where(tonaj > 0, (hedef_kar - model['sabit_net']) / tonaj, np.nan)
+    return (model['cuval_per_ton'] * np.asarray(un_fiyat, dtype=float)
+            + model['ton_basi_net'] - gerekli_katki) / model['kg_per_ton']
+
+def break_even_frontier(bugday_fiyatlari, tonajlar, baseline=None, model=None):
+    """
+    Başabaş sınırı: her (buğday fiyatı, tonaj) için zararsız un fiyatı.
+    Sınırın üstündeki un fiyatları kar, altındakiler zarar bölgesidir.
+    
+    Returns:
+        np.ndarray: (len(bugday_fiyatlari), len(tonajlar))
+    """
+    b, t = np.ix_(np.atleast_1d(bugday_fiyatlari), np.atleast_1d(tonajlar))
+    return solve_break_even_un_fiyati(b, t, baseline, model)
+
+# --- MONTE-CARLO RİSK SİMÜLASYONU ---
+
+# Simüle edilen değişkenler: (un_maliyet_hesaplamalari sütunu, etiket, geçmiş yoksa aylık oynaklık)
+RISK_DEGISKENLERI = [
+    ('bugday_pacal_maliyeti', 'Buğday Fiyatı', 0.05),
+    ('un_satis_fiyati', 'Un Fiyatı', 0.04),
+    ('un2_fiyati', 'Un-2 Fiyatı', 0.05),
+    ('bongalite_fiyati', 'Bongalite Fiyatı', 0.05),
+    ('kepek_fiyati', 'Kepek Fiyatı', 0.06),
+    ('razmol_fiyati', 'Razmol Fiyatı', 0.06),
+    ('aylik_kirilan_bugday', 'Tonaj', 0.10),
+]
+
+# Baz kayıtta değer yoksa kullanılan merkez değerler
+_RISK_VARSAYILAN_MERKEZ = {
+    'bugday_pacal_maliyeti': 14.6, 'un_satis_fiyati': 980.0, 'aylik_kirilan_bugday': 3000.0,
+    **{f'{urun}_fiyati': DEFAULT_BASELINE[f'{urun}_fiyati'] for urun in YAN_URUNLER},
+}
+
+def fit_risk_model(df_gecmis):
+    """
+    Maliyet geçmişinden ortak (log-normal) değişim dağılımını uydurur.
+    
+    Ardışık kayıtlar arasındaki log değişimlerin kovaryansı kullanılır; böylece
+    buğday ve un fiyatının birlikte hareketi (korelasyon) senaryolara taşınır.
+    Yeterli geçmiş olmayan değişkenler varsayılan oynaklıkla, bağımsız kabul edilir.
     
-    # d) Tona bağlı giderler (Elektrik)
-    gider_elektrik = tonaj * float(baseline.get('ton_bugday_elektrik', 0))
+    Returns:
+        dict: kolonlar, etiketler, kovaryans (aylık log değişim), gozlem (kullanılan değişim sayısı)
+    """
+    kolonlar = [k for k, _, _ in RISK_DEGISKENLERI]
+    varsayilan_std = np.array([s for _, _, s in RISK_DEGISKENLERI])
+    kovaryans = np.diag(varsayilan_std ** 2)
+    gozlem = 0
     
-    toplam_gider = gider_bugday + gider_sabit + gider_cuval_bazli + gider_elektrik
+    if df_gecmis is not None and not df_gecmis.empty:
+        df = df_gecmis.sort_values('tarih') if 'tarih' in df_gecmis.columns else df_gecmis
+        degerler = pd.DataFrame({
+            k: pd.to_numeric(df[k], errors='coerce') if k in df.columns else np.nan for k in kolonlar
+        })
+        log_degisim = np.log(degerler.where(degerler > 0)).diff().iloc[1:]
+        gozlem = int(log_degisim.notna().any(axis=1).sum())
+        
+        gecmis_kov = log_degisim.cov(min_periods=STRATEGY_CONFIG['MC_MIN_HISTORY'] - 1).to_numpy()
+        gecerli = ~np.isnan(gecmis_kov)
+        # Sıfır oynaklık (hiç değişmemiş seri) varsayılana düşer
+        gecerli &= (np.diag(gecmis_kov)[:, None] > 0) & (np.diag(gecmis_kov)[None, :] > 0)
+        kovaryans = np.where(gecerli, gecmis_kov, kovaryans)
+        
+        # Parçalı (pairwise) kovaryans pozitif yarı tanımlı olmayabilir - özdeğerleri kırp
+        ozdeger, ozvektor = np.linalg.eigh(kovaryans)
+        kovaryans = (ozvektor * np.clip(ozdeger, 1e-12, None)) @ ozvektor.T
     
-    # 5. NET KAR SONUCU
-    return toplam_gelir - toplam_gider
+    return {
+        'kolonlar': kolonlar,
+        'etiketler': [e for _, e, _ in RISK_DEGISKENLERI],
+        'kovaryans': kovaryans,
+        'gozlem': gozlem,
+    }
+
+def simulate_profit_distribution(baseline, risk_model, n_senaryo=None, ufuk_ay=1, seed=None):
+    """
+    Buğday / un / yan ürün fiyatları ve tonaj için ortak senaryolar üretip kar dağılımını hesaplar.
+    Tüm senaryolar tek vektörel çağrıyla değerlendirilir (100.000 senaryo < 1 sn).
+    
+    Returns:
+        tuple: (kar dizisi, senaryo girdileri DataFrame)
+    """
+    n_senaryo = int(n_senaryo or STRATEGY_CONFIG['MC_DEFAULT_SCENARIOS'])
+    baseline = baseline or get_baseline_data() or DEFAULT_BASELINE
+    kolonlar = risk_model['kolonlar']
+    merkez = np.array([_num(baseline, k, _RISK_VARSAYILAN_MERKEZ.get(k, 0.0)) for k in kolonlar])
+    
+    rng = np.random.default_rng(seed)
+    Z = rng.multivariate_normal(np.zeros(len(kolonlar)), risk_model['kovaryans'] * ufuk_ay,
+                                size=n_senaryo, method='eigh')
+    # Log-normal: fiyatlar / tonaj negatife düşmez, baz değer medyandır
+    senaryolar = merkez * np.exp(Z)
+    girdi = dict(zip(kolonlar, senaryolar.T))
+    
+    kar = calculate_profit_vectorized(
+        girdi['bugday_pacal_maliyeti'], girdi['un_satis_fiyati'], girdi['aylik_kirilan_bugday'],
+        model=get_profit_model(baseline),
+        yan_urun_fiyatlari={urun: girdi[f'{urun}_fiyati'] for urun in YAN_URUNLER},
+    )
+    return kar, pd.DataFrame(girdi)
+
+def summarize_risk(kar, guven=0.95):
+    """Kar dağılımından risk metrikleri (VaR, beklenen kayıp, zarar olasılığı)"""
+    esik = np.quantile(kar, 1 - guven)
+    kuyruk = kar[kar <= esik]
+    return {
+        'ortalama': float(kar.mean()),
+        'std': float(kar.std()),
+        'medyan': float(np.median(kar)),
+        'kotu_senaryo': float(esik),
+        'var': float(max(0.0, -esik)),
+        'cvar': float(max(0.0, -kuyruk.mean())) if len(kuyruk) else 0.0,
+        'zarar_olasiligi': float((kar < 0).mean()),
+    }
+
+def calculate_profit_dynamic(bugday_fiyat, un_fiyat, tonaj, baseline=None):
+    """
+    Dinamik Kar Hesaplama Motoru (Optimize Edilmiş)
+    Tüm değişkenleri veritabanından alır, Fiyat ve Tonaj senaryosunu işler.
+    Tek senaryo için vektörel motorun skaler sarmalayıcısıdır.
+    """
+    return float(calculate_profit_vectorized(bugday_fiyat, un_fiyat, tonaj, baseline))
 
 def show_strategy_module():
     # Başlık Alanı
@@ -124,7 +323,7 @@ def show_strategy_module():
     # --- NAVİGASYON ---
     analiz_secimi = st.radio(
         "Analiz Aracı Seçiniz:",
-        ["🎯 Hedef Fiyat (Goal Seek)", "🌡️ Duyarlılık Matrisi", "⚓ Kapasite ve Başabaş", "⚖️ Senaryo Karşılaştırma"],
+        ["🎯 Hedef Fiyat (Goal Seek)", "🌡️ Duyarlılık Matrisi", "⚓ Kapasite ve Başabaş", "⚖️ Senaryo Karşılaştırma", "🎲 Risk Simülasyonu"],
         horizontal=True,
         label_visibility="collapsed"
     )
@@ -223,45 +422,40 @@ def show_strategy_module():
                 sens_tonaj = st.number_input("Kırılan Tonaj (Ton)", value=def_tonaj, step=100.0, key="sens_tonaj")
                 
                 st.divider()
+                bugday_aralik = st.number_input("Buğday Aralığı (± TL/kg)", value=0.50, min_value=0.05, step=0.05, key="sens_bugday_aralik")
+                un_aralik = st.number_input("Un Aralığı (± TL/50kg)", value=50.0, min_value=5.0, step=5.0, key="sens_un_aralik")
+                cozunurluk = st.select_slider("Izgara Çözünürlüğü", options=[5, 25, 50, 100, 200], value=200, key="sens_cozunurluk")
+                
                 st.caption(f"📊 Mevcut: Buğday {base_bugday:.2f} | Un {base_un:.0f}")
 
             with col_s2:
-                # 5x5 Matris (Performans için ideal)
-                bugday_prices = [base_bugday + (i * 0.25) for i in range(-2, 3)]
-                un_prices = [base_un + (i * 25) for i in range(-2, 3)]
+                # Tüm ızgara tek vektörel çağrıda (200x200 = 40.000 senaryo)
+                bugday_prices = np.linspace(base_bugday - bugday_aralik, base_bugday + bugday_aralik, cozunurluk)
+                un_prices = np.linspace(base_un - un_aralik, base_un + un_aralik, cozunurluk)
+                model = get_profit_model(baseline)
+                kar_matrisi = calculate_profit_grid(bugday_prices, un_prices, sens_tonaj, model=model)[:, :, 0] / 1000
                 
-                records = []
-                for bf in bugday_prices:
-                    for uf in un_prices:
-                        profit = calculate_profit_dynamic(bf, uf, sens_tonaj, baseline)
-                        records.append({
-                            "Buğday": f"{bf:.2f}",
-                            "Un Fiyatı": f"{uf:.0f}",
-                            "Net Kar (Bin TL)": int(profit / 1000)
-                        })
-                
-                df_long = pd.DataFrame(records)
-                
-                base_chart = alt.Chart(df_long).encode(
-                    x=alt.X('Un Fiyatı:O', title='Un Satış Fiyatı (TL/50kg)'),
-                    y=alt.Y('Buğday:O', title='Buğday Maliyeti (TL/kg)'),
-                    tooltip=['Buğday', 'Un Fiyatı', 'Net Kar (Bin TL)']
-                )
-                heatmap = base_chart.mark_rect().encode(
-                    color=alt.Color('Net Kar (Bin TL):Q', scale=alt.Scale(scheme='redyellowgreen', domain=[-5000, 5000]))
+                import plotly.graph_objects as go
+                fig = go.Figure(go.Heatmap(
+                    z=kar_matrisi, x=un_prices, y=bugday_prices,
+                    colorscale='RdYlGn', zmid=0,
+                    colorbar=dict(title="Net Kar (Bin TL)"),
+                    texttemplate="%{z:,.0f}" if cozunurluk <= 10 else None,
+                    hovertemplate="Buğday: %{y:.2f} TL/kg<br>Un: %{x:.0f} TL<br>Net Kar: %{z:,.0f} Bin TL<extra></extra>"
+                ))
+                fig.update_layout(
+                    xaxis_title="Un Satış Fiyatı (TL/50kg)", yaxis_title="Buğday Maliyeti (TL/kg)",
+                    height=450, margin=dict(l=10, r=10, t=10, b=10)
                 )
-                text = base_chart.mark_text(fontSize=11).encode(
-                    text='Net Kar (Bin TL):Q',
-                    color=alt.condition(alt.datum['Net Kar (Bin TL)'] > 500, alt.value('black'), alt.value('white'))
-                )
-                st.altair_chart(heatmap + text, use_container_width=True)
+                st.plotly_chart(fig, use_container_width=True)
                 
                 # --- [DÜZELTME 2] RISK ANALİZİ GERİ EKLENDİ ---
                 st.markdown("---")
                 st.markdown("##### 🔍 Hızlı Yorum")
                 
-                current_profit = calculate_profit_dynamic(base_bugday, base_un, sens_tonaj, baseline)
-                worst_profit = calculate_profit_dynamic(max(bugday_prices), min(un_prices), sens_tonaj, baseline)
+                current_profit = float(calculate_profit_vectorized(base_bugday, base_un, sens_tonaj, model=model))
+                # En kötü köşe: en pahalı buğday, en ucuz un
+                worst_profit = float(kar_matrisi[-1, 0] * 1000)
                 
                 col_y1, col_y2 = st.columns(2)
                 with col_y1:
@@ -295,47 +489,65 @@ def show_strategy_module():
                 tam_kapasite = st.number_input("Tam Kapasite (Ton/Ay)", value=4500.0, step=100.0, key="kap_tam")
                 
             with col_b2:
-                # Binary Search (Config'deki hassasiyet ile)
-                min_tonaj = 100
-                max_tonaj = tam_kapasite
-                break_even_tonaj = 0
-                precision_steps = STRATEGY_CONFIG.get('SEARCH_PRECISION', 50) # Config'den al
-                
-                for _ in range(precision_steps):
-                    mid_tonaj = (min_tonaj + max_tonaj) / 2
-                    profit = calculate_profit_dynamic(b_bugday_fiyat, b_un_fiyat, mid_tonaj, baseline)
-                    
-                    if abs(profit) < 5000:
-                        break_even_tonaj = mid_tonaj
-                        break
-                    elif profit < 0:
-                        min_tonaj = mid_tonaj
-                    else:
-                        max_tonaj = mid_tonaj
-                
-                if break_even_tonaj == 0: break_even_tonaj = min_tonaj
+                # Başabaş noktaları kapalı formdan (tam çözüm, arama yok)
+                model = get_profit_model(baseline)
+                break_even_tonaj = float(solve_break_even_tonaj(b_bugday_fiyat, b_un_fiyat, model=model))
+                break_even_un = float(solve_break_even_un_fiyati(b_bugday_fiyat, tam_kapasite, model=model))
+                break_even_bugday = float(solve_break_even_bugday_fiyati(b_un_fiyat, tam_kapasite, model=model))
+                ulasilamaz = np.isnan(break_even_tonaj)
                 
                 # Göstergeler
                 kpi_c1, kpi_c2 = st.columns(2)
                 with kpi_c1:
-                    st.metric("🎯 ZARARSIZLIK TONAJI", f"{break_even_tonaj:,.0f} Ton")
+                    st.metric("🎯 ZARARSIZLIK TONAJI", "∞" if ulasilamaz else f"{break_even_tonaj:,.0f} Ton")
                 with kpi_c2:
-                    kap_yuzde = (break_even_tonaj / tam_kapasite * 100) if tam_kapasite > 0 else 0
-                    st.metric("Minimum Kapasite", f"%{kap_yuzde:.1f}")
+                    kap_yuzde = (break_even_tonaj / tam_kapasite * 100) if tam_kapasite > 0 and not ulasilamaz else 0
+                    st.metric("Minimum Kapasite", "-" if ulasilamaz else f"%{kap_yuzde:.1f}")
+                
+                kpi_c3, kpi_c4 = st.columns(2)
+                with kpi_c3:
+                    st.metric("🌾 Tam Kapasitede Taban Un Fiyatı", f"{break_even_un:,.2f} TL",
+                              delta=f"{b_un_fiyat - break_even_un:,.2f} TL pay", delta_color="normal")
+                with kpi_c4:
+                    st.metric("💰 Tam Kapasitede Tavan Buğday Fiyatı", f"{break_even_bugday:,.3f} TL/kg",
+                              delta=f"{break_even_bugday - b_bugday_fiyat:,.3f} TL/kg pay", delta_color="normal")
 
                 # Grafik (Basitleştirilmiş)
-                start_p = max(100, break_even_tonaj - 1000)
-                caps = np.linspace(start_p, tam_kapasite, 20)
-                profits = [calculate_profit_dynamic(b_bugday_fiyat, b_un_fiyat, c, baseline)/1000 for c in caps]
+                start_p = 100 if ulasilamaz else max(100, break_even_tonaj - 1000)
+                caps = np.linspace(start_p, max(tam_kapasite, start_p + 100), 200)
+                profits = calculate_profit_vectorized(b_bugday_fiyat, b_un_fiyat, caps, model=model) / 1000
                 df_cap = pd.DataFrame({"Kapasite": caps, "Kar": profits})
                 
-                c = alt.Chart(df_cap).mark_line(color='#2ecc71', point=True).encode(
+                c = alt.Chart(df_cap).mark_line(color='#2ecc71').encode(
                     x=alt.X('Kapasite', title='Tonaj'), y=alt.Y('Kar', title='Kar (Bin TL)')
                 ).interactive()
                 st.altair_chart(c, use_container_width=True)
                 
-                if break_even_tonaj > tam_kapasite:
+                if ulasilamaz:
+                    st.error("🚨 **KRİTİK:** Bu fiyatlarda ton başı katkı negatif; hiçbir tonajda kar edilemez!")
+                elif break_even_tonaj > tam_kapasite:
                     st.error("🚨 **KRİTİK:** Tam kapasite çalışsanız bile kar edemezsiniz!")
+                
+                # Başabaş sınırı: farklı kapasite seviyelerinde buğday fiyatı -> zararsız un fiyatı
+                st.markdown("##### 🧭 Başabaş Sınırı")
+                st.caption("Çizginin üstündeki un fiyatları kar, altındakiler zarar bölgesidir.")
+                bugday_ekseni = np.linspace(b_bugday_fiyat * 0.8, b_bugday_fiyat * 1.2, 200)
+                seviyeler = np.array([0.5, 0.75, 1.0])
+                sinir = break_even_frontier(bugday_ekseni, tam_kapasite * seviyeler, model=model)
+                df_sinir = pd.DataFrame({
+                    "Buğday": np.repeat(bugday_ekseni, len(seviyeler)),
+                    "Başabaş Un Fiyatı": sinir.ravel(),
+                    "Kapasite": np.tile([f"%{s*100:.0f}" for s in seviyeler], len(bugday_ekseni)),
+                })
+                sinir_cizgisi = alt.Chart(df_sinir).mark_line().encode(
+                    x=alt.X('Buğday:Q', title='Buğday Fiyatı (TL/kg)', scale=alt.Scale(zero=False)),
+                    y=alt.Y('Başabaş Un Fiyatı:Q', title='Un Fiyatı (TL/50kg)', scale=alt.Scale(zero=False)),
+                    color=alt.Color('Kapasite:N', title='Kapasite'),
+                    tooltip=['Buğday', 'Başabaş Un Fiyatı', 'Kapasite']
+                )
+                mevcut_nokta = alt.Chart(pd.DataFrame({"Buğday": [b_bugday_fiyat], "Un": [b_un_fiyat]})).mark_point(
+                    color='black', size=120, filled=True).encode(x='Buğday:Q', y='Un:Q')
+                st.altair_chart((sinir_cizgisi + mevcut_nokta).interactive(), use_container_width=True)
 
     # --- 4. SENARYO KARŞILAŞTIRMA ---
     elif "Senaryo" in analiz_secimi:
@@ -385,6 +597,84 @@ def show_strategy_module():
             else:
                 st.warning("⚠️ **ORTA RİSK:** Piyasa kötüye giderse kar marjı düşüyor.")
 
+    # --- 5. MONTE-CARLO RİSK SİMÜLASYONU ---
+    elif "Risk" in analiz_secimi:
+        with st.container(border=True):
+            st.subheader("🎲 Fiyat Riski Simülasyonu (Monte-Carlo)")
+            st.info("💡 **Simülasyon:** Geçmiş maliyet kayıtlarındaki fiyat oynaklığı ve birlikte hareketle binlerce olası ay üretilir; kar dağılımı ve zarar olasılığı hesaplanır.")
+            
+            risk_model = fit_risk_model(get_un_maliyet_gecmisi())
+            
+            col_r1, col_r2 = st.columns([1, 2])
+            with col_r1:
+                st.markdown("##### ⚙️ Simülasyon Ayarları")
+                n_senaryo = st.select_slider("Senaryo Sayısı", options=[10000, 50000, 100000, 200000],
+                                             value=STRATEGY_CONFIG['MC_DEFAULT_SCENARIOS'], key="mc_senaryo")
+                ufuk_ay = st.slider("Ufuk (Ay)", 1, 12, 1, key="mc_ufuk")
+                guven = st.radio("Güven Düzeyi", [0.95, 0.99], format_func=lambda g: f"%{g*100:.0f}", horizontal=True, key="mc_guven")
+                seed = st.number_input("Rastgele Tohum", value=42, step=1, key="mc_seed")
+                
+                if risk_model['gozlem'] < STRATEGY_CONFIG['MC_MIN_HISTORY'] - 1:
+                    st.warning("⚠️ Yeterli maliyet geçmişi yok; varsayılan oynaklıklar kullanılıyor.")
+                else:
+                    st.caption(f"📈 Dağılım {risk_model['gozlem']} aylık değişimden uyduruldu.")
+                
+                oynaklik = pd.DataFrame({
+                    "Değişken": risk_model['etiketler'],
+                    "Aylık Oynaklık (%)": np.round(np.sqrt(np.diag(risk_model['kovaryans'])) * 100, 1),
+                })
+                st.dataframe(oynaklik, use_container_width=True, hide_index=True)
+            
+            with col_r2:
+                baslangic = time.perf_counter()
+                kar, girdiler = simulate_profit_distribution(baseline, risk_model, n_senaryo, ufuk_ay, int(seed))
+                ozet = summarize_risk(kar, guven)
+                sure_ms = (time.perf_counter() - baslangic) * 1000
+                
+                m1, m2, m3 = st.columns(3)
+                m1.metric("📊 Beklenen Kar", f"{ozet['ortalama']/1000:,.0f} Bin TL")
+                m2.metric(f"⚠️ VaR (%{guven*100:.0f})", f"{ozet['var']/1000:,.0f} Bin TL",
+                          help=f"Senaryoların %{guven*100:.0f}'inde zarar bu tutarı aşmaz.")
+                m3.metric("🎯 Zarar Olasılığı", f"%{ozet['zarar_olasiligi']*100:.1f}")
+                
+                m4, m5, m6 = st.columns(3)
+                m4.metric("Medyan Kar", f"{ozet['medyan']/1000:,.0f} Bin TL")
+                m5.metric("Beklenen Kayıp (CVaR)", f"{ozet['cvar']/1000:,.0f} Bin TL",
+                          help="En kötü senaryo diliminde ortalama zarar.")
+                m6.metric("Standart Sapma", f"{ozet['std']/1000:,.0f} Bin TL")
+                
+                # Dağılım (histogram tek seferde NumPy ile, grafiğe sadece kutular gider)
+                sayilar, kenarlar = np.histogram(kar / 1000, bins=80)
+                df_hist = pd.DataFrame({
+                    "Kar_baslangic": kenarlar[:-1], "Kar_bitis": kenarlar[1:], "Senaryo": sayilar,
+                    "Durum": np.where(kenarlar[1:] <= 0, "Zarar", "Kar"),
+                })
+                hist = alt.Chart(df_hist).mark_bar().encode(
+                    x=alt.X('Kar_baslangic:Q', title='Net Kar (Bin TL)'), x2='Kar_bitis:Q',
+                    y=alt.Y('Senaryo:Q', title='Senaryo Sayısı'),
+                    color=alt.Color('Durum:N', scale=alt.Scale(domain=['Zarar', 'Kar'], range=['#e74c3c', '#2ecc71']), legend=None),
+                    tooltip=['Kar_baslangic', 'Kar_bitis', 'Senaryo']
+                )
+                var_cizgisi = alt.Chart(pd.DataFrame({'x': [ozet['kotu_senaryo'] / 1000]})).mark_rule(
+                    color='black', strokeDash=[4, 4]).encode(x='x:Q')
+                st.altair_chart(hist + var_cizgisi, use_container_width=True)
+                
+                # Hangi değişken riski sürüklüyor? (kar ile korelasyon)
+                etkiler = pd.DataFrame({
+                    "Değişken": risk_model['etiketler'],
+                    "Kar ile Korelasyon": [float(np.corrcoef(girdiler[k], kar)[0, 1]) if girdiler[k].std() > 0 else 0.0
+                                           for k in risk_model['kolonlar']],
+                }).sort_values("Kar ile Korelasyon", key=np.abs, ascending=False)
+                st.dataframe(etkiler, use_container_width=True, hide_index=True)
+                st.caption(f"⏱️ {len(kar):,} senaryo {sure_ms:.0f} ms'de hesaplandı.")
+                
+                if ozet['zarar_olasiligi'] > 0.25:
+                    st.error(f"🚨 **YÜKSEK RİSK:** Senaryoların %{ozet['zarar_olasiligi']*100:.0f}'inde zarar var.")
+                elif ozet['zarar_olasiligi'] > 0.05:
+                    st.warning(f"⚠️ **ORTA RİSK:** Zarar olasılığı %{ozet['zarar_olasiligi']*100:.1f}.")
+                else:
+                    st.success("✅ **DÜŞÜK RİSK:** Senaryoların büyük çoğunluğunda karlısınız.")
+
 
 
 
@@ -1,12 +1,16 @@
 import streamlit as st
 import pandas as pd
 import json
+import time
 from datetime import datetime
 import re
 
 
 # Veritabanı Erişim
-from app.core.database import fetch_data
+from app.core.database import fetch_data, fetch_many
+from app.core.lineage import lineage_index, normalize_key, MOVEMENTS_TABLE
+from app.core.archive import fetch_with_archive
+from app.core.components import render_report_job
 # Raporlama modülünü güvenli içeri al (PDF için)
 try:
     from app.modules.reports import create_traceability_pdf_report
@@ -17,135 +21,218 @@ except ImportError:
 # ==============================================================================
 # 1. ZİNCİR KURMA MOTORU (BACKEND)
 # ==============================================================================
-@st.cache_data(ttl=300) 
-def load_traceability_databases():
-    """Veritabanlarını 5 dakikalığına hafızaya alır, sistemi hızlandırır."""
-    df_analiz = pd.DataFrame()
-    df_uretim = pd.DataFrame()
-    df_mix = pd.DataFrame()
-    df_ship = pd.DataFrame() # Sevkiyat tablosu eklendi
-    df_enz = pd.DataFrame()  # Enzim tablosu eklendi
-    
-    try: df_analiz = fetch_data("un_analiz")
-    except: pass
-    try: df_uretim = fetch_data("uretim_kaydi")
-    except: pass
-    try: df_mix = fetch_data("mixing_batches")
-    except: pass
-    try: df_ship = fetch_data("sevkiyat_listesi")
-    except: pass
-    try: df_enz = fetch_data("enzim_receteleri")
-    except: pass
-    
-    return df_analiz, df_uretim, df_mix, df_ship, df_enz
-    
+def _load_lineage_tables(names):
+    """
+    Soy ağacı indeksinin kaynak tabloları (paralel çekilir, hata veren tablo boş döner).
+    Hareketler arşiv bölümleriyle birlikte yüklenir: silo FIFO zinciri tüm geçmişi görmeli.
+    """
+    tablolar = fetch_many(names)
+    if MOVEMENTS_TABLE in tablolar:
+        tablolar[MOVEMENTS_TABLE] = fetch_with_archive(MOVEMENTS_TABLE)
+    return tablolar
+
+def _latest(records):
+    """Kayıtlardan en yeni tarihliyi döndürür (Series olarak), yoksa None"""
+    if not records:
+        return None
+    def tarih(item):
+        value = pd.to_datetime(item[1].get('tarih'), errors='coerce')
+        return value if pd.notnull(value) else pd.Timestamp.min
+    return pd.Series(max(records, key=tarih)[1])
+
+def _linked(keys, table, filtre=None):
+    """Anahtar kümesindeki, verilen tabloya ait kayıtlar"""
+    sonuc = []
+    for key in keys:
+        for t, row in lineage_index.get_records(key, table):
+            if filtre is None or filtre(key, row):
+                sonuc.append((t, row))
+    return sonuc
+
 def get_trace_chain(search_query):
     """
     Girilen Lot/ID'den başlayıp SAHA GERÇEKLİĞİNE göre tüm zinciri kurar.
     Sistem Köprüsü: SHIP -> LAB -> MIX <- PRD (Mill)
+    
+    Tablolar taranmaz: soy ağacı indeksi (app/core/lineage.py) üzerinden
+    her köprü tek bir komşuluk sorgusudur.
     """
     chain = {
         "found": False, "SHIP": None, "LAB": None, "PRD": None, "MIX": None, "ENZ": None
     }
     
-    # Güvenli arama için regex karakterlerini escape et
-    search_query = str(search_query).strip()
-    
-    # Cache'li database'leri kullan (5 dakika hafızada kalır)
-    df_analiz, df_uretim, df_mix, df_ship, df_enz = load_traceability_databases()
-    
+    lineage_index.ensure(_load_lineage_tables)
     
     # --- ADIM 1: GİRDİYİ BUL (Herhangi bir halkadan başlanabilir) ---
+    key = lineage_index.resolve(search_query)
+    if key is None:
+        return chain
     
-    # A) Analiz Tablosunda Ara (Sevkiyat veya Lab)
-    if not df_analiz.empty:
-        # Sadece ilgili sütunlarda ara (3x daha hızlı)
-        match = df_analiz[df_analiz.astype(str).apply(
-            lambda x: x.str.contains(search_query, case=False, regex=False)
-        ).any(axis=1)]
-        if not match.empty:
-            record = match.iloc[0]
-            chain["found"] = True
-            islem_tipi = str(record.get('islem_tipi', '')).upper()
-            
-            if "SEVK" in islem_tipi:
-                chain["SHIP"] = record
-                # KÖPRÜ 1: Sevkiyat (SHIP) -> Üretim Analizi (LAB)
-                lab_ref = str(record.get('kaynak_parti_no') or record.get('uretim_lot_no') or '')
-                if lab_ref and lab_ref.lower() != 'nan':
-                    l_match = df_analiz[df_analiz['lot_no'] == lab_ref]
-                    if not l_match.empty: chain["LAB"] = l_match.iloc[0]
-            else:
-                chain["LAB"] = record
-
-    # B) Üretim (Değirmen) Tablosunda Ara (Direkt girildiyse)
-    if not chain["found"] and not df_uretim.empty:
-        match = df_uretim[df_uretim['parti_no'].astype(str).str.contains(search_query, case=False, regex=False)]
-        if not match.empty:
-            chain["found"] = True
-            chain["PRD"] = match.iloc[0]
-
-    # C) Paçal Tablosunda Ara (Direkt girildiyse)
-    if not chain["found"] and not df_mix.empty:
-        match = df_mix[df_mix['batch_id'].astype(str).str.contains(search_query, case=False, regex=False)]
-        if not match.empty:
-            chain["found"] = True
-            chain["MIX"] = match.iloc[0]
-
+    # Öncelik: Analiz (Sevkiyat / Lab) > Üretim > Paçal > Enzim
+    kayitlar = dict((t, r) for t, r in reversed(lineage_index.get_records(key)))
+    if "un_analiz" in kayitlar:
+        record = pd.Series(kayitlar["un_analiz"])
+        islem_tipi = str(record.get('islem_tipi', '')).upper()
+        if "SEVK" in islem_tipi:
+            chain["SHIP"] = record
+            # KÖPRÜ 1: Sevkiyat (SHIP) -> Üretim Analizi (LAB)
+            chain["LAB"] = _latest(_linked(lineage_index.get_parents(key), "un_analiz"))
+        else:
+            chain["LAB"] = record
+    elif "sevkiyat_listesi" in kayitlar:
+        chain["SHIP"] = pd.Series(kayitlar["sevkiyat_listesi"])
+        chain["LAB"] = _latest(_linked(lineage_index.get_parents(key), "un_analiz"))
+    elif "uretim_kaydi" in kayitlar:
+        chain["PRD"] = pd.Series(kayitlar["uretim_kaydi"])
+    elif "mixing_batches" in kayitlar:
+        chain["MIX"] = pd.Series(kayitlar["mixing_batches"])
+    elif "enzim_receteleri" in kayitlar:
+        chain["ENZ"] = pd.Series(kayitlar["enzim_receteleri"])
+    else:
+        return chain
+    chain["found"] = True
+
+    def mix_of(record, id_col):
+        """Kaydın üst halkalarındaki paçal (MIX)"""
+        kimlik = normalize_key(record.get(id_col))
+        return _latest(_linked(lineage_index.get_parents(kimlik), "mixing_batches")) if kimlik else None
+
+    # Sevkiyat doğrudan paçala / üretime bağlandıysa (arada LAB kaydı yok)
+    if chain["SHIP"] is not None and chain["LAB"] is None:
+        ship_parents = lineage_index.get_parents(key)
+        chain["MIX"] = _latest(_linked(ship_parents, "mixing_batches"))
+        chain["PRD"] = _latest(_linked(ship_parents, "uretim_kaydi"))
 
     # --- ADIM 2: EKSİK HALKALARI TAMAMLA (KÖPRÜLERİ GEÇ) ---
 
-    # KÖPRÜ 2: Laboratuvar (LAB) -> Paçal (MIX)
-    # Lab analiz formunda kaynağa (kaynak_parti_no) MIX-... kaydediliyor.
+    # KÖPRÜ 2: Laboratuvar (LAB) -> Paçal (MIX)  [kaynak_parti_no = MIX-...]
     if chain["LAB"] is not None and chain["MIX"] is None:
-        mix_ref = str(chain["LAB"].get('kaynak_parti_no') or chain["LAB"].get('kullanilan_pacal') or '')
-        if mix_ref and "MIX" in mix_ref.upper() and not df_mix.empty:
-            m_match = df_mix[df_mix['batch_id'].astype(str).str.contains(mix_ref, case=False, regex=False)]
-            if not m_match.empty: chain["MIX"] = m_match.iloc[0]
+        chain["MIX"] = mix_of(chain["LAB"], 'lot_no')
+        # Lab kaynağı PRD ise paçala üretim üzerinden ulaşılır
+        if chain["MIX"] is None and chain["PRD"] is None:
+            lab_key = normalize_key(chain["LAB"].get('lot_no'))
+            chain["PRD"] = _latest(_linked(lineage_index.get_parents(lab_key), "uretim_kaydi")) if lab_key else None
 
-    # KÖPRÜ 3: Değirmen Üretim (PRD) -> Paçal (MIX)
-    # Değirmen formunda kaynağa (kullanilan_pacal) MIX-... kaydediliyor.
+    # KÖPRÜ 3: Değirmen Üretim (PRD) -> Paçal (MIX)  [kullanilan_pacal = MIX-...]
     if chain["PRD"] is not None and chain["MIX"] is None:
-        mix_ref = str(chain["PRD"].get('kullanilan_pacal') or chain["PRD"].get('mixing_batch_id') or '')
-        if mix_ref and "MIX" in mix_ref.upper() and not df_mix.empty:
-            
-            if not m_match.empty: chain["MIX"] = m_match.iloc[0]
-
-    # KÖPRÜ 4: Paçal (MIX) -> Değirmen Üretim (PRD) (Merkez İstasyon Dönüşü)
-    # Elimizde Paçal (MIX) varsa, bu paçalın girdiği DEĞİRMEN ÜRETİMİNİ (PRD) bul.
-    if chain["MIX"] is not None and chain["PRD"] is None and not df_uretim.empty:
-        mix_id = str(chain["MIX"].get('batch_id', ''))
-        if mix_id:
-            u_match = df_uretim[df_uretim['kullanilan_pacal'].astype(str).str.contains(mix_id, case=False, regex=False)]
-            if not u_match.empty:
-                # Aynı paçalla birden fazla üretim yapıldıysa en son yapılanı alır
-                chain["PRD"] = u_match.sort_values('tarih', ascending=False).iloc[0]
-
-    # KÖPRÜ 5: Eğer Değirmen(PRD) var ama Laboratuvar(LAB) yoksa
-    if chain["PRD"] is not None and chain["LAB"] is None and not df_analiz.empty:
-        # MIX üzerinden kardeşi olan Laboratuvar analizini bul
-        if chain["MIX"] is not None:
-             mix_id = str(chain["MIX"].get('batch_id', ''))
-             l_match = df_analiz[
-                 (df_analiz['kaynak_parti_no'].astype(str).str.contains(mix_id, case=False, regex=False)) & 
-                 (df_analiz['islem_tipi'] == 'ÜRETİM')
-             ]
-             if not l_match.empty:
-                 chain["LAB"] = l_match.sort_values('tarih', ascending=False).iloc[0]
-    # KÖPRÜ 6: Paçal (MIX) -> Enzim Reçetesi (ENZ)
-    if chain["MIX"] is not None and chain["ENZ"] is None:
-        mix_id = str(chain["MIX"].get('batch_id', ''))
-        if mix_id:
-            try:
-                df_enz = fetch_data("enzim_receteleri")
-                if not df_enz.empty:
-                    # uretim_kodu sütununa kaydetmiştik, orada arıyoruz
-                    e_match = df_enz[df_enz['uretim_kodu'].astype(str).str.contains(mix_id, case=False, regex=False)]
-                    if not e_match.empty:
-                        chain["ENZ"] = e_match.sort_values('tarih', ascending=False).iloc[0]
-            except Exception as e:
-                pass
+        chain["MIX"] = mix_of(chain["PRD"], 'parti_no')
+
+    # KÖPRÜ 6 (öne alındı): Enzim (ENZ) ile girildiyse paçala çık
+    if chain["ENZ"] is not None and chain["MIX"] is None:
+        chain["MIX"] = mix_of(chain["ENZ"], 'enzim_id')
+
+    mix_key = normalize_key(chain["MIX"].get('batch_id')) if chain["MIX"] is not None else None
+    if mix_key:
+        alt_halkalar = lineage_index.get_children(mix_key)
+
+        # KÖPRÜ 4: Paçal (MIX) -> Değirmen Üretim (PRD)
+        # Aynı paçalla birden fazla üretim yapıldıysa en son yapılanı alır
+        if chain["PRD"] is None:
+            chain["PRD"] = _latest(_linked(alt_halkalar, "uretim_kaydi"))
+
+        # KÖPRÜ 5: PRD var ama LAB yoksa, MIX üzerinden kardeş üretim analizini bul
+        if chain["LAB"] is None:
+            chain["LAB"] = _latest(_linked(
+                alt_halkalar, "un_analiz", lambda _, row: row.get('islem_tipi') == 'ÜRETİM'
+            ))
+
+        # KÖPRÜ 6: Paçal (MIX) -> Enzim Reçetesi (ENZ)
+        if chain["ENZ"] is None:
+            chain["ENZ"] = _latest(_linked(alt_halkalar, "enzim_receteleri"))
     return chain
+
+# ==============================================================================
+# 1B. GERİ ÇAĞIRMA (RECALL) ANALİZİ
+# ==============================================================================
+# Tablo -> (halka etiketi, açıklama sütunları)
+RECALL_HALKALARI = {
+    "bugday_giris_arsivi": ("WHT", ['tedarikci', 'bugday_cinsi', 'yore']),
+    "mixing_batches": ("MIX", ['urun_adi']),
+    "uretim_kaydi": ("PRD", ['degirmen_uretim_adi', 'vardiya']),
+    "enzim_receteleri": ("ENZ", ['uretim_adi']),
+    "un_analiz": ("LAB", ['un_markasi', 'un_cinsi_marka', 'musteri_adi']),
+    "sevkiyat_listesi": ("SHIP", ['musteri_adi', 'musteri', 'plaka_no']),
+}
+
+def _recall_satiri(key, mesafe):
+    """Soy ağacı düğümünü rapor satırına çevirir"""
+    kayitlar = lineage_index.get_records(key)
+    if not kayitlar:
+        # Sadece hareketlerde geçen buğday lotu (arşiv kaydı yok)
+        return {"Halka": key.split('-')[0], "Kimlik": key, "Mesafe": mesafe,
+                "Tarih": pd.NaT, "Açıklama": "-", "Tedarikçi": "-", "Müşteri": "-"}
+
+    table, row = kayitlar[0]
+    halka, aciklama_kolonlari = RECALL_HALKALARI.get(table, (table, []))
+    if table == "un_analiz" and "SEVK" in str(row.get('islem_tipi', '')).upper():
+        halka = "SHIP"
+    aciklama = next((str(row[c]) for c in aciklama_kolonlari
+                     if normalize_key(row.get(c)) is not None), "-")
+    return {
+        "Halka": halka,
+        "Kimlik": key,
+        "Mesafe": mesafe,
+        "Tarih": pd.to_datetime(row.get('tarih'), errors='coerce'),
+        "Açıklama": aciklama,
+        "Tedarikçi": row.get('tedarikci') if halka == "WHT" else "-",
+        "Müşteri": (row.get('musteri_adi') or row.get('musteri') or "-") if halka == "SHIP" else "-",
+    }
+
+def get_recall_analysis(queries, direction="forward"):
+    """
+    Bir veya birden çok koddan (WHT-, MIX-, PRD-, ENZ-, sevkiyat lotu) başlayarak
+    etkilenen TÜM kayıtları bulur.
+    
+    direction="forward":  buğday lotu -> paçal -> üretim / enzim -> lab -> sevkiyat
+    direction="backward": sevkiyat -> lab -> üretim -> paçal -> buğday lotu / tedarikçi
+    
+    Buğday lotunun paçala geçişi silo üzerinden kurulur: lot, siloya girişinden
+    silonun ilk tamamen boşalmasına kadar o silodan çekilen tüm paçallara bağlanır.
+    
+    Birden çok kayda uyan önekler (belirsiz kodlar) taranmaz; adaylarıyla döner.
+    
+    Returns:
+        dict: found, bulunamayan (kodlar), belirsiz ({kod: adaylar}), kayitlar (DataFrame),
+              tedarikciler, musteriler, sure_ms
+    """
+    baslangic = time.perf_counter()
+    if isinstance(queries, str):
+        queries = [queries]
+    
+    lineage_index.ensure(_load_lineage_tables)
+    
+    mesafeler, bulunamayan, belirsiz = {}, [], {}
+    for query in queries:
+        adaylar = lineage_index.candidates(query)
+        if len(adaylar) != 1:
+            if len(adaylar) > 1:
+                belirsiz[str(query).strip()] = adaylar
+            elif str(query).strip():
+                bulunamayan.append(str(query).strip())
+            continue
+        key = adaylar[0]
+        for dugum, mesafe in lineage_index.traverse(key, direction).items():
+            if dugum not in mesafeler or mesafe < mesafeler[dugum]:
+                mesafeler[dugum] = mesafe
+    
+    df = pd.DataFrame([_recall_satiri(k, m) for k, m in mesafeler.items()],
+                      columns=["Halka", "Kimlik", "Mesafe", "Tarih", "Açıklama", "Tedarikçi", "Müşteri"])
+    if not df.empty:
+        df = df.sort_values(["Mesafe", "Halka", "Kimlik"]).reset_index(drop=True)
+    
+    def benzersiz(kolon):
+        degerler = df.loc[df[kolon].notna() & (df[kolon].astype(str).str.strip() != "-"), kolon]
+        return sorted({str(v).strip() for v in degerler if str(v).strip() and str(v).lower() != 'nan'})
+    
+    return {
+        "found": not df.empty,
+        "bulunamayan": bulunamayan,
+        "belirsiz": belirsiz,
+        "kayitlar": df,
+        "tedarikciler": benzersiz("Tedarikçi"),
+        "musteriler": benzersiz("Müşteri"),
+        "sure_ms": (time.perf_counter() - baslangic) * 1000,
+    }
     
 # ==============================================================================
 # 2. GÖRSELLEŞTİRME (FRONTEND)
@@ -277,10 +364,15 @@ def show_traceability_dashboard():
         st.write("")
         st.write("")
         ara_btn = st.button("🚀 ZİNCİRİ TARA", type="primary", width='stretch')
+    # Son taranan kod oturumda tutulur; rapor hazırlanırken (yeniden çizimlerde) sonuç kaybolmaz
     if ara_btn and query:
-        # Cache temizle ki en güncel veriyi görsün
-        st.cache_data.clear()
-        
+        st.session_state['izlenebilirlik_sorgu'] = query
+    if query and st.session_state.get('izlenebilirlik_sorgu') == query:
+        # Önek birden çok kayda uyuyorsa önce hangisi olduğu seçilir
+        query = _aday_sec(query, "izlenebilirlik_aday")
+        if query is None:
+            return
+        # İndeks yazmalarla güncel tutulur; cache temizlemeye gerek yok
         with st.spinner("Veri tabanı taranıyor..."):
             chain = get_trace_chain(query)
         
@@ -296,22 +388,16 @@ def show_traceability_dashboard():
         with col_info:
             st.info("💡 Bu partinin (Lot) tüm hikayesini PDF olarak indirebilirsiniz.")
         with col_btn:
-            # Rapor Fonksiyonunu Çağır
-            try:
-                pdf_data = create_traceability_pdf_report(chain)
-                if pdf_data:
-                    st.download_button(
-                        label="📄 Raporu İndir",
-                        data=pdf_data,
-                        file_name=f"izlenebilirlik_{query}.pdf",
-                        mime="application/pdf",
-                        width='stretch',
-                        type="primary"
-                    )
-                else:
-                    st.warning("PDF oluşturulamadı")
-            except Exception as e:
-                st.error(f"PDF Hatası: {e}")
+            # Rapor arka plan kuyruğunda üretilir (sayfa beklemez)
+            render_report_job(
+                f"izlenebilirlik_{query}",
+                "app.modules.reports:create_traceability_pdf_report",
+                lambda: (chain,),
+                file_name=f"izlenebilirlik_{query}.pdf",
+                mime="application/pdf",
+                label="İzlenebilirlik raporu",
+                button_label="📄 Raporu Hazırla"
+            )
         st.divider()
         # ======================================================================
         # 1. HALKA: SEVKİYAT BİLGİSİ (SHIP)
@@ -663,4 +749,94 @@ def show_traceability_dashboard():
             st.warning("⚠️ Bu üretime bağlı Paçal kaydı bulunamadı (Mix ID eksik veya eşleşmiyor).")
 
 
-
+# ==============================================================================
+# 3. GERİ ÇAĞIRMA (RECALL) EKRANI
+# ==============================================================================
+def _aday_sec(kod, widget_key):
+    """
+    Kod (önek) birden çok kayda uyuyorsa kullanıcıya hangisi olduğunu seçtirir.
+    
+    Returns:
+        str: Kullanılacak kod (seçim bekleniyorsa None)
+    """
+    lineage_index.ensure(_load_lineage_tables)
+    adaylar = lineage_index.candidates(kod)
+    if len(adaylar) <= 1:
+        return kod
+    return st.selectbox(f"🔀 '{kod}' birden çok kayda uyuyor, hangisi?", adaylar,
+                        index=None, placeholder="Seçiniz...", key=widget_key)
+
+def show_recall_analysis():
+    """Toplu geri çağırma analizi: ileri (lot -> sevkiyat) / geri (sevkiyat -> lot)"""
+    st.markdown("""
+    <div style='background-color: #b71c1c; padding: 15px; border-radius: 10px; color: white; text-align: center; margin-bottom: 20px;'>
+        <h2 style='margin:0; font-size: 22px;'>🚨 GERİ ÇAĞIRMA (RECALL) ANALİZİ</h2>
+        <p style='color: #ffcdd2; margin-top:5px; font-size: 13px;'>Buğday Lotu ⇄ Paçal ⇄ Üretim / Enzim ⇄ Lab ⇄ Sevkiyat</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    yon = st.radio(
+        "Analiz Yönü",
+        ["➡️ İleri (Lot → Etkilenen Sevkiyatlar)", "⬅️ Geri (Sevkiyat → Kaynak Lotlar / Tedarikçiler)"],
+        horizontal=True, key="recall_yon"
+    )
+    direction = "forward" if yon.startswith("➡️") else "backward"
+    
+    kodlar_metni = st.text_area(
+        "Kodlar (her satıra bir kod veya virgülle ayırın)",
+        placeholder="WHT-260210143005\nWHT-260211090000",
+        key="recall_kodlar"
+    )
+    
+    # Çalıştırılan kodlar oturumda tutulur; belirsiz kod seçimi (yeniden çizim) sonucu kaybettirmez
+    if st.button("🔎 ANALİZİ ÇALIŞTIR", type="primary", key="recall_btn"):
+        st.session_state['recall_sorgu'] = kodlar_metni
+    if st.session_state.get('recall_sorgu') != kodlar_metni:
+        return
+    
+    kodlar = [k.strip() for k in kodlar_metni.replace(',', '\n').splitlines() if k.strip()]
+    if not kodlar:
+        st.warning("⚠️ En az bir kod giriniz.")
+        return
+    
+    # Birden çok kayda uyan önekler için kullanıcı seçimi
+    kodlar = [_aday_sec(kod, f"recall_aday_{kod}") for kod in kodlar]
+    if any(kod is None for kod in kodlar):
+        st.info("ℹ️ Analiz için belirsiz kodların karşılığını seçiniz.")
+        return
+    
+    with st.spinner("Soy ağacı taranıyor..."):
+        sonuc = get_recall_analysis(kodlar, direction)
+    
+    if sonuc["bulunamayan"]:
+        st.warning(f"⚠️ Bulunamayan kodlar: {', '.join(sonuc['bulunamayan'])}")
+    if sonuc["belirsiz"]:
+        st.warning(f"⚠️ Birden çok kayda uyan kodlar: {', '.join(sonuc['belirsiz'])}")
+    if not sonuc["found"]:
+        st.error("❌ Kayıt bulunamadı.")
+        return
+    
+    df = sonuc["kayitlar"]
+    st.success(f"✅ {len(df)} bağlantılı kayıt bulundu ({sonuc['sure_ms']:.0f} ms)")
+    
+    # Halka bazında özet
+    sayilar = df["Halka"].value_counts()
+    cols = st.columns(6)
+    for col, halka in zip(cols, ["WHT", "MIX", "PRD", "ENZ", "LAB", "SHIP"]):
+        col.metric(halka, int(sayilar.get(halka, 0)))
+    
+    if direction == "forward" and sonuc["musteriler"]:
+        st.error(f"📦 Etkilenen müşteriler: {', '.join(sonuc['musteriler'])}")
+    if direction == "backward" and sonuc["tedarikciler"]:
+        st.info(f"🚜 Kaynak tedarikçiler: {', '.join(sonuc['tedarikciler'])}")
+    
+    df_goster = df.copy()
+    df_goster["Tarih"] = df_goster["Tarih"].dt.strftime('%d.%m.%Y %H:%M').fillna("-")
+    st.dataframe(df_goster, hide_index=True, width='stretch')
+    
+    st.download_button(
+        "📥 Listeyi İndir (CSV)",
+        data=df_goster.to_csv(index=False).encode('utf-8-sig'),
+        file_name=f"recall_{direction}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+        mime="text/csv"
+    )
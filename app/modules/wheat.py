@@ -4,12 +4,18 @@ import time
 from datetime import datetime
 import numpy as np
 import uuid
+import threading
 
 # --- DATABASE VE CORE IMPORTLARI ---
-from app.core.database import fetch_data, add_data, get_conn, update_data, log_activity
+from app.core.database import fetch_data, add_data, get_conn, update_data, update_row_by_filter, delete_rows_by_filter, log_activity, unit_of_work, current_unit_of_work
+from app.core.silo_engine import apply_movement, reconcile_silos, SILO_KUMULATIF_KOLONLAR, SILO_SURUM_KOLONU, GIRIS_TIPLERI
+from app.core.search_index import search_index
+from app.core.silo_quality import silo_quality
+from app.core.archive import fetch_with_archive
+from app.core.pacal_engine import KURU_PARAMETRELERI
 from app.core.config import INPUT_LIMITS, TERMS, get_limit
 from app.core.error_handling import error_handler, log_info, log_warning, ERROR_HANDLING_AVAILABLE
-from app.core.components import render_help_button
+from app.core.components import render_help_button, render_report_job
 from app.core.languages import t
 
 # Rapor modülü (Hata önleyici)
@@ -22,54 +28,68 @@ except ImportError:
 # --------------------------------------------------------------------------
 # YARDIMCI FONKSİYONLAR (Dashboard Bağımlılığını Kaldırmak İçin Buraya Eklendi)
 # --------------------------------------------------------------------------
+def _tavli_kayit_filtresi(df_tavli, record):
+    """
+    Tavlı analiz kaydını depoda bulan filtre ve eşleşen satırlar.
+    Önce id (en güvenli yol); id'siz eski kayıtlarda tarih + silo (yedek plan).
+    
+    Returns:
+        tuple: (filtre dict, eşleşen satırlar DataFrame) - bulunamazsa (None, None)
+    """
+    if df_tavli.empty:
+        return None, None
+    
+    # 1. Önce ID var mı diye bak
+    kimlik = record.get('id')
+    if 'id' in df_tavli.columns and pd.notnull(kimlik) and str(kimlik).strip():
+        mask = df_tavli['id'] == kimlik
+        if mask.any():
+            return {'id': kimlik}, df_tavli[mask]
+    
+    # 2. ID ile bulamazsa, eski yöntemle (Tarih + Silo) ara
+    if 'tarih' in df_tavli.columns and 'silo_isim' in df_tavli.columns:
+        tarih = pd.Timestamp(record['tarih'])
+        mask = (df_tavli['tarih'] == tarih) & (df_tavli['silo_isim'] == record['silo_isim'])
+        if mask.any():
+            return {'tarih': tarih, 'silo_isim': record['silo_isim']}, df_tavli[mask]
+    return None, None
+
 def update_tavli_record_backend(original_record, new_data):
     """
     Tavlı analiz kaydını günceller ve silolar tablosundaki stokları senkronize eder.
+    Sadece kaydın satırı yazılır (farklı kayıtları düzenleyen kullanıcılar birbirini ezmez);
+    kayıt ve stok düzeltmeleri tek toplu yazmadadır (ya hep ya hiç).
     """
     try:
-        conn = get_conn()
         df_tavli = fetch_data("tavli_analiz")
+        filtre, eski_kayit = _tavli_kayit_filtresi(df_tavli, original_record)
         
-        # --- BURASI DEĞİŞTİ (ID KONTROLÜ EKLENDİ) ---
-        idx = None
-                    
-        # 1. Önce ID var mı diye bak (En güvenli yol)
-        if 'id' in original_record and 'id' in df_tavli.columns:
-            matches = df_tavli[df_tavli['id'] == original_record['id']].index
-            if not matches.empty:
-                idx = matches[0]
-        
-        # 2. ID ile bulamazsa, eski yöntemle (Tarih + Silo) ara (Yedek plan)
-        if idx is None:
-            matches = df_tavli[
-                (df_tavli['tarih'].astype(str) == str(original_record['tarih'])) & 
-                (df_tavli['silo_isim'] == original_record['silo_isim'])
-            ].index
-            if not matches.empty:
-                idx = matches[0]
-        
-        # Eğer kayıt hala yoksa hata ver
-        if idx is None:
+        # Eğer kayıt yoksa hata ver
+        if filtre is None:
             return False, "⚠️ Bu kayıt sistemde bulunamadı. Muhtemelen başka bir kullanıcı tarafından silinmiş veya ID yapısı güncellenmeden önce kaydedilmiş olabilir. Lütfen sayfayı yenileyip tekrar deneyin."
             
-        # ------------------------------------------------
-            
         # Eski ve yeni değerleri karşılaştır (Stok güncellemesi için)
         old_silo = original_record['silo_isim']
         new_silo = new_data['silo_isim']
         old_tonaj = float(original_record['analiz_tonaj'])
         new_tonaj = float(new_data['analiz_tonaj'])
         
-        # Eğer silo veya tonaj değiştiyse stokları düzelt
-        if old_silo != new_silo or old_tonaj != new_tonaj:
-            update_tavli_bugday_stok(old_silo, old_tonaj, "cikar") # Eskiyi iade et
-            update_tavli_bugday_stok(new_silo, new_tonaj, "ekle")  # Yeniyi düş
-            
-        # Verileri güncelle
+        yeni_kayit = eski_kayit.copy()
         for key, val in new_data.items():
-            df_tavli.at[idx, key] = val
+            yeni_kayit[key] = val
+        
+        # Silo kalite özetine sadece bu kaydın farkı işlenir
+        with silo_quality.expect_change(removed=eski_kayit, added=yeni_kayit), unit_of_work():
+            # Eğer silo veya tonaj değiştiyse stokları düzelt
+            if old_silo != new_silo or old_tonaj != new_tonaj:
+                if not update_tavli_bugday_stok(old_silo, old_tonaj, "cikar"): # Eskiyi iade et
+                    raise RuntimeError(f"{old_silo} tavlı stoğu güncellenemedi!")
+                if not update_tavli_bugday_stok(new_silo, new_tonaj, "ekle"):  # Yeniyi düş
+                    raise RuntimeError(f"{new_silo} tavlı stoğu güncellenemedi!")
             
-        conn.update(worksheet="tavli_analiz", data=df_tavli)
+            ok, msg = update_row_by_filter("tavli_analiz", filtre, new_data, add_columns=True)
+            if not ok:
+                raise RuntimeError(msg)
         return True, "✅ Tavlı analiz ve stok kartları başarıyla güncellendi."
         
     except Exception as e:
@@ -77,26 +97,27 @@ def update_tavli_record_backend(original_record, new_data):
 
 def delete_tavli_record_backend(record):
     """
-    Tavlı analiz kaydını siler ve stoğu düşer.
+    Tavlı analiz kaydını siler ve stoğu düşer (sadece kaydın satırı silinir, tek toplu yazma).
     """
     try:
-        conn = get_conn()
         df_tavli = fetch_data("tavli_analiz")
         
         # Kaydı bul
-        mask = (df_tavli['tarih'].astype(str) == str(record['tarih'])) & \
-               (df_tavli['silo_isim'] == record['silo_isim'])
-               
-        if not mask.any():
+        filtre, silinecek = _tavli_kayit_filtresi(df_tavli, record)
+        if filtre is None:
             return False, "Silinecek kayıt bulunamadı."
             
-        # 1. Stoktan Düş (Bu analiz silindiği için, o tavlı miktar da yok sayılmalı veya serbest bırakılmalı)
-        # Not: Tavlı stoktan düşüyoruz çünkü bu analiz o stoğu "tavlı" olarak işaretlemişti.
-        update_tavli_bugday_stok(record['silo_isim'], record['analiz_tonaj'], "cikar")
-        
-        # 2. Kaydı Sil
-        df_new = df_tavli[~mask]
-        conn.update(worksheet="tavli_analiz", data=df_new)
+        # Silinen kayıtlar silo kalite özetinden çıkarılır
+        with silo_quality.expect_change(removed=silinecek), unit_of_work():
+            # 1. Stoktan Düş (Bu analiz silindiği için, o tavlı miktar da yok sayılmalı veya serbest bırakılmalı)
+            # Not: Tavlı stoktan düşüyoruz çünkü bu analiz o stoğu "tavlı" olarak işaretlemişti.
+            if not update_tavli_bugday_stok(record['silo_isim'], record['analiz_tonaj'], "cikar"):
+                raise RuntimeError(f"{record['silo_isim']} tavlı stoğu güncellenemedi!")
+            
+            # 2. Kaydı Sil
+            ok, msg, _ = delete_rows_by_filter("tavli_analiz", filtre)
+            if not ok:
+                raise RuntimeError(msg)
         
         return True, "🗑️ Kayıt silindi ve stok güncellendi."
     except Exception as e:
@@ -105,24 +126,30 @@ def delete_intake_record(lot_no):
     """
     Bir mal kabul kaydını SİLER.
     Profesyonel Yaklaşım: Hem arşivden siler, hem stok hareketini siler, hem de siloyu günceller.
+    Tüm adımlar tek toplu yazmadadır (ya hep ya hiç).
     """
     try:
-        conn = get_conn()
-        
-        # 1. Arşivden Sil
-        df_arsiv = fetch_data("bugday_giris_arsivi")
-        if not df_arsiv.empty and 'lot_no' in df_arsiv.columns:
-            df_arsiv = df_arsiv[df_arsiv['lot_no'] != lot_no]
-            update_data("bugday_giris_arsivi", df_arsiv) # update_data yoksa conn.update kullan
-        
-        # 2. Hareketlerden Sil (Stok Düşmesi İçin)
-        df_hareket = fetch_data("hareketler")
-        if not df_hareket.empty and 'lot_no' in df_hareket.columns:
-            df_hareket = df_hareket[df_hareket['lot_no'] != lot_no]
-            update_data("hareketler", df_hareket)
+        with unit_of_work():
+            # 1. Arşivden Sil (sadece ilgili satır)
+            ok, msg, _ = delete_rows_by_filter("bugday_giris_arsivi", {'lot_no': lot_no})
+            if not ok:
+                raise RuntimeError(f"Arşiv kaydı silinemedi: {msg}")
             
-        # 3. Siloları Yeniden Hesapla (En Kritik Adım)
-        recalculate_silos_from_logs()
+            # 2. Hareketlerden Sil (Stok Düşmesi İçin)
+            silinen_hareketler = []
+            df_hareket = fetch_data("hareketler")
+            if not df_hareket.empty and 'lot_no' in df_hareket.columns:
+                silinen_hareketler = df_hareket[df_hareket['lot_no'] == lot_no].to_dict('records')
+                if silinen_hareketler:
+                    ok, msg, _ = delete_rows_by_filter("hareketler", {'lot_no': lot_no})
+                    if not ok:
+                        raise RuntimeError(f"Stok hareketleri silinemedi: {msg}")
+                
+            # 3. Silinen Hareketlerin Etkisini Silo Kartlarından Geri Al
+            for hareket in silinen_hareketler:
+                if not apply_silo_movement(hareket.get('silo_isim'), hareket.get('hareket_tipi'),
+                                           hareket.get('miktar'), hareket, geri_al=True):
+                    raise RuntimeError(f"{hareket.get('silo_isim')} silo kartı güncellenemedi!")
         
         log_activity("Buğday Yönetimi", "Kayıt Silme", f"Lot No: {lot_no}")
         return True, "Kayıt ve ilgili stok hareketleri başarıyla silindi."
@@ -133,53 +160,57 @@ def update_intake_record(old_lot_no, new_data):
     """
     Bir mal kabul kaydını GÜNCELLER (Full Yetkili).
     Silo ismi, tonaj veya analiz değişirse stok hareketlerini ve ortalamaları da düzeltir.
+    Tüm adımlar tek toplu yazmadadır (ya hep ya hiç).
     """
     try:
-        conn = get_conn()
-        
-        # 1. Arşivi Güncelle (Tüm Detaylar Buraya Yazılır)
-        df_arsiv = fetch_data("bugday_giris_arsivi")
-        if not df_arsiv.empty and 'lot_no' in df_arsiv.columns:
-            idx_list = df_arsiv.index[df_arsiv['lot_no'] == old_lot_no].tolist()
-            if idx_list:
-                idx = idx_list[0]
-                # Yeni verileri işle
-                for key, val in new_data.items():
-                    df_arsiv.at[idx, key] = val
-                
-                update_data("bugday_giris_arsivi", df_arsiv)
-        
-        # 2. Hareket Tablosunu Güncelle (Senkronizasyon)
-        # Burası Stok Hesabı ve Paçal Kalitesi İçin Kritiktir
-        df_hareket = fetch_data("hareketler")
-        if not df_hareket.empty and 'lot_no' in df_hareket.columns:
-            idx_list_h = df_hareket.index[df_hareket['lot_no'] == old_lot_no].tolist()
-            if idx_list_h:
-                idx_h = idx_list_h[0]
-                
-                # Hareket tablosundaki karşılıkları eşle
-                mapping = {
-                    'tonaj': 'miktar',          # Arşivdeki 'tonaj' -> Hareketteki 'miktar'
-                    'fiyat': 'maliyet',         # Arşivdeki 'fiyat' -> Hareketteki 'maliyet'
-                    'silo_isim': 'silo_isim',   # KRİTİK: Silo değişirse burası güncellenir
-                    'protein': 'protein',
-                    'gluten': 'gluten',
-                    'rutubet': 'rutubet',
-                    'hektolitre': 'hektolitre',
-                    'sedim': 'sedim',
-                    'tedarikci': 'tedarikci',
-                    'notlar': 'notlar'
-                }
-                
-                for key_arsiv, key_hareket in mapping.items():
-                    if key_arsiv in new_data:
-                         df_hareket.at[idx_h, key_hareket] = new_data[key_arsiv]
-                
-                update_data("hareketler", df_hareket)
-
-        # 3. Siloları Yeniden Hesapla
-        # Silo ismi veya tonaj değiştiği için tüm deponun yeniden matematiksel olarak kurgulanması gerekir.
-        recalculate_silos_from_logs()
+        with unit_of_work():
+            # 1. Arşivi Güncelle (Tüm Detaylar Buraya Yazılır - sadece değişen hücreler)
+            ok, msg = update_row_by_filter("bugday_giris_arsivi", {'lot_no': old_lot_no}, new_data, add_columns=True)
+            if not ok:
+                raise RuntimeError(f"Arşiv kaydı güncellenemedi: {msg}")
+            
+            # 2. Hareket Tablosunu Güncelle (Senkronizasyon)
+            # Burası Stok Hesabı ve Paçal Kalitesi İçin Kritiktir
+            df_hareket = fetch_data("hareketler")
+            if not df_hareket.empty and 'lot_no' in df_hareket.columns:
+                idx_list_h = df_hareket.index[df_hareket['lot_no'] == old_lot_no].tolist()
+                if idx_list_h:
+                    idx_h = idx_list_h[0]
+                    eski_hareket = df_hareket.loc[idx_h].to_dict()
+                    
+                    # Hareket tablosundaki karşılıkları eşle
+                    mapping = {
+                        'tonaj': 'miktar',          # Arşivdeki 'tonaj' -> Hareketteki 'miktar'
+                        'fiyat': 'maliyet',         # Arşivdeki 'fiyat' -> Hareketteki 'maliyet'
+                        'silo_isim': 'silo_isim',   # KRİTİK: Silo değişirse burası güncellenir
+                        'protein': 'protein',
+                        'gluten': 'gluten',
+                        'rutubet': 'rutubet',
+                        'hektolitre': 'hektolitre',
+                        'sedim': 'sedim',
+                        'tedarikci': 'tedarikci',
+                        'notlar': 'notlar'
+                    }
+                    
+                    degisen = {key_hareket: new_data[key_arsiv] for key_arsiv, key_hareket in mapping.items() if key_arsiv in new_data}
+                    
+                    # Aynı lottaki ilk hareket satırı (id varsa id ile kesinleştir)
+                    filtre = {'lot_no': old_lot_no}
+                    if pd.notnull(eski_hareket.get('id')) and str(eski_hareket.get('id')).strip():
+                        filtre['id'] = eski_hareket['id']
+                    ok, msg = update_row_by_filter("hareketler", filtre, degisen, add_columns=True)
+                    if not ok:
+                        raise RuntimeError(f"Stok hareketi güncellenemedi: {msg}")
+                    
+                    # 3. Silo Kartlarını Düzelt: eski hareketi geri al, yenisini uygula
+                    # (Silo değişmişse eski silo düşer, yeni silo artar - geçmiş taranmaz)
+                    yeni_hareket = {**eski_hareket, **degisen}
+                    if not apply_silo_movement(eski_hareket.get('silo_isim'), eski_hareket.get('hareket_tipi'),
+                                               eski_hareket.get('miktar'), eski_hareket, geri_al=True):
+                        raise RuntimeError(f"{eski_hareket.get('silo_isim')} silo kartı güncellenemedi!")
+                    if not apply_silo_movement(yeni_hareket.get('silo_isim'), yeni_hareket.get('hareket_tipi'),
+                                               yeni_hareket.get('miktar'), yeni_hareket):
+                        raise RuntimeError(f"{yeni_hareket.get('silo_isim')} silo kartı güncellenemedi!")
         
         log_activity("Buğday Yönetimi", "Kayıt Güncelleme", f"Lot No: {old_lot_no}")
         return True, "✅ Kayıt başarıyla güncellendi, stoklar ve ortalamalar eşitlendi."
@@ -213,8 +244,9 @@ def draw_silo(fill_ratio, name):
               fill="#333">{name}</text>
     </svg>'''
     return svg
-@st.cache_data(ttl=300) # 300 saniye (5 dakika) boyunca veriyi hafızada tutar
 def get_silo_data_cached():
+    # fetch_data paylaşımlı cache kullanır ve her yazmada geçersizlenir;
+    # ayrıca st.cache_data ile sarmak artımlı güncellemeleri 5 dk gizlerdi.
     return fetch_data("silolar")
 def get_silo_data():
     """Silo verilerini getir"""
@@ -222,12 +254,7 @@ def get_silo_data():
         df = get_silo_data_cached()
         if df.empty:
             return pd.DataFrame(columns=['isim', 'kapasite', 'mevcut_miktar', 'bugday_cinsi', 'maliyet'])
-        # NaN temizliği
-        cols = ['protein', 'gluten', 'rutubet', 'hektolitre', 'sedim', 'maliyet', 'mevcut_miktar', 'kapasite']
-        for col in cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
+        # Sayısal sütunlar yüklemede şemayla (app/core/schema.py) dönüştürülüp 0 ile doldurulur
         if 'isim' in df.columns:
             df = df.sort_values('isim')
         return df
@@ -239,11 +266,20 @@ def get_silo_data():
 # VERİ İŞLEME FONKSİYONLARI (ORİJİNAL MANTIK - GOOGLE SHEETS ADAPTASYONU)
 # --------------------------------------------------------------------------
 
+_HAREKET_ID_LOCK = threading.Lock()
+_SON_HAREKET_ID = [0]
+
+def _yeni_hareket_id():
+    """Milisaniye tabanlı, artan hareket kimliği (aynı milisaniyedeki hareketler çakışmaz)"""
+    with _HAREKET_ID_LOCK:
+        _SON_HAREKET_ID[0] = max(int(datetime.now().timestamp() * 1000), _SON_HAREKET_ID[0] + 1)
+        return _SON_HAREKET_ID[0]
+
 @error_handler(context="Stok Hareketi Loglama")
 def log_stok_hareketi(silo_isim, hareket_tipi, miktar, **kwargs):
     """Stok hareketini logla (TÜM PARAMETRELER DAHİL)"""
     try:
-        unique_id = int(datetime.now().timestamp() * 1000)
+        unique_id = _yeni_hareket_id()
         
         # Orijinal koddaki tüm opsiyonel alanları kapsayan yapı
         data = {
@@ -265,42 +301,114 @@ def log_stok_hareketi(silo_isim, hareket_tipi, miktar, **kwargs):
             'yore': kwargs.get('yore', ''),
             'notlar': kwargs.get('notlar', '')
         }
-        return add_data("hareketler", data)
+        if not add_data("hareketler", data):
+            return False
+        
+        # Silo kartını sadece bu hareketle güncelle (geçmiş taranmaz)
+        if not apply_silo_movement(silo_isim, hareket_tipi, data['miktar'], data):
+            # Kart güncellenemedi: hareket kaydı geri alınır, kart hareketlerden kopmasın
+            # (unit of work içinde çağıran işi iptal eder, hiçbir şey yazılmaz)
+            if current_unit_of_work() is None:
+                delete_rows_by_filter("hareketler", {'id': unique_id})
+            return False
+        return True
     except Exception as e:
         st.error(f"❌ Hareket kaydı hatası: {str(e)}")
         return False
 
+_SILO_KILITLERI = {}
+_SILO_KILITLERI_LOCK = threading.Lock()
+_SILO_YAZMA_DENEME = 3
+
+def _silo_kilidi(silo_isim):
+    """Aynı silonun kartını güncelleyen oturumlar sırayla çalışır (süreç içi)"""
+    with _SILO_KILITLERI_LOCK:
+        return _SILO_KILITLERI.setdefault(str(silo_isim), threading.Lock())
+
+def apply_silo_movement(silo_isim, hareket_tipi, miktar, params=None, geri_al=False):
+    """
+    Tek bir hareketi silo kartına artımlı olarak işler.
+    Maliyeti hareket geçmişinin boyutundan bağımsızdır (sadece silolar satırı okunur/yazılır).
+    
+    Oku-hesapla-yaz adımı silo başına kilitlidir; başka süreçlerin yazmalarına karşı
+    kart_surumu ile karşılaştırmalı yazılır (sürüm değiştiyse kart yeniden okunup
+    tekrar denenir). Denemeler tükenirse tam mutabakat çalıştırılır.
+    
+    Silolar tablosunda kümülatif alanlar (toplam_giris/toplam_cikis) henüz yoksa
+    bir kereye mahsus tam mutabakat çalıştırılır ve alanlar oluşturulur.
+    """
+    try:
+        with _silo_kilidi(silo_isim):
+            for _ in range(_SILO_YAZMA_DENEME):
+                df = fetch_data("silolar", force_refresh=True)
+                if df.empty or 'isim' not in df.columns:
+                    return False
+                
+                mask = df['isim'] == silo_isim
+                if not mask.any():
+                    return False
+                
+                if any(col not in df.columns for col in SILO_KUMULATIF_KOLONLAR):
+                    return recalculate_silos_from_logs()
+                
+                silo = df.loc[mask].iloc[0].to_dict()
+                degisen = apply_movement(silo, hareket_tipi, miktar, params, geri_al=geri_al)
+                if not degisen:
+                    return True
+                
+                # Karşılaştırmalı yazma: kart okunduğundan beri değişmediyse yazılır
+                # (unit of work içinde yazma iş sonunda toplu yapılır, sürüm filtresi uygulanmaz)
+                filtre = {'isim': silo_isim}
+                surum = pd.to_numeric(silo.get(SILO_SURUM_KOLONU), errors='coerce')
+                if pd.notnull(surum) and current_unit_of_work() is None:
+                    filtre[SILO_SURUM_KOLONU] = int(surum)
+                degisen[SILO_SURUM_KOLONU] = (0 if pd.isnull(surum) else int(surum)) + 1
+                
+                ok, msg = update_row_by_filter("silolar", filtre, degisen, add_columns=True)
+                if ok:
+                    return True
+            
+            # Kart sürekli değişti veya yazılamadı: kart hareket geçmişinden yeniden kurulur
+            log_warning(f"{silo_isim}: silo kartı artımlı güncellenemedi ({msg}), mutabakat çalıştırılıyor",
+                        context="Silo Güncelleme")
+            return recalculate_silos_from_logs()
+    except Exception as e:
+        st.error(f"❌ Silo güncelleme hatası: {str(e)}")
+        return False
+
 def update_tavli_bugday_stok(silo_isim, eklenen_tonaj, islem_tipi="ekle"):
-    """Tavlı buğday stokunu güncelle"""
+    """Tavlı buğday stokunu güncelle (sadece silonun tavlı stok hücresi yazılır)"""
     try:
-        conn = get_conn()
         df = fetch_data("silolar")
         if df.empty: return False
 
         mask = df['isim'] == silo_isim
         if not mask.any(): return False
-            
-        current = float(df.loc[mask, 'tavli_bugday_stok'].iloc[0]) if pd.notnull(df.loc[mask, 'tavli_bugday_stok'].iloc[0]) else 0.0
+        
+        current = df.loc[mask, 'tavli_bugday_stok'].iloc[0] if 'tavli_bugday_stok' in df.columns else 0.0
+        current = float(current) if pd.notnull(current) else 0.0
         
         if islem_tipi == "ekle":
             yeni_tavli = current + float(eklenen_tonaj)
         elif islem_tipi == "cikar":
             yeni_tavli = max(0, current - float(eklenen_tonaj))
         else: return False
-            
-        df.loc[mask, 'tavli_bugday_stok'] = yeni_tavli
-        conn.update(worksheet="silolar", data=df)
-        return True
+        
+        ok, msg = update_row_by_filter("silolar", {'isim': silo_isim}, {'tavli_bugday_stok': yeni_tavli}, add_columns=True)
+        if not ok:
+            st.error(f"Tavlı stok güncelleme hatası: {msg}")
+        return ok
     except Exception as e:
         st.error(f"Tavlı stok güncelleme hatası: {str(e)}")
         return False
 
 def recalculate_silos_from_logs():
-    st.cache_data.clear()
     """
     Geçmiş hareketleri tarayıp siloları senkronize eder (SQL Mantığı -> Pandas Mantığı)
     
-    ÖNEMLİ: Bu fonksiyon her mal kabul/çıkıştan sonra otomatik çağrılır!
+    ÖNEMLİ: Günlük akışta silolar apply_silo_movement ile artımlı güncellenir.
+    Bu fonksiyon yalnızca açık MUTABAKAT işidir (Admin > Geliştirici Araçları)
+    ve kümülatif alanlar ilk kez oluşturulurken çalışır.
     """
     try:
         # ===== VERİLERİ ÇEK (FORCE REFRESH) =====
@@ -317,84 +425,8 @@ def recalculate_silos_from_logs():
             st.warning("⚠️ Silolar tablosu boş!")
             return False
         
-        # Hareket yoksa siloları sıfırla ve çık
-        if df_hareketler.empty:
-            st.info("ℹ️ Henüz hareket kaydı yok, silolar sıfırlanıyor.")
-            df_silolar['mevcut_miktar'] = 0.0
-            df_silolar['protein'] = 0.0
-            df_silolar['maliyet'] = 0.0
-            return update_data("silolar", df_silolar)
-        
-        # ===== NUMERIC KOLONLARI DÜZELT =====
-        numeric_cols = ['miktar', 'protein', 'maliyet', 'gluten', 'rutubet', 'hektolitre', 'sedim']
-        for col in numeric_cols:
-            if col in df_hareketler.columns:
-                df_hareketler[col] = pd.to_numeric(df_hareketler[col], errors='coerce').fillna(0)
-        
-        # ===== HER SİLO İÇİN HESAPLA =====
-        for index, row in df_silolar.iterrows():
-            silo_isim = row['isim']
-            
-            # Bu silonun hareketlerini filtrele
-            silo_moves = df_hareketler[df_hareketler['silo_isim'] == silo_isim].copy()
-            
-            if silo_moves.empty:
-                # Hareket yoksa stoğu sıfırla
-                df_silolar.at[index, 'mevcut_miktar'] = 0.0
-                df_silolar.at[index, 'protein'] = 0.0
-                df_silolar.at[index, 'maliyet'] = 0.0
-                continue
-            
-            # ===== GİRİŞ VE ÇIKIŞ AYIR =====
-            girisler = silo_moves[silo_moves['hareket_tipi'] == 'Giriş'].copy()
-            cikislar = silo_moves[silo_moves['hareket_tipi'] == 'Çıkış'].copy()
-            
-            # ===== TOPLAM HESAPLA =====
-            toplam_giris = girisler['miktar'].sum() if not girisler.empty else 0.0
-            toplam_cikis = cikislar['miktar'].sum() if not cikislar.empty else 0.0
-            
-            mevcut_miktar = max(0, toplam_giris - toplam_cikis)
-            
-            # ===== AĞIRLIKLI ORTALAMA (Sadece Girişlerden) =====
-            if not girisler.empty and toplam_giris > 0:
-                try:
-                    # Protein ortalaması
-                    avg_protein = (girisler['miktar'] * girisler['protein']).sum() / toplam_giris
-                    
-                    # Maliyet ortalaması
-                    avg_maliyet = (girisler['miktar'] * girisler['maliyet']).sum() / toplam_giris
-                    
-                    # Diğer parametreler (opsiyonel)
-                    avg_gluten = (girisler['miktar'] * girisler['gluten']).sum() / toplam_giris if 'gluten' in girisler.columns else 0
-                    avg_rutubet = (girisler['miktar'] * girisler['rutubet']).sum() / toplam_giris if 'rutubet' in girisler.columns else 0
-                    avg_hektolitre = (girisler['miktar'] * girisler['hektolitre']).sum() / toplam_giris if 'hektolitre' in girisler.columns else 0
-                    avg_sedim = (girisler['miktar'] * girisler['sedim']).sum() / toplam_giris if 'sedim' in girisler.columns else 0
-                    
-                    # Silo tablosunu güncelle
-                    df_silolar.at[index, 'protein'] = avg_protein
-                    df_silolar.at[index, 'maliyet'] = avg_maliyet
-                    
-                    # Eğer sütunlar varsa diğerlerini de güncelle
-                    if 'gluten' in df_silolar.columns:
-                        df_silolar.at[index, 'gluten'] = avg_gluten
-                    if 'rutubet' in df_silolar.columns:
-                        df_silolar.at[index, 'rutubet'] = avg_rutubet
-                    if 'hektolitre' in df_silolar.columns:
-                        df_silolar.at[index, 'hektolitre'] = avg_hektolitre
-                    if 'sedim' in df_silolar.columns:
-                        df_silolar.at[index, 'sedim'] = avg_sedim
-                    
-                except Exception as calc_err:
-                    st.warning(f"⚠️ {silo_isim} için ortalama hesaplanamadı: {calc_err}")
-                    # Hesaplama hatası olsa bile miktar güncellensin
-                    pass
-            else:
-                # Giriş yoksa varsayılan değerler
-                df_silolar.at[index, 'protein'] = 0.0
-                df_silolar.at[index, 'maliyet'] = 0.0
-            
-            # ===== MEVCUT MİKTARI GÜNCELLE =====
-            df_silolar.at[index, 'mevcut_miktar'] = mevcut_miktar
+        # ===== TEK GEÇİŞTE MUTABAKAT (groupby - silo başına filtre yok) =====
+        df_silolar = reconcile_silos(df_silolar, df_hareketler)
         
         # ===== GOOGLE SHEETS'E KAYDET (YENİ METODUMUZLA) =====
         if update_data("silolar", df_silolar):
@@ -444,7 +476,6 @@ def get_movements():
         # Arşiv yoksa hareketleri olduğu gibi döndür
         if df_a.empty:
             if 'tarih' in df_h.columns:
-                df_h['tarih'] = pd.to_datetime(df_h['tarih'], errors='coerce')
                 df_h = df_h.sort_values('tarih', ascending=False)
             return df_h
         
@@ -492,7 +523,6 @@ def get_movements():
         
         # ===== TARİH SIRALAMASI =====
         if 'tarih' in merged.columns:
-            merged['tarih'] = pd.to_datetime(merged['tarih'], errors='coerce')
             merged = merged.sort_values('tarih', ascending=False)
         
         return merged
@@ -509,7 +539,6 @@ def get_movements():
                 merged[col] = merged[col].fillna(merged[f'{col}_arsiv'])
         
         if 'tarih' in merged.columns:
-            merged['tarih'] = pd.to_datetime(merged['tarih'])
             merged = merged.sort_values('tarih', ascending=False)
             
         return merged
@@ -521,7 +550,6 @@ def get_bugday_arsiv():
     """Arşiv verisi"""
     df = fetch_data("bugday_giris_arsivi")
     if not df.empty and 'tarih' in df.columns:
-        df['tarih'] = pd.to_datetime(df['tarih'])
         df = df.sort_values('tarih', ascending=False)
     return df
 
@@ -544,65 +572,53 @@ def get_tavli_analizler(silo_isim=None):
     if df.empty: return pd.DataFrame()
     if silo_isim: df = df[df['silo_isim'] == silo_isim]
     if 'tarih' in df.columns:
-        df['tarih'] = pd.to_datetime(df['tarih'])
         df = df.sort_values('tarih', ascending=False)
     return df
-def get_kuru_bugday_agirlikli_ortalama(silo_isim):
+def get_kuru_bugday_ortalamalari():
     """
-    Bir silodaki KURU BUĞDAY analizlerinin ağırlıklı ortalamasını hesaplar.
-    Mal kabul girişlerinden (hareketler tablosu) veriler alınır.
+    TÜM silolar için KURU BUĞDAY analizlerinin ağırlıklı ortalamasını hesaplar.
+    Mal kabul girişleri (hareketler tablosu) tek geçişte silo bazında gruplanır.
     
     Returns:
-        dict: Ağırlıklı ortalama analiz değerleri
+        dict: {silo_isim: {parametre: ağırlıklı ortalama}}
     """
     try:
-        # Hareketler tablosundan bu silonun GİRİŞ kayıtlarını al
         df_hareketler = fetch_data("hareketler")
-        if df_hareketler.empty:
-            return {}
-        
-        # Sadece bu silonun girişleri
-        df_silo = df_hareketler[
-            (df_hareketler['silo_isim'] == silo_isim) & 
-            (df_hareketler['hareket_tipi'] == 'Giriş')
-        ].copy()
-        
-        if df_silo.empty:
+        if df_hareketler.empty or 'miktar' not in df_hareketler.columns:
             return {}
         
-        # Tonaj sütunu kontrolü
-        if 'miktar' not in df_silo.columns:
+        # Sadece girişler (arşivlenmiş girişler devir satırında)
+        df_giris = df_hareketler[df_hareketler['hareket_tipi'].isin(GIRIS_TIPLERI)]
+        if df_giris.empty:
             return {}
         
-        # Numeric dönüşüm
-        numeric_cols = ['miktar', 'hektolitre', 'protein', 'rutubet', 'gluten', 
-                       'gluten_index', 'sedim', 'gecikmeli_sedim']
-        
-        for col in numeric_cols:
-            if col in df_silo.columns:
-                df_silo[col] = pd.to_numeric(df_silo[col], errors='coerce').fillna(0)
+        analiz_cols = [c for c in KURU_PARAMETRELERI if c in df_giris.columns]
+        miktar = df_giris['miktar'].fillna(0)
         
-        toplam_tonaj = df_silo['miktar'].sum()
-        
-        if toplam_tonaj == 0:
-            return {}
+        # Silo başına toplam tonaj ve tonaj x değer toplamları
+        agirlikli = pd.DataFrame({col: miktar * df_giris[col].fillna(0) for col in analiz_cols},
+                                 index=df_giris.index)
+        agirlikli['_tonaj'] = miktar
+        toplamlar = agirlikli.groupby(df_giris['silo_isim'], sort=False).sum()
+        toplamlar = toplamlar[toplamlar['_tonaj'] != 0]
         
-        # Ağırlıklı ortalama hesapla
-        ortalama = {}
-        analiz_cols = ['hektolitre', 'protein', 'rutubet', 'gluten', 
-                      'gluten_index', 'sedim', 'gecikmeli_sedim']
-        
-        for col in analiz_cols:
-            if col in df_silo.columns:
-                # (miktar * değer).sum() / toplam_miktar
-                agirlikli_toplam = (df_silo['miktar'] * df_silo[col]).sum()
-                ortalama[col] = agirlikli_toplam / toplam_tonaj if toplam_tonaj > 0 else 0
-        
-        return ortalama
+        ortalamalar = toplamlar[analiz_cols].div(toplamlar['_tonaj'], axis=0)
+        return {silo: {col: float(val) for col, val in satir.items()}
+                for silo, satir in zip(ortalamalar.index, ortalamalar.to_dict('records'))}
         
     except Exception as e:
         st.error(f"Kuru buğday ortalama hesaplama hatası: {e}")
         return {}
+
+def get_kuru_bugday_agirlikli_ortalama(silo_isim):
+    """
+    Bir silodaki KURU BUĞDAY analizlerinin ağırlıklı ortalamasını hesaplar.
+    Mal kabul girişlerinden (hareketler tablosu) veriler alınır.
+    
+    Returns:
+        dict: Ağırlıklı ortalama analiz değerleri
+    """
+    return get_kuru_bugday_ortalamalari().get(silo_isim, {})
 # --- SPEC YÖNETİMİ ---
 
 def save_bugday_spec(bugday_cinsi, parametre, min_val, max_val, hedef_val):
@@ -746,37 +762,37 @@ def show_mal_kabul():
     
     if st.button(f"💾 {t('btn_submit')}", type="primary", use_container_width=True):
         with st.spinner("Veritabanına kaydediliyor, lütfen bekleyiniz..."):
+            try:
+                # Hareket, silo kartı ve arşiv tek toplu yazmada: ya hep ya hiç
+                with unit_of_work():
+                    # 1. Stok Hareketi Logla
+                    if not log_stok_hareketi(
+                        secilen_silo, "Giriş", miktar,
+                        protein=g_prot, gluten=g_glut, rutubet=g_rut, hektolitre=g_hl,
+                        sedim=g_sedim, maliyet=fiyat, lot_no=lot_no,
+                        tedarikci=tedarikci, yore=yore, notlar=notlar 
+                    ):
+                        raise RuntimeError("Stok kaydında hata oluştu.")
+                    
+                    # 2. Arşive Ekle
+                    if not add_to_bugday_giris_arsivi(
+                        lot_no, tarih=str(tarih), bugday_cinsi=bugday_cinsi,
+                        tedarikci=tedarikci, yore=yore, plaka=plaka,
+                        tonaj=miktar, fiyat=fiyat, silo_isim=secilen_silo,
+                        hektolitre=g_hl, protein=g_prot, rutubet=g_rut,
+                        gluten=g_glut, gluten_index=g_index, sedim=g_sedim,
+                        gecikmeli_sedim=g_g_sedim, sune=sune, kirik_ciliz=kirik_ciliz,
+                        yabanci_tane=yabanci_tane, notlar=notlar
+                    ):
+                        raise RuntimeError("Arşiv kaydında hata oluştu.")
+            except Exception as e:
+                st.error(f"❌ Kayıt yapılamadı, hiçbir değişiklik yazılmadı: {e}")
+                return
             
-            # 1. Stok Hareketi Logla
-            ok_log = log_stok_hareketi(
-                secilen_silo, "Giriş", miktar,
-                protein=g_prot, gluten=g_glut, rutubet=g_rut, hektolitre=g_hl,
-                sedim=g_sedim, maliyet=fiyat, lot_no=lot_no,
-                tedarikci=tedarikci, yore=yore, notlar=notlar 
-            )
-            
-            if ok_log:
-                # 2. Arşive Ekle
-                ok_arc = add_to_bugday_giris_arsivi(
-                    lot_no, tarih=str(tarih), bugday_cinsi=bugday_cinsi,
-                    tedarikci=tedarikci, yore=yore, plaka=plaka,
-                    tonaj=miktar, fiyat=fiyat, silo_isim=secilen_silo,
-                    hektolitre=g_hl, protein=g_prot, rutubet=g_rut,
-                    gluten=g_glut, gluten_index=g_index, sedim=g_sedim,
-                    gecikmeli_sedim=g_g_sedim, sune=sune, kirik_ciliz=kirik_ciliz,
-                    yabanci_tane=yabanci_tane, notlar=notlar
-                )
-                
-                if ok_arc:
-                    log_activity("Buğday Yönetimi", "Ham Madde Girişi", f"Lot: {lot_no} | Silo: {secilen_silo} | Tonaj: {miktar} Ton")
-                    st.success(f"✅ Kayıt Başarılı! Lot: {lot_no}")
-                    recalculate_silos_from_logs()
-                    time.sleep(1)
-                    st.rerun()
-                else:
-                    st.error("Arşiv kaydında hata oluştu.")
-            else:
-                st.error("Stok kaydında hata oluştu.")
+            log_activity("Buğday Yönetimi", "Ham Madde Girişi", f"Lot: {lot_no} | Silo: {secilen_silo} | Tonaj: {miktar} Ton")
+            st.success(f"✅ Kayıt Başarılı! Lot: {lot_no}")
+            time.sleep(1)
+            st.rerun()
 
 def show_stok_cikis():
     """Stok Çıkışı Ekranı - AKILLI TRANSFER VE KALİTE TAŞIMA ÖZELLİKLİ"""
@@ -842,15 +858,17 @@ def show_stok_cikis():
         
         # 👇 SPINNER BURAYA EKLENDİ 👇
         with st.spinner("Stok düşülüyor ve hesaplamalar yapılıyor..."):
-            
-            # A) Kaynak Silodan Çıkış
-            # DİKKAT: Buradan aşağısı bir TAB içeriye girdi (Indent)
-            if log_stok_hareketi(silo, "Çıkış", miktar, notlar=neden):
-                update_tavli_bugday_stok(silo, miktar, "cikar")
-                
-                # B) TRANSFER İSE: AKILLI KALİTE KOPYALAMA
-                if neden == "Silo Transferi" and hedef:
-                    try:
+            try:
+                # Tüm adımlar tek toplu yazmada: tablo başına en fazla bir yazma, ya hep ya hiç
+                with unit_of_work():
+                    # A) Kaynak Silodan Çıkış
+                    if not log_stok_hareketi(silo, "Çıkış", miktar, notlar=neden):
+                        raise RuntimeError("Çıkış kaydı oluşturulamadı!")
+                    if not update_tavli_bugday_stok(silo, miktar, "cikar"):
+                        raise RuntimeError("Kaynak silonun tavlı stoğu güncellenemedi!")
+                    
+                    # B) TRANSFER İSE: AKILLI KALİTE KOPYALAMA
+                    if neden == "Silo Transferi" and hedef:
                         # 1. Kaynak Silonun Kalite DNA'sını Çıkar
                         from app.modules.mixing import get_tavli_analiz_agirlikli_ortalama
                         
@@ -872,7 +890,7 @@ def show_stok_cikis():
                         if 'analiz_sayisi' in kaynak_analiz: del kaynak_analiz['analiz_sayisi']
                         
                         # 2. Hedef Siloya "Giriş" Hareketi Yaz
-                        log_stok_hareketi(
+                        if not log_stok_hareketi(
                             hedef, 
                             "Giriş", 
                             miktar, 
@@ -883,32 +901,33 @@ def show_stok_cikis():
                             sedim=kaynak_analiz.get('sedim', 0),
                             maliyet=kaynak_analiz.get('maliyet', 0),
                             notlar=f"Transfer: {silo} -> {hedef}"
-                        )
+                        ):
+                            raise RuntimeError("Hedef silo giriş kaydı oluşturulamadı!")
                         
                         # 3. Hedef Siloya "Tavlı Analiz" Kaydı Yaz
-                        save_tavli_analiz(
+                        ok, msg = save_tavli_analiz(
                             hedef, 
                             miktar, 
                             **kaynak_analiz, 
                             notlar=f"Transfer Kaynak: {silo}"
                         )
+                        if not ok:
+                            raise RuntimeError(f"Transfer analiz taşıma hatası: {msg}")
                         
                         # 4. Hedef Silonun Tavlı Stoğunu Artır
-                        update_tavli_bugday_stok(hedef, miktar, "ekle")
-                        
-                        st.success(f"✅ {silo} -> {hedef} transferi ve kalite kopyalaması başarılı.")
-                        
-                    except Exception as e:
-                        st.error(f"Transfer analiz taşıma hatası: {e}")
-                
-                # C) Tüm Siloları Yeniden Hesapla
-                recalculate_silos_from_logs()
+                        if not update_tavli_bugday_stok(hedef, miktar, "ekle"):
+                            raise RuntimeError("Hedef silonun tavlı stoğu güncellenemedi!")
                 
-                st.success("✅ İşlem Tamamlandı!")
-                time.sleep(1)
-                st.rerun()
-            else:
-                st.error("❌ Çıkış kaydı oluşturulamadı!")
+                # C) Silo kartları log_stok_hareketi içinde artımlı güncellendi (aynı toplu yazmada)
+            except Exception as e:
+                st.error(f"❌ İşlem kaydedilemedi, hiçbir değişiklik yazılmadı: {e}")
+                return
+            
+            if neden == "Silo Transferi" and hedef:
+                st.success(f"✅ {silo} -> {hedef} transferi ve kalite kopyalaması başarılı.")
+            st.success("✅ İşlem Tamamlandı!")
+            time.sleep(1)
+            st.rerun()
 def show_tavli_analiz():
     """Tavlı Buğday Analizi - TAM VE EKSİKSİZ Parametreler"""
     st.header("🧪 Tavlı Buğday Analiz Kaydı")
@@ -1068,7 +1087,6 @@ def show_stok_hareketleri():
 
     # Tarih formatı düzenleme
     if 'tarih' in df.columns:
-        df['tarih'] = pd.to_datetime(df['tarih'], errors='coerce')
         df = df.sort_values('tarih', ascending=False)
 
     # --- FİLTRELER ---
@@ -1089,8 +1107,10 @@ def show_stok_hareketleri():
         bugun = datetime.now().date()
         baslangic = st.date_input("Başlangıç", bugun - pd.Timedelta(days=30), key="filtre_tarih_bas")
     
-    # Filtreleri Uygula
-    filtered_df = df.copy()
+    # Filtreleri Uygula (başlangıç arşivlenmiş bir aya düşüyorsa o dönemin bölümleri de okunur)
+    filtered_df = fetch_with_archive("hareketler", baslangic)
+    if 'tarih' in filtered_df.columns:
+        filtered_df = filtered_df.sort_values('tarih', ascending=False)
     
     if secilen_silo != "Tümü":
         filtered_df = filtered_df[filtered_df['silo_isim'] == secilen_silo]
@@ -1322,9 +1342,8 @@ def show_bugday_giris_arsivi():
     # Filtre Uygula
     df_filtered = df.copy()
     if arama:
-        df_filtered = df_filtered[
-            df_filtered.astype(str).apply(lambda x: x.str.contains(arama, case=False)).any(axis=1)
-        ]
+        # Kelime indeksiyle önek araması (tüm tabloyu metne çevirip taramaz)
+        df_filtered = df_filtered[search_index.search("bugday_giris_arsivi", df_filtered, arama)]
     if silo_filter != "Tümü":
         df_filtered = df_filtered[df_filtered['silo_isim'] == silo_filter]
 
@@ -1345,7 +1364,7 @@ def show_bugday_giris_arsivi():
     numeric_cols = ['hektolitre', 'protein', 'rutubet', 'gluten', 'gluten_index', 'sedim', 'gecikmeli_sedim', 'sune', 'kirik_ciliz', 'yabanci_tane', 'tonaj', 'fiyat']
     for col in numeric_cols:
         if col in df_filtered.columns:
-            df_filtered[col] = pd.to_numeric(df_filtered[col], errors='coerce').round(1)
+            df_filtered[col] = df_filtered[col].round(1)
 
     # 4. Sütun Adlandırma (Mapping) - Senin istediğin başlıklar
     col_map = {
@@ -1399,15 +1418,16 @@ def show_bugday_giris_arsivi():
     )
     
     # --- YENİ EXCEL BUTONU ---
-    excel_data = export_bugday_giris_ozel_excel(df_filtered) # Orijinal filtrelenmiş veriyi gönderiyoruz
-    if excel_data:
-        st.download_button(
-            label="📥Excel Raporu İndir",
-            data=excel_data,
-            file_name=f"Bugday_Giris_Raporu_{datetime.now().strftime('%Y%m%d')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            type="primary"
-        )
+    # Excel her yeniden çizimde değil, istenince arka planda üretilir (filtrelenmiş veri gönderilir)
+    render_report_job(
+        "bugday_giris_excel",
+        "app.modules.wheat:export_bugday_giris_ozel_excel",
+        lambda: (df_filtered,),
+        file_name=f"Bugday_Giris_Raporu_{datetime.now().strftime('%Y%m%d')}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        label="Buğday giriş raporu",
+        button_label="📥 Excel Raporu Hazırla"
+    )
     
     st.divider()
 
@@ -1916,8 +1936,7 @@ def show_tavli_analiz_arsivi():
     
     for col in numeric_cols:
         if col in df_show.columns:
-            # Önce sayıya çevir (hata varsa NaN yap), sonra yuvarla
-            df_show[col] = pd.to_numeric(df_show[col], errors='coerce').round(1)
+            df_show[col] = df_show[col].round(1)
 
     # 2. Tablo Gösterimi İçin Kopya Al ve Başlıkları Türkçeleştir/Düzelt
     df_display = df_show.copy()
@@ -1972,15 +1991,15 @@ def show_tavli_analiz_arsivi():
     )
     
     # --- ÖZEL EXCEL BUTONU ---
-    excel_data = export_tavli_ozel_excel(df_show)
-    if excel_data:
-        st.download_button(
-            label="📥Excel Raporu İndir",
-            data=excel_data,
-            file_name=f"Tavli_Analiz_Raporu_{datetime.now().strftime('%Y%m%d')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            type="primary"
-        )
+    render_report_job(
+        "tavli_analiz_excel",
+        "app.modules.wheat:export_tavli_ozel_excel",
+        lambda: (df_show,),
+        file_name=f"Tavli_Analiz_Raporu_{datetime.now().strftime('%Y%m%d')}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        label="Tavlı analiz raporu",
+        button_label="📥 Excel Raporu Hazırla"
+    )
 
     st.divider()
 
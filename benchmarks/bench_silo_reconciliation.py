@@ -0,0 +1,108 @@
+"""
+SİLO MUTABAKAT BENCHMARK'I
+reconcile_silos (tek groupby) performansını ve eski silo-başına döngüyle
+sonuç eşliğini ölçer.
+
+Kullanım:
+    python benchmarks/bench_silo_reconciliation.py
+    python benchmarks/bench_silo_reconciliation.py --hareket 500000 --silo 40
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.silo_engine import reconcile_silos, SILO_KALITE_PARAMETRELERI  # noqa: E402
+
+HEDEF_SURE = 1.0  # saniye (500k hareket için)
+
+
+def sentetik_veri(hareket_sayisi, silo_sayisi, seed=42):
+    """Gerçekçi dağılımlı silolar + hareketler tablosu üretir"""
+    rng = np.random.default_rng(seed)
+    isimler = [f"SILO-{i:02d}" for i in range(1, silo_sayisi + 1)]
+
+    df_silolar = pd.DataFrame({
+        'isim': isimler,
+        'kapasite': 1000.0,
+        'mevcut_miktar': 0.0,
+        **{param: 0.0 for param in SILO_KALITE_PARAMETRELERI},
+    })
+
+    df_hareketler = pd.DataFrame({
+        'silo_isim': rng.choice(isimler, hareket_sayisi),
+        'hareket_tipi': rng.choice(['Giriş', 'Çıkış'], hareket_sayisi, p=[0.6, 0.4]),
+        'miktar': rng.uniform(1, 40, hareket_sayisi).round(1),
+        'protein': rng.normal(12.5, 1.0, hareket_sayisi).round(2),
+        'gluten': rng.normal(28, 2, hareket_sayisi).round(2),
+        'rutubet': rng.normal(12, 0.8, hareket_sayisi).round(2),
+        'hektolitre': rng.normal(78, 2, hareket_sayisi).round(2),
+        'sedim': rng.normal(35, 5, hareket_sayisi).round(1),
+        'maliyet': rng.uniform(9, 13, hareket_sayisi).round(2),
+    })
+    return df_silolar, df_hareketler
+
+
+def eski_dongu(df_silolar, df_hareketler):
+    """Referans: silo başına filtreleyen eski O(silo × hareket) yöntem"""
+    df = df_silolar.copy()
+    for index, row in df.iterrows():
+        moves = df_hareketler[df_hareketler['silo_isim'] == row['isim']]
+        girisler = moves[moves['hareket_tipi'] == 'Giriş']
+        cikislar = moves[moves['hareket_tipi'] == 'Çıkış']
+        toplam_giris = girisler['miktar'].sum()
+        df.at[index, 'mevcut_miktar'] = max(0, toplam_giris - cikislar['miktar'].sum())
+        for param in SILO_KALITE_PARAMETRELERI:
+            df.at[index, param] = (girisler['miktar'] * girisler[param]).sum() / toplam_giris if toplam_giris > 0 else 0.0
+    return df
+
+
+def olc(fonksiyon, *args, tekrar=3):
+    """En iyi süre (saniye) ve son sonucu döndürür"""
+    en_iyi, sonuc = float('inf'), None
+    for _ in range(tekrar):
+        baslangic = time.perf_counter()
+        sonuc = fonksiyon(*args)
+        en_iyi = min(en_iyi, time.perf_counter() - baslangic)
+    return en_iyi, sonuc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Silo mutabakat benchmark'ı")
+    parser.add_argument('--hareket', type=int, default=500_000)
+    parser.add_argument('--silo', type=int, default=40)
+    args = parser.parse_args()
+
+    # 1. Doğruluk: küçük veride eski döngüyle karşılaştır
+    df_s, df_h = sentetik_veri(20_000, args.silo)
+    yeni = reconcile_silos(df_s, df_h)
+    eski = eski_dongu(df_s, df_h)
+    kolonlar = ['mevcut_miktar'] + SILO_KALITE_PARAMETRELERI
+    fark = np.abs(yeni[kolonlar].to_numpy(float) - eski[kolonlar].to_numpy(float)).max()
+    print(f"Doğruluk (20k hareket): maksimum fark = {fark:.2e}")
+
+    # 2. Ölçek: artan hareket sayıları
+    for n in sorted({10_000, 100_000, args.hareket}):
+        df_s, df_h = sentetik_veri(n, args.silo)
+        sure, _ = olc(reconcile_silos, df_s, df_h)
+        print(f"reconcile_silos  {n:>9,} hareket / {args.silo} silo: {sure * 1000:8.1f} ms")
+
+    df_s, df_h = sentetik_veri(100_000, args.silo)
+    sure, _ = olc(eski_dongu, df_s, df_h, tekrar=1)
+    print(f"eski döngü       {100_000:>9,} hareket / {args.silo} silo: {sure * 1000:8.1f} ms")
+
+    df_s, df_h = sentetik_veri(args.hareket, args.silo)
+    sure, _ = olc(reconcile_silos, df_s, df_h)
+    durum = "OK" if sure < HEDEF_SURE and fark < 1e-6 else "BAŞARISIZ"
+    print(f"\nHedef: {args.hareket:,} hareket < {HEDEF_SURE:.0f} sn -> {sure:.3f} sn [{durum}]")
+    return 0 if durum == "OK" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
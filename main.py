@@ -14,10 +14,11 @@ st.set_page_config(
 from app.core.utils import init_session_state
 from app.core.styles import load_css
 from app.core.database import init_db, log_activity
+from app.core.archive import maybe_run_archives
 from app.core.auth import check_password, do_logout, ROLES, show_profile_settings
 from app.core.config import SESSION_TIMEOUT_SECONDS
 from app.core.license_manager import check_license, show_license_lock_screen, LICENSE_CONFIG
-from app.modules.traceability import show_traceability_dashboard
+from app.modules.traceability import show_traceability_dashboard, show_recall_analysis
 
 # Modül İmportları
 import app.modules.dashboard as dashboard
@@ -50,6 +51,9 @@ if 'db_initialized' not in st.session_state:
     init_db()
     st.session_state.db_initialized = True
 
+# Eski dönemlerin arşivlenmesi (süreç başına aralıklı, arka planda)
+maybe_run_archives()
+
 # --- SESSION TIMEOUT CONTROL ---
 if st.session_state.get('logged_in', False):
     current_time = time.time()
@@ -409,7 +413,9 @@ elif selected_page == "FINANCE_DASHBOARD":
 # 🔍 İZLENEBİLİRLİK (KARA KUTU)
 elif selected_page == "TRACEABILITY":
     try:
-        show_traceability_dashboard()
+        tab1, tab2 = st.tabs(["🕵️‍♂️ Kara Kutu", "🚨 Geri Çağırma (Recall)"])
+        with tab1: show_traceability_dashboard()
+        with tab2: show_recall_analysis()
     except Exception as e:
         st.error("🚨 İzlenebilirlik Modülü yüklenirken hata oluştu.")
         st.caption(f"Teknik Hata: {str(e)}")
@@ -0,0 +1,40 @@
+"""
+Ortak test fikstürleri.
+Testler geçici bir SQLite dosyasıyla çalışır; Google Sheets bağlantısı gerekmez.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import database, schema  # noqa: E402
+from app.core.search_index import search_index  # noqa: E402
+from app.core.snapshot_store import snapshot_store  # noqa: E402
+from app.core.storage import SQLiteBackend  # noqa: E402
+from app.core.table_cache import table_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def temiz_durum(monkeypatch, tmp_path):
+    """Paylaşımlı cache / indeksler testler arasında taşınmasın; snapshot diske yazılmasın"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(snapshot_store, "enabled", False)
+    table_cache.invalidate()
+    search_index._indexes.clear()
+    schema._HAM_TARIHLER.clear()
+    yield
+    table_cache.invalidate()
+    search_index._indexes.clear()
+    schema._HAM_TARIHLER.clear()
+
+
+@pytest.fixture
+def sqlite_backend(monkeypatch, tmp_path):
+    """Geçici SQLite motoru; database.get_conn() bu motoru döndürür"""
+    backend = SQLiteBackend(str(tmp_path / "test.db"))
+    monkeypatch.setattr(database, "get_conn", lambda: backend)
+    yield backend
+    backend._db.close()
@@ -0,0 +1,30 @@
+"""Kota hatası tespiti: sadece HTTP kodu ve yapılandırılmış nedenler kota sayılır"""
+
+from app.core.backend_client import is_quota_error, RateLimitError
+
+
+class _Yanit:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class _ApiHatasi(Exception):
+    def __init__(self, mesaj, status_code):
+        super().__init__(mesaj)
+        self.response = _Yanit(status_code)
+
+
+def test_http_429_kota_hatasi():
+    assert is_quota_error(_ApiHatasi("Too Many Requests", 429))
+    assert is_quota_error(RateLimitError("bekleme süresi doldu"))
+
+
+def test_yapilandirilmis_neden_kota_hatasi():
+    assert is_quota_error(Exception("RESOURCE_EXHAUSTED: Quota exceeded for quota metric 'Read requests'"))
+    assert is_quota_error(Exception("rateLimitExceeded"))
+
+
+def test_metindeki_429_kota_sayilmaz():
+    assert not is_quota_error(Exception("WHT-2429 lotu bulunamadı"))
+    assert not is_quota_error(Exception("'hareketler' satır 1429 okunamadı"))
+    assert not is_quota_error(_ApiHatasi("Bad Request 429", 400))
@@ -0,0 +1,69 @@
+"""Soy ağacı: ileri / geri yürüyüş, silo üzerinden lot -> paçal bağı, belirsiz önek"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from app.core.lineage import LineageIndex, normalize_key
+
+
+@pytest.fixture
+def index():
+    idx = LineageIndex()
+    idx.build({
+        "mixing_batches": pd.DataFrame([
+            {'batch_id': 'MIX-20250101-AB', 'tarih': pd.Timestamp('2025-01-02'),
+             'silo_snapshot_json': json.dumps({'S1': {'oran': 100}})},
+            {'batch_id': 'MIX-20250101-CD', 'tarih': pd.Timestamp('2025-01-20'),
+             'silo_snapshot_json': json.dumps({'S1': {'oran': 100}})},
+        ]),
+        "uretim_kaydi": pd.DataFrame([{'parti_no': 'PRD-1', 'kullanilan_pacal': 'MIX-20250101-AB'}]),
+        "un_analiz": pd.DataFrame([{'lot_no': 'LAB-1', 'kaynak_parti_no': 'PRD-1', 'islem_tipi': 'URETIM'}]),
+        "sevkiyat_listesi": pd.DataFrame([{'sevkiyat_no': 'SHIP-1', 'kaynak_parti_no': 'LAB-1'}]),
+        "hareketler": pd.DataFrame([
+            {'silo_isim': 'S1', 'hareket_tipi': 'Giriş', 'miktar': 10.0,
+             'tarih': pd.Timestamp('2025-01-01'), 'lot_no': 'WHT-1'},
+            {'silo_isim': 'S1', 'hareket_tipi': 'Çıkış', 'miktar': 10.0,
+             'tarih': pd.Timestamp('2025-01-10'), 'lot_no': None},
+            {'silo_isim': 'S1', 'hareket_tipi': 'Giriş', 'miktar': 5.0,
+             'tarih': pd.Timestamp('2025-01-15'), 'lot_no': 'WHT-2'},
+        ]),
+    })
+    return idx
+
+
+def test_normalize_key():
+    assert normalize_key(' wht-1 ') == 'WHT-1'
+    assert normalize_key(12.0) == '12'
+    assert normalize_key('-') is None and normalize_key(float('nan')) is None
+
+
+def test_ileri_yuruyus_mesafeleri(index):
+    assert index.traverse('WHT-1', 'forward') == {
+        'WHT-1': 0, 'MIX-20250101-AB': 1, 'PRD-1': 2, 'LAB-1': 3, 'SHIP-1': 4,
+    }
+
+
+def test_geri_yuruyus_kaynak_lota_ulasir(index):
+    geri = index.traverse('SHIP-1', 'backward')
+    assert geri['WHT-1'] == 4
+    # Silo boşaldıktan sonra giren lot eski paçala bağlanmaz
+    assert 'WHT-2' not in geri
+
+
+def test_silo_bosalinca_bag_kesilir(index):
+    assert index.get_parents('MIX-20250101-CD') == {'WHT-2'}
+
+
+def test_ekleme_indekse_islenir(index):
+    index.on_write('sevkiyat_listesi', 'append', [{'sevkiyat_no': 'SHIP-2', 'kaynak_parti_no': 'LAB-1'}])
+    assert index.traverse('WHT-1', 'forward')['SHIP-2'] == 4
+
+
+def test_belirsiz_onek_cozulmez(index):
+    assert index.candidates('mix-20250101') == ['MIX-20250101-AB', 'MIX-20250101-CD']
+    assert index.resolve('mix-20250101') is None
+    assert index.resolve('MIX-20250101-C') == 'MIX-20250101-CD'
+    assert index.resolve('prd-1') == 'PRD-1'
+    assert index.resolve('YOK-1') is None
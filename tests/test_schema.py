@@ -0,0 +1,57 @@
+"""Şema dönüşümü: bilinen tarih biçimleri gün önce okunur, parse edilemeyen hücre kaybolmaz"""
+
+import pandas as pd
+
+from app.core.schema import apply_schema, restore_unparsed_dates
+
+
+def _hareketler():
+    return pd.DataFrame({
+        'id': [1, 2, 3, 4, 5],
+        'tarih': ['2025-04-03 10:00:00', '03.04.2025 08:15', '03.04.2025', '13.04.2025', 'tarih yok'],
+        'hareket_tipi': ['Giriş', 'Çıkış', 'Giriş', 'Giriş', 'Çıkış'],
+        'miktar': ['10', '2.5', None, '1', '3'],
+    })
+
+
+def test_tarih_bicimleri_gun_ay_sirasiyla():
+    df = apply_schema('hareketler', _hareketler())
+    assert df['tarih'].iloc[0] == pd.Timestamp('2025-04-03 10:00:00')
+    assert df['tarih'].iloc[1] == pd.Timestamp('2025-04-03 08:15:00')
+    assert df['tarih'].iloc[2] == pd.Timestamp('2025-04-03')
+    assert df['tarih'].iloc[3] == pd.Timestamp('2025-04-13')
+    assert pd.isna(df['tarih'].iloc[4])
+
+
+def test_sayi_ve_kategori_donusumu():
+    df = apply_schema('hareketler', _hareketler())
+    assert df['miktar'].tolist() == [10.0, 2.5, 0.0, 1.0, 3.0]
+    assert isinstance(df['hareket_tipi'].dtype, pd.CategoricalDtype)
+
+
+def test_tipli_tablo_tekrar_donusturulmez():
+    df = apply_schema('hareketler', _hareketler())
+    tekrar = apply_schema('hareketler', df)
+    pd.testing.assert_frame_equal(df, tekrar)
+
+
+def test_parse_edilemeyen_tarih_yazarken_geri_konur():
+    df = apply_schema('hareketler', _hareketler())
+    # Modüllerin tam tablo yazma deseni: yeni satır eklenip tablo yeniden yazılır
+    yeni = pd.concat([df, pd.DataFrame([{'id': 6, 'tarih': pd.Timestamp('2025-05-01'), 'miktar': 1.0}])],
+                     ignore_index=True)
+    yazilacak = restore_unparsed_dates('hareketler', yeni)
+    assert yazilacak['tarih'].iloc[4] == 'tarih yok'
+    assert yazilacak['tarih'].iloc[5] == pd.Timestamp('2025-05-01')
+    # Girdi tablo değiştirilmez
+    assert pd.isna(yeni['tarih'].iloc[4])
+
+
+def test_ham_tarihler_snapshot_ile_tasinir():
+    df = apply_schema('hareketler', _hareketler())
+    assert df.attrs['ham_tarihler'] == {'tarih': {'id:5': 'tarih yok'}}
+
+
+def test_bilinmeyen_tablo_aynen_doner():
+    df = pd.DataFrame({'a': ['1']})
+    assert apply_schema('tanimsiz_tablo', df) is df
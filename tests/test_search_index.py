@@ -0,0 +1,85 @@
+"""Arama indeksi: önek + tüm terimler kuralı, indekssiz taramayla aynı sonuç"""
+
+import numpy as np
+import pandas as pd
+
+from app.core.search_index import search_index, tokenize
+from app.core.table_cache import table_cache
+
+
+def _hareketler():
+    return pd.DataFrame({
+        'lot_no': ['WHT-0012', 'WHT-0120', 'UN-5', None],
+        'silo_isim': ['Silo İki', 'silo bir', 'A', 'B'],
+        'hareket_tipi': ['Giriş', 'Giriş', 'Çıkış', 'Çıkış'],
+        'notlar': ['', 'ilk parti', 'Transfer: A -> B', None],
+    })
+
+
+def _ara(df, sorgu):
+    return np.flatnonzero(search_index.search('hareketler', df, sorgu)).tolist()
+
+
+def test_tokenize_turkce_harf_ve_tam_deger():
+    kelimeler = tokenize('WHT-2602 / İstanbul')
+    assert {'wht-2602', 'wht', '2602', 'istanbul'} <= kelimeler
+    assert tokenize(None) == set() and tokenize(float('nan')) == set()
+
+
+def test_onek_ve_tum_terimler():
+    df = _hareketler()
+    table_cache.put('hareketler', df)
+    assert _ara(df, 'wht') == [0, 1]
+    assert _ara(df, 'wht-01') == [1]
+    assert _ara(df, 'SILO iki') == [0]
+    assert _ara(df, 'ransfer') == []          # kelime ortası eşleşmez
+    assert _ara(df, 'transfer') == [2]
+    assert _ara(df, '') == [0, 1, 2, 3]
+
+
+def test_siralanmis_tablo_konumlari_korunur():
+    df = _hareketler()
+    table_cache.put('hareketler', df)
+    sirali = df.sort_values('lot_no', na_position='first')
+    sonuc = search_index.search('hareketler', sirali, 'wht')
+    assert sirali.index[sonuc].tolist() == [0, 1]
+
+
+def test_arsivle_birlesik_tablo_ayni_kurallarla_taranir():
+    df = _hareketler()
+    table_cache.put('hareketler', df)
+    arsiv = pd.DataFrame({'lot_no': ['WHT-0001'], 'silo_isim': ['Silo Üç'], 'hareket_tipi': ['Giriş'],
+                          'notlar': ['transferli']})
+    birlesik = pd.concat([arsiv, df])     # index etiketleri tekrar eder: indeks kullanılamaz
+    for sorgu in ['wht', 'wht-01', 'silo i', 'ransfer', 'transfer', 'giriş']:
+        sicak = search_index.search('hareketler', df, sorgu)
+        tum = search_index.search('hareketler', birlesik, sorgu)
+        assert tum[1:].tolist() == sicak.tolist(), sorgu
+
+
+def test_ekleme_artimli_islenir():
+    df = _hareketler()
+    table_cache.put('hareketler', df)
+    assert _ara(df, 'yeni') == []
+    yeni_satir = {'lot_no': 'WHT-9', 'silo_isim': 'S9', 'hareket_tipi': 'Giriş', 'notlar': 'yeni kayit'}
+    table_cache.append('hareketler', [yeni_satir])
+    search_index.on_write('hareketler', 'append', [yeni_satir])
+    assert _ara(table_cache.get('hareketler'), 'yeni') == [4]
+
+
+def test_gecersiz_kilinan_tablo_ayni_boyda_yeniden_kurulur():
+    df = _hareketler()
+    table_cache.put('hareketler', df)
+    assert _ara(df, 'wht') == [0, 1]
+
+    degisen = df.copy()
+    degisen.loc[0, 'lot_no'] = 'MIX-1'
+    table_cache.invalidate('hareketler')
+    table_cache.put('hareketler', degisen)
+    assert _ara(degisen, 'wht') == [1]
+    assert _ara(degisen, 'mix') == [0]
+
+
+def test_kayitsiz_tablo_duz_metin_taramasi():
+    df = pd.DataFrame({'a': ['elma', 'armut']})
+    assert search_index.search('tanimsiz_tablo', df, 'rmu').tolist() == [False, True]
@@ -0,0 +1,90 @@
+"""Silo stok motoru: artımlı hareket, mutabakat ve devir satırları aynı sonucu vermeli"""
+
+import pandas as pd
+import pytest
+
+from app.core.silo_engine import (
+    apply_movement, carry_forward, reconcile_silos,
+    SILO_KALITE_PARAMETRELERI, SILO_SURUM_KOLONU, DEVIR_GIRIS, DEVIR_CIKIS,
+)
+
+HAREKETLER = [
+    ('S1', 'Giriş', 100.0, {'protein': 12.0, 'maliyet': 10.0}),
+    ('S1', 'Giriş', 50.0, {'protein': 15.0, 'maliyet': 13.0}),
+    ('S1', 'Çıkış', 30.0, {}),
+    ('S2', 'Giriş', 20.0, {'protein': 11.0, 'maliyet': 9.0}),
+    ('S2', 'Çıkış', 25.0, {}),
+]
+
+
+def _bos_silo(isim):
+    return {'isim': isim, 'mevcut_miktar': 0.0, 'toplam_giris': 0.0, 'toplam_cikis': 0.0,
+            **{param: 0.0 for param in SILO_KALITE_PARAMETRELERI}}
+
+
+def _hareket_tablosu(hareketler=HAREKETLER):
+    return pd.DataFrame([{'silo_isim': s, 'hareket_tipi': t, 'miktar': m, **p} for s, t, m, p in hareketler])
+
+
+def _artimli(hareketler=HAREKETLER):
+    silolar = {isim: _bos_silo(isim) for isim in ('S1', 'S2')}
+    for silo, tip, miktar, params in hareketler:
+        silolar[silo].update(apply_movement(silolar[silo], tip, miktar, params))
+    return silolar
+
+
+def test_apply_movement_agirlikli_ortalama():
+    silo = _artimli()['S1']
+    assert silo['toplam_giris'] == pytest.approx(150.0)
+    assert silo['toplam_cikis'] == pytest.approx(30.0)
+    assert silo['mevcut_miktar'] == pytest.approx(120.0)
+    assert silo['protein'] == pytest.approx((100 * 12 + 50 * 15) / 150)
+
+
+def test_apply_movement_geri_al_etkiyi_kaldirir():
+    silo = _artimli()['S1']
+    silo.update(apply_movement(silo, 'Giriş', 50.0, {'protein': 15.0, 'maliyet': 13.0}, geri_al=True))
+    assert silo['toplam_giris'] == pytest.approx(100.0)
+    assert silo['protein'] == pytest.approx(12.0)
+    assert silo['maliyet'] == pytest.approx(10.0)
+
+
+def test_apply_movement_stok_eksiye_dusmez_ve_bilinmeyen_tip_etkisiz():
+    silo = _artimli()['S2']
+    assert silo['mevcut_miktar'] == 0.0
+    assert apply_movement(silo, 'Transfer', 10.0) == {}
+
+
+def test_reconcile_artimli_ile_ayni_sonuc():
+    df_silolar = pd.DataFrame([_bos_silo('S1'), _bos_silo('S2'), _bos_silo('S3')])
+    sonuc = reconcile_silos(df_silolar, _hareket_tablosu()).set_index('isim')
+    artimli = _artimli()
+
+    for isim in ('S1', 'S2'):
+        for alan in ['mevcut_miktar', 'toplam_giris', 'toplam_cikis', 'protein', 'maliyet']:
+            assert sonuc.loc[isim, alan] == pytest.approx(artimli[isim][alan])
+    assert sonuc.loc['S3', 'mevcut_miktar'] == 0.0
+
+
+def test_reconcile_kart_surumunu_artirir():
+    df_silolar = pd.DataFrame([_bos_silo('S1'), _bos_silo('S2')])
+    ilk = reconcile_silos(df_silolar, _hareket_tablosu())
+    assert ilk[SILO_SURUM_KOLONU].tolist() == [1, 1]
+    assert reconcile_silos(ilk, _hareket_tablosu())[SILO_SURUM_KOLONU].tolist() == [2, 2]
+
+
+def test_carry_forward_ile_mutabakat_tum_gecmisle_ayni():
+    gecmis = _hareket_tablosu()
+    arsiv, sicak = gecmis.iloc[:3], gecmis.iloc[3:]
+    devir = pd.DataFrame(carry_forward(arsiv, ['protein', 'maliyet']))
+    assert set(devir['hareket_tipi']) == {DEVIR_GIRIS, DEVIR_CIKIS}
+
+    df_silolar = pd.DataFrame([_bos_silo('S1'), _bos_silo('S2')])
+    tam = reconcile_silos(df_silolar, gecmis).set_index('isim')
+    devirli = reconcile_silos(df_silolar, pd.concat([devir, sicak], ignore_index=True)).set_index('isim')
+    for alan in ['mevcut_miktar', 'toplam_giris', 'toplam_cikis', 'protein', 'maliyet']:
+        assert devirli[alan].to_numpy() == pytest.approx(tam[alan].to_numpy())
+
+
+def test_carry_forward_bos_tablo():
+    assert carry_forward(pd.DataFrame(), ['protein']) == []
@@ -0,0 +1,36 @@
+"""Depo filtreleri: motor değişince aynı satırlar eşleşmeli (5 / 5.0 / '5' aynı anahtar)"""
+
+import pandas as pd
+
+from app.core.storage import _filter_mask
+
+TABLO = "karisik_anahtarlar"
+
+
+def _karisik():
+    return pd.DataFrame({
+        'id': pd.Series(['5', 5.0, 7, None], dtype=object),
+        'ad': ['metin', 'ondalik', 'baska', 'bos'],
+    })
+
+
+def test_filtre_maskesi_anahtar_normalize_eder():
+    df = _karisik()
+    assert df['ad'][_filter_mask(df, {'id': 5})].tolist() == ['metin', 'ondalik']
+    assert df['ad'][_filter_mask(df, {'id': '5.0'})].tolist() == []
+    assert df['ad'][_filter_mask(df, {'id': None})].tolist() == ['bos']
+
+
+def test_sqlite_guncelleme_tipten_bagimsiz(sqlite_backend):
+    sqlite_backend.update(TABLO, _karisik())
+    assert sqlite_backend.update_where(TABLO, {'id': 5}, {'ad': 'guncel'}) == 2
+    assert sqlite_backend.update_where(TABLO, {'id': '7'}, {'ad': 'yedi'}) == 1
+    assert sqlite_backend.update_where(TABLO, {'id': ''}, {'ad': 'bos2'}) == 1
+    df = sqlite_backend.read(TABLO)
+    assert sorted(df['ad'].tolist()) == ['bos2', 'guncel', 'guncel', 'yedi']
+
+
+def test_sqlite_silme_tipten_bagimsiz(sqlite_backend):
+    sqlite_backend.update(TABLO, _karisik())
+    assert sqlite_backend.delete_where(TABLO, {'id': 5.0}) == 2
+    assert sqlite_backend.read(TABLO)['ad'].tolist() == ['baska', 'bos']
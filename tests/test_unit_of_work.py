@@ -0,0 +1,146 @@
+"""Unit of work: SQLite üzerinde ya hep ya hiç, kendi yazdığını okuma ve ters işlemler"""
+
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+
+from app.core import database
+from app.core.database import (
+    add_data, delete_rows_by_filter, fetch_data, unit_of_work, update_row_by_filter, UnitOfWork,
+)
+from app.core.storage import SQLiteBackend, StorageError, _notify_write
+
+TABLO = "test_kayitlari"
+
+
+def _tablo(backend):
+    return backend.read(TABLO).sort_values('id').to_dict('records')
+
+
+@pytest.fixture
+def dolu(sqlite_backend):
+    sqlite_backend.update(TABLO, pd.DataFrame({
+        'id': [1, 2, 3], 'grup': ['a', 'b', 'b'], 'miktar': [1.0, 2.0, 3.0],
+    }))
+    return sqlite_backend
+
+
+def test_toplu_yazma_tek_islemde(dolu):
+    with unit_of_work():
+        update_row_by_filter(TABLO, {'grup': 'b'}, {'miktar': 9.0})
+        ok, _, silinen = delete_rows_by_filter(TABLO, {'id': 3})
+        add_data(TABLO, {'id': 4, 'grup': 'c', 'miktar': 4.0})
+        assert ok and silinen == 1
+        # Blok içinde depo değişmez, okuma bekleyen yazmaları görür
+        assert [r['miktar'] for r in _tablo(dolu)] == [1.0, 2.0, 3.0]
+        assert fetch_data(TABLO)['id'].tolist() == [1, 2, 4]
+        assert fetch_data(TABLO)['miktar'].tolist() == [1.0, 9.0, 4.0]
+
+    assert _tablo(dolu) == [
+        {'id': 1, 'grup': 'a', 'miktar': 1.0},
+        {'id': 2, 'grup': 'b', 'miktar': 9.0},
+        {'id': 4, 'grup': 'c', 'miktar': 4.0},
+    ]
+
+
+def test_blokta_hata_olursa_hicbir_sey_yazilmaz(dolu):
+    with pytest.raises(RuntimeError):
+        with unit_of_work():
+            update_row_by_filter(TABLO, {'id': 1}, {'miktar': 7.0})
+            delete_rows_by_filter(TABLO, {'id': 2})
+            add_data(TABLO, {'id': 5, 'grup': 'x', 'miktar': 5.0})
+            raise RuntimeError("iptal")
+    assert [r['id'] for r in _tablo(dolu)] == [1, 2, 3]
+    assert _tablo(dolu)[0]['miktar'] == 1.0
+    assert database.current_unit_of_work() is None
+
+
+def test_yazma_hatasinda_sqlite_geri_sarar(dolu, monkeypatch):
+    def bozuk_ekleme(worksheet, rows):
+        raise StorageError("ekleme başarısız")
+
+    with pytest.raises(StorageError):
+        with unit_of_work():
+            update_row_by_filter(TABLO, {'grup': 'b'}, {'miktar': 0.0})
+            delete_rows_by_filter(TABLO, {'id': 1})
+            add_data(TABLO, {'id': 6, 'grup': 'y', 'miktar': 6.0})
+            monkeypatch.setattr(dolu, "append", bozuk_ekleme)
+    assert [(r['id'], r['miktar']) for r in _tablo(dolu)] == [(1, 1.0), (2, 2.0), (3, 3.0)]
+
+
+def test_ayni_iste_eklenen_satir_silinirse_hic_yazilmaz(dolu):
+    with unit_of_work():
+        add_data(TABLO, {'id': 7, 'grup': 'z', 'miktar': 7.0})
+        assert delete_rows_by_filter(TABLO, {'id': 7})[2] == 1
+    assert [r['id'] for r in _tablo(dolu)] == [1, 2, 3]
+
+
+class _IslemsizSQLite(SQLiteBackend):
+    """İşlem (transaction) desteği olmayan motor benzetimi: her yazma hemen kalıcı"""
+
+    atomic = False
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            yield self
+            bekleyen, self._pending = self._pending, []
+            for olay in bekleyen:
+                _notify_write(*olay)
+
+
+@pytest.fixture
+def islemsiz(monkeypatch, tmp_path):
+    backend = _IslemsizSQLite(str(tmp_path / "islemsiz.db"))
+    monkeypatch.setattr(database, "get_conn", lambda: backend)
+    backend.update(TABLO, pd.DataFrame({'id': [1, 2, 3], 'grup': ['a', 'b', 'b'], 'miktar': [1.0, 2.0, 3.0]}))
+    yield backend
+    backend._db.close()
+
+
+def _ilk_cagri_hatali(backend):
+    """İlk ekleme hata verir (asıl yazma), sonrakiler çalışır (ters işlemler)"""
+    asil = SQLiteBackend.append.__get__(backend)
+    cagri = {'sayi': 0}
+
+    def ekle(worksheet, rows):
+        cagri['sayi'] += 1
+        if cagri['sayi'] == 1:
+            raise StorageError("ekleme başarısız")
+        return asil(worksheet, rows)
+    return ekle
+
+
+def test_islemsiz_motorda_ters_islem_satir_satir(islemsiz, monkeypatch):
+    with pytest.raises(StorageError):
+        with unit_of_work():
+            # Çok satırlı güncelleme: her satır kendi eski değerine dönmeli
+            update_row_by_filter(TABLO, {'grup': 'b'}, {'miktar': 0.0})
+            delete_rows_by_filter(TABLO, {'id': 1})
+            add_data(TABLO, {'id': 8, 'grup': 'w', 'miktar': 8.0})
+            monkeypatch.setattr(islemsiz, "append", _ilk_cagri_hatali(islemsiz))
+    assert [(r['id'], r['grup'], r['miktar']) for r in _tablo(islemsiz)] == \
+        [(1, 'a', 1.0), (2, 'b', 2.0), (3, 'b', 3.0)]
+
+
+def test_islemsiz_motorda_geri_alinamayan_is_yazilmadan_reddedilir(islemsiz):
+    with pytest.raises(StorageError):
+        with unit_of_work():
+            update_row_by_filter(TABLO, {'id': 1}, {'miktar': 5.0})
+            add_data(TABLO, {'grup': 'idsiz', 'miktar': 1.0})
+    assert _tablo(islemsiz)[0]['miktar'] == 1.0
+    assert len(_tablo(islemsiz)) == 3
+
+
+def test_idsiz_cok_satirli_guncelleme_reddedilir(islemsiz):
+    islemsiz.update("idsiz", pd.DataFrame({'grup': ['b', 'b'], 'miktar': [1.0, 2.0]}))
+    uow = UnitOfWork(islemsiz)
+    database._UOW.aktif = uow
+    try:
+        update_row_by_filter("idsiz", {'grup': 'b'}, {'miktar': 0.0})
+    finally:
+        database._UOW.aktif = None
+    with pytest.raises(StorageError):
+        uow.commit()
+    assert islemsiz.read("idsiz")['miktar'].tolist() == [1.0, 2.0]